@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/3.2/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+# Serve the read endpoints with async views (see core.asyncviews).
+os.environ.setdefault('ASYNC_READ_VIEWS', '1')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# Awaits the parts of streamed exports (see core.asyncviews).
+from core.asyncviews import ASGIHandler  # noqa: E402
+
+application = ASGIHandler()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,9 +44,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'drf_spectacular',
+    'django_filters',
     'user',
     'core',
     'recipe',
@@ -88,14 +91,98 @@ WSGI_APPLICATION = 'app.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        # Django's backend plus health checks and pooling (core.db)
+        'ENGINE': 'core.db.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        # Keep connections open between requests, checking them first
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'POOL': None,
     }
 }
 
+# In-process connection pool per worker (0 = off); connections go back to
+# the pool at the end of each request instead of staying with a thread.
+DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', 0))
+if DB_POOL_MAX_SIZE:
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['POOL'] = {
+        'MAX_SIZE': DB_POOL_MAX_SIZE,
+        'MAX_OVERFLOW': int(os.environ.get('DB_POOL_MAX_OVERFLOW', 5)),
+        'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+API_CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'core.cache.LRUFileBasedCache',
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Per-user API responses. Invalidation must reach every worker, so
+    # they share a 'file' cache unless running the single DEBUG process.
+    'api': {
+        'BACKEND': API_CACHE_BACKENDS[
+            os.environ.get('API_CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+        ],
+        'LOCATION': os.environ.get(
+            'API_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'api-cache'),
+        ),
+        'TIMEOUT': int(os.environ.get('API_CACHE_TIMEOUT', 300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('API_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+    # Token buckets of core.throttling. A bucket per worker would multiply
+    # the limits, so they share a 'file' cache unless running the single
+    # DEBUG process.
+    'throttle': {
+        'BACKEND': API_CACHE_BACKENDS[
+            os.environ.get(
+                'THROTTLE_CACHE_BACKEND', 'locmem' if DEBUG else 'file',
+            )
+        ],
+        'LOCATION': os.environ.get(
+            'THROTTLE_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'throttle-cache'),
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.environ.get('THROTTLE_CACHE_MAX_ENTRIES', 10000)
+            ),
+        },
+    },
+    # Token -> user lookups and the deny-list (core.authentication,
+    # core.tokens). Revocations must reach every worker at once, so they
+    # share a 'file' cache unless running the single DEBUG process. Users
+    # are cached without their password hash.
+    'auth': {
+        'BACKEND': API_CACHE_BACKENDS[
+            os.environ.get('AUTH_CACHE_BACKEND', 'locmem' if DEBUG else 'file')
+        ],
+        'LOCATION': os.environ.get(
+            'AUTH_CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'auth-cache'),
+        ),
+        'TIMEOUT': int(os.environ.get('AUTH_CACHE_TIMEOUT', 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -152,8 +239,60 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # The nginx proxy appends the client address to X-Forwarded-For; the
+    # earlier entries come from the client and identify nobody.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 1)),
+    # Token bucket sizes per throttle_scope, refilled over the period
+    # (see core.throttling); each applies per client IP and per user.
+    'DEFAULT_THROTTLE_RATES': {
+        'login': os.environ.get('THROTTLE_RATE_LOGIN', '30/min'),
+        'upload': os.environ.get('THROTTLE_RATE_UPLOAD', '60/min'),
+        'export': os.environ.get('THROTTLE_RATE_EXPORT', '30/min'),
+        'import': os.environ.get('THROTTLE_RATE_IMPORT', '30/min'),
+    },
 }
 
+# Keyset pagination for list endpoints (opt-in via ?cursor= / ?page_size=)
+PAGINATION_PAGE_SIZE = int(os.environ.get('PAGINATION_PAGE_SIZE', 50))
+PAGINATION_MAX_PAGE_SIZE = int(os.environ.get('PAGINATION_MAX_PAGE_SIZE', 500))
+
+# Rows fetched per server-side cursor round trip by the export actions
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 2000))
+
+# Validated rows buffered before each bulk insert by the import actions
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 1000))
+
+# Background threads resizing uploaded recipe images (0 = process inline)
+IMAGE_PROCESSING_WORKERS = int(os.environ.get('IMAGE_PROCESSING_WORKERS', 2))
+
+# Longest wait of a change feed long-poll, in seconds (below proxy timeouts).
+# Only served under ASGI; WSGI workers answer the feed without waiting.
+CHANGE_FEED_TIMEOUT = float(os.environ.get('CHANGE_FEED_TIMEOUT', 25))
+
+# Serve list/detail reads of viewsets with async_reads from async views,
+# their database work on a bounded thread pool (see core.asyncviews).
+# Turned on by app.asgi.
+ASYNC_READ_VIEWS = bool(int(os.environ.get('ASYNC_READ_VIEWS', 0)))
+ASYNC_DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 10))
+
+# Monthly partitioning of the event log (see core.partitioning); converted
+# once with `partition_event_log --convert`. Events then need a Thoigian.
+EVENT_LOG_PARTITIONING = bool(int(os.environ.get('EVENT_LOG_PARTITIONING', 0)))
+EVENT_LOG_PARTITIONS_AHEAD = int(
+    os.environ.get('EVENT_LOG_PARTITIONS_AHEAD', 3)
+)
+
+# Lifetimes, in seconds, of the signed access and refresh tokens (core.tokens)
+ACCESS_TOKEN_LIFETIME = int(os.environ.get('ACCESS_TOKEN_LIFETIME', 300))
+REFRESH_TOKEN_LIFETIME = int(
+    os.environ.get('REFRESH_TOKEN_LIFETIME', 7 * 24 * 3600)
+)
+
+# Where the pre-generated OpenAPI schema is kept (see core.schema)
+API_SCHEMA_DIR = os.environ.get(
+    'API_SCHEMA_DIR', os.path.join(tempfile.gettempdir(), 'api-schema'),
+)
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
\ No newline at end of file
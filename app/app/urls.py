@@ -15,10 +15,7 @@ Including another URLconf
 """
 
 
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-)
+from drf_spectacular.views import SpectacularSwaggerView
 
 
 from django.contrib import admin
@@ -26,14 +23,21 @@ from django.urls import path, include
 from django.conf.urls.static import static
 from django.conf import settings
 
+from core.views import CachedSchemaView, DatabaseConnectionStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='api-schema'),
+    path('api/schema/', CachedSchemaView.as_view(), name='api-schema'),
     path(
         'api/docs/',
         SpectacularSwaggerView.as_view(url_name='api-schema'),
         name='api-docs',
     ),
+    path(
+        'api/db/connections/',
+        DatabaseConnectionStatsView.as_view(),
+        name='db-connections',
+    ),
     path('api/user/', include('user.urls')),
     path('api/recipe/', include('recipe.urls')),
     path('api/nhatkysukien/', include('nhatkysukien.urls')),
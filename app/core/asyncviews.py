@@ -0,0 +1,218 @@
+"""
+Async serving of read endpoints under ASGI.
+
+Django 4.0 has no async ORM, so the async views hand the database work of
+a request to a bounded pool of threads (ASYNC_DB_THREADS). Waiting
+requests then cost a coroutine instead of a thread and a connection, and
+at most ASYNC_DB_THREADS connections are open however many clients are.
+"""
+import asyncio
+import contextvars
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers import asgi
+from django.db import close_old_connections, connections
+from django.http import StreamingHttpResponse
+from rest_framework.routers import DefaultRouter
+
+
+READ_METHODS = ('GET', 'HEAD')
+
+_executor = None
+
+
+def _get_executor():
+    """Return the database thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DB_THREADS,
+            thread_name_prefix='async-db',
+        )
+    return _executor
+
+
+def _call_in_worker(func, *args, **kwargs):
+    """Run func with a usable connection of the worker thread."""
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_thread(func, *args, **kwargs):
+    """Await a sync, database-bound call made on the thread pool."""
+    context = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_executor(),
+        functools.partial(
+            context.run, _call_in_worker, func, *args, **kwargs,
+        ),
+    )
+
+
+def _render(view, request, *args, **kwargs):
+    """Call a view and render its response, if lazy, on the same thread."""
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, 'render', None)):
+        response = response.render()
+    return response
+
+
+class ThreadedStream:
+    """Produce a sync, database-bound stream on a thread of its own.
+
+    The ORM refuses to run on the event loop, so the stream is run by a
+    thread (with its own connection) into a queue of at most ``ahead``
+    parts, which is read as an async iterator. Send it with
+    ThreadedStreamingHttpResponse.
+    """
+    _done = object()
+
+    def __init__(self, iterable, ahead=8):
+        self._queue = queue.Queue(maxsize=ahead)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(
+            target=contextvars.copy_context().run,
+            args=(self._produce, iterable),
+            name='stream',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _produce(self, iterable):
+        iterator = iter(iterable)
+        try:
+            for part in iterator:
+                if not self._put((part, None)):
+                    return
+            self._put((self._done, None))
+        except Exception as exc:
+            self._put((None, exc))
+        finally:
+            # A generator must be closed by the thread running it.
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            connections.close_all()
+
+    def _put(self, item):
+        """Queue an item unless the response was closed; return if queued."""
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        part, exc = await sync_to_async(
+            self._queue.get, thread_sensitive=False,
+        )()
+        if exc is not None:
+            raise exc
+        if part is self._done:
+            raise StopAsyncIteration
+        return part
+
+    def close(self):
+        """Stop the thread, e.g. once the client went away."""
+        self._closed.set()
+
+
+class ThreadedStreamingHttpResponse(StreamingHttpResponse):
+    """Streaming response whose parts come from a ThreadedStream.
+
+    Django 4.0 iterates streaming content synchronously, on the event loop
+    under ASGI, so the parts are kept out of ``streaming_content`` (which
+    is empty) and only ASGIHandler below awaits them.
+    """
+
+    def __init__(self, streaming_content=(), *args, **kwargs):
+        super().__init__((), *args, **kwargs)
+        self.threaded_stream = ThreadedStream(streaming_content)
+        self._resource_closers.append(self.threaded_stream.close)
+
+
+class ASGIHandler(asgi.ASGIHandler):
+    """ASGIHandler sending ThreadedStreamingHttpResponse without blocking."""
+
+    async def send_response(self, response, send):
+        stream = getattr(response, 'threaded_stream', None)
+        if stream is None:
+            return await super().send_response(response, send)
+
+        async def send_parts_first(message):
+            # The parent sends the headers, nothing for the empty
+            # streaming_content, then the closing body message.
+            if message['type'] == 'http.response.body' and (
+                not message.get('more_body')
+            ):
+                async for part in stream:
+                    for chunk, _ in self.chunk_bytes(
+                        response.make_bytes(part),
+                    ):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            await send(message)
+
+        try:
+            await super().send_response(response, send_parts_first)
+        finally:
+            stream.close()
+
+
+def async_read_view(view):
+    """Return an async version of a DRF view serving reads on the pool.
+
+    Other methods run like any sync view under ASGI. The attributes of
+    the DRF view (cls, actions, csrf_exempt, ...) are kept for routing
+    and schema generation.
+    """
+    @functools.wraps(view)
+    async def wrapped_view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await run_in_db_thread(
+                _render, view, request, *args, **kwargs,
+            )
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    return wrapped_view
+
+
+class AsyncReadRouter(DefaultRouter):
+    """DefaultRouter serving list and detail routes with async views.
+
+    Only viewsets with ``async_reads = True`` are affected.
+    """
+
+    def get_urls(self):
+        urls = super().get_urls()
+        for url in urls:
+            cls = getattr(url.callback, 'cls', None)
+            actions = getattr(url.callback, 'actions', {})
+            if getattr(cls, 'async_reads', False) and (
+                actions.get('get') in ('list', 'retrieve')
+            ):
+                url.callback = async_read_view(url.callback)
+
+        return urls
+
+
+def get_router():
+    """Return the router for the configured serving mode."""
+    if settings.ASYNC_READ_VIEWS:
+        return AsyncReadRouter()
+    return DefaultRouter()
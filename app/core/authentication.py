@@ -0,0 +1,156 @@
+"""
+Authentication classes shared by the API apps.
+"""
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.plumbing import build_bearer_security_scheme_object
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+
+from core import tokens
+
+
+def token_cache():
+    """Return the cache of resolved tokens, shared by the workers."""
+    return caches['auth']
+
+
+def token_cache_key(key):
+    """Return the cache key of a token, without the token itself."""
+    return f'auth-credentials:{hashlib.sha256(key.encode()).hexdigest()}'
+
+
+def user_cache_key(user_id):
+    """Return the cache key of a user resolved from a signed token."""
+    return f'auth-user-fields:{user_id}'
+
+
+def invalidate_tokens(keys):
+    """Forget the cached resolution of the given token keys."""
+    token_cache().delete_many([token_cache_key(key) for key in keys])
+
+
+def invalidate_user(user_id):
+    """Forget the cached user of signed tokens."""
+    token_cache().delete(user_cache_key(user_id))
+
+
+# User fields kept in the cache; the others (the password hash above
+# all) are deferred and loaded from the database if ever accessed.
+CACHED_USER_FIELDS = ('id', 'email', 'name', 'is_active', 'is_staff',
+                      'is_superuser')
+
+
+def cached_user_fields(user):
+    """Return the cacheable fields of a user."""
+    return {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+
+
+def user_from_fields(fields):
+    """Rebuild a user from cached fields, deferring the others."""
+    user_model = get_user_model()
+    names = [
+        field.attname for field in user_model._meta.concrete_fields
+        if field.attname in fields
+    ]
+    return user_model.from_db(
+        DEFAULT_DB_ALIAS, names, [fields[name] for name in names],
+    )
+
+
+def get_active_user(user_id):
+    """Return the active user with the given id, or None, via the cache."""
+    cache_key = user_cache_key(user_id)
+    fields = token_cache().get(cache_key)
+    if fields is None:
+        user = get_user_model().objects.filter(
+            pk=user_id, is_active=True,
+        ).first()
+        if user is None:
+            return None
+        token_cache().set(cache_key, cached_user_fields(user))
+        return user
+
+    return user_from_fields(fields)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that remembers token -> user resolutions.
+
+    Entries live in the ``auth`` cache, which bounds them by count (LRU)
+    and age, and hold only CACHED_USER_FIELDS of the user and the token's
+    creation time. core.signals drops them when a token is deleted or its
+    user is saved, e.g. deactivated; the cache is shared, so every worker
+    stops accepting the token at once.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        credentials = token_cache().get(cache_key)
+        if credentials is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache().set(cache_key, {
+                'user': cached_user_fields(user),
+                'created': token.created,
+            })
+            return user, token
+
+        user = user_from_fields(credentials['user'])
+        return user, Token(key=key, user=user, created=credentials['created'])
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticate ``Authorization: Bearer <access token>`` headers.
+
+    The access tokens of core.tokens verify by signature alone; the user
+    comes from the ``auth`` cache, so warm requests run no query.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) != 2:
+            msg = _('Invalid token header.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        try:
+            payload = tokens.verify_access_token(auth[1].decode())
+        except (signing.BadSignature, UnicodeError):
+            msg = _('Invalid or expired token.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        user = get_active_user(payload['u'])
+        if user is None:
+            msg = _('User inactive or deleted.')
+            raise exceptions.AuthenticationFailed(msg)
+
+        return (user, payload)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class SignedTokenScheme(OpenApiAuthenticationExtension):
+    """Describe SignedTokenAuthentication in the OpenAPI schema."""
+    target_class = SignedTokenAuthentication
+    name = 'signedTokenAuth'
+
+    def get_security_definition(self, auto_schema):
+        return build_bearer_security_scheme_object(
+            header_name='Authorization',
+            token_prefix=SignedTokenAuthentication.keyword,
+        )
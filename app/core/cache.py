@@ -0,0 +1,59 @@
+"""
+Cache backends.
+"""
+import fcntl
+import os
+from contextlib import contextmanager, suppress
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """File based cache that evicts the least recently used entries.
+
+    Django's file cache culls a random sample once MAX_ENTRIES is reached.
+    This backend stamps a file's mtime on every hit and culls the files
+    with the oldest stamps instead.
+
+    ``lock()`` serialises read-modify-write updates of a key across the
+    processes sharing the directory, which Django's non-atomic ``add`` and
+    ``incr`` cannot.
+    """
+    _missing = object()
+    # Keys share this many lock files, so they do not pile up.
+    lock_stripes = 64
+
+    @contextmanager
+    def lock(self, key, version=None):
+        """Hold an exclusive lock on a key for every process."""
+        self._createdir()
+        digest = os.path.basename(self._key_to_file(key, version))
+        stripe = int(digest[:8], 16) % self.lock_stripes
+        with open(os.path.join(self._dir, f'{stripe}.lock'), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version)
+        if value is self._missing:
+            return default
+        with suppress(FileNotFoundError):
+            os.utime(self._key_to_file(key, version))
+        return value
+
+    def _last_used(self, fname):
+        try:
+            return os.path.getmtime(fname)
+        except FileNotFoundError:
+            return 0
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+        filelist.sort(key=self._last_used)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
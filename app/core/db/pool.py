@@ -0,0 +1,172 @@
+"""
+In-process pool of database connections.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from psycopg2 import OperationalError
+
+
+class PoolTimeout(OperationalError):
+    """No connection became available within the pool timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections.
+
+    Up to ``max_size`` connections are kept open between checkouts; up to
+    ``max_overflow`` more are opened under load and closed when returned.
+    A checkout beyond that waits up to ``timeout`` seconds, then raises
+    PoolTimeout. Counters for tuning are returned by stats().
+    """
+
+    def __init__(self, max_size, max_overflow=0, timeout=30):
+        self.max_size = max_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.pid = os.getpid()
+        self._idle = deque()
+        self._size = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'connections_created': 0,
+            'connections_closed': 0,
+            'overflow_created': 0,
+            'waits': 0,
+            'wait_seconds_total': 0.0,
+            'wait_seconds_max': 0.0,
+            'timeouts': 0,
+        }
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._stats['connections_closed'] += 1
+
+    def _reserve(self):
+        """Return an idle connection or None after reserving a new slot.
+
+        Must hold the lock.
+        """
+        started = None
+        try:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size + self.max_overflow:
+                    self._size += 1
+                    if self._size > self.max_size:
+                        self._stats['overflow_created'] += 1
+                    return None
+
+                if started is None:
+                    started = time.monotonic()
+                    self._stats['waits'] += 1
+                remaining = started + self.timeout - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    self._stats['timeouts'] += 1
+                    raise PoolTimeout(
+                        f'No database connection available within '
+                        f'{self.timeout} seconds.'
+                    )
+        finally:
+            if started is not None:
+                waited = time.monotonic() - started
+                self._stats['wait_seconds_total'] += waited
+                self._stats['wait_seconds_max'] = max(
+                    self._stats['wait_seconds_max'], waited,
+                )
+
+    def getconn(self, connect, check=None):
+        """Check out a connection, opening one with connect() if needed.
+
+        Idle connections failing check() are closed and replaced.
+        """
+        while True:
+            with self._cond:
+                conn = self._reserve()
+            if conn is None:
+                try:
+                    conn = connect()
+                except BaseException:
+                    self._release_slot()
+                    raise
+                with self._cond:
+                    self._stats['connections_created'] += 1
+                    self._stats['checkouts'] += 1
+                return conn
+            if not conn.closed and (check is None or check(conn)):
+                with self._cond:
+                    self._stats['checkouts'] += 1
+                return conn
+            with self._cond:
+                self._close(conn)
+            self._release_slot()
+
+    def putconn(self, conn, discard=False):
+        """Return a checked out connection to the pool."""
+        with self._cond:
+            if discard or conn.closed or self._size > self.max_size:
+                self._close(conn)
+                self._size -= 1
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def _release_slot(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def closeall(self):
+        """Close the idle connections."""
+        with self._cond:
+            while self._idle:
+                self._close(self._idle.pop())
+                self._size -= 1
+
+    def stats(self):
+        """Return the pool counters and current usage."""
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'max_overflow': self.max_overflow,
+                'timeout': self.timeout,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                **self._stats,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, max_size, max_overflow=0, timeout=30):
+    """Return this process's pool for key, creating it on first use.
+
+    Pools inherited through fork() are dropped, as their connections
+    belong to the parent.
+    """
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[key] = ConnectionPool(
+                max_size, max_overflow, timeout,
+            )
+        return pool
+
+
+def all_pools():
+    """Return this process's pools by key."""
+    with _pools_lock:
+        return {
+            key: pool for key, pool in _pools.items()
+            if pool.pid == os.getpid()
+        }
@@ -0,0 +1,104 @@
+"""
+PostgreSQL backend with connection health checks and optional pooling.
+
+Settings of the database entry, besides Django's own:
+
+* ``CONN_HEALTH_CHECKS``: check a persistent connection still works
+  before its first use in each request, as Django 4.1 does.
+* ``POOL``: ``{'MAX_SIZE': ..., 'MAX_OVERFLOW': ..., 'TIMEOUT': ...}`` to
+  borrow connections from an in-process pool (core.db.pool) instead of
+  opening and closing them; None to disable.
+"""
+import psycopg2
+from psycopg2 import extensions
+from django.db.backends.postgresql import base
+
+from core.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, settings_dict, alias=None):
+        super().__init__(settings_dict, alias)
+        self.health_check_enabled = settings_dict.get(
+            'CONN_HEALTH_CHECKS', False,
+        )
+        self.health_check_done = False
+
+    @property
+    def pool(self):
+        """Return the pool of this database, or None."""
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return None
+        return get_pool(
+            (self.alias, self.settings_dict['NAME']),
+            max_size=options.get('MAX_SIZE', 5),
+            max_overflow=options.get('MAX_OVERFLOW', 0),
+            timeout=options.get('TIMEOUT', 30),
+        )
+
+    def _check_pooled(self, conn):
+        """Return whether an idle pooled connection is still usable."""
+        if not self.health_check_enabled:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except psycopg2.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            return super().get_new_connection(conn_params)
+        return pool.getconn(
+            lambda: super(DatabaseWrapper, self).get_new_connection(
+                conn_params,
+            ),
+            check=self._check_pooled,
+        )
+
+    def connect(self):
+        # A connection that is just opened or checked out needs no check.
+        self.health_check_done = True
+        super().connect()
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+
+        conn = self.connection
+        discard = False
+        if (
+            not conn.closed and conn.info.transaction_status
+            != extensions.TRANSACTION_STATUS_IDLE
+        ):
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                discard = True
+        pool.putconn(conn, discard=discard)
+
+    def close_if_health_check_failed(self):
+        """Close the connection if it no longer works (once per request)."""
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        self.close_if_health_check_failed()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        # Called at the start and end of each request.
+        self.health_check_done = False
+        super().close_if_unusable_or_obsolete()
@@ -0,0 +1,48 @@
+"""
+Month bucketing of the event statistics triggers.
+
+The triggers of migration 0022 count events per month of ``Thoigian``.
+Months are taken in settings.TIME_ZONE, read whenever the
+``rebuild_event_stats`` command re-creates the trigger function, so the
+counts agree with TruncMonth after the zone is changed. Migrations keep
+their own copy of the SQL.
+"""
+from django.conf import settings
+
+
+def month_sql(row, zone=None):
+    """Return the SQL expression of the YYYY-MM month of a row."""
+    zone = (zone or settings.TIME_ZONE).replace("'", "''")
+    return f"to_char({row}.\"Thoigian\" AT TIME ZONE '{zone}', 'YYYY-MM')"
+
+
+def stats_function_sql(zone=None):
+    """Return the SQL replacing the event trigger function."""
+    return f"""
+CREATE OR REPLACE FUNCTION core_nhatkysukien_stats_update()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'CaVanHanh', OLD."CaVanHanh", -1);
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'LoaiSc', OLD."LoaiSc", -1);
+        IF OLD."Thoigian" IS NOT NULL THEN
+            PERFORM core_thongkesukien_bump(
+                OLD.user_id, 'month', {month_sql('OLD', zone)}, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'CaVanHanh', NEW."CaVanHanh", 1);
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'LoaiSc', NEW."LoaiSc", 1);
+        IF NEW."Thoigian" IS NOT NULL THEN
+            PERFORM core_thongkesukien_bump(
+                NEW.user_id, 'month', {month_sql('NEW', zone)}, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
@@ -0,0 +1,115 @@
+"""
+Django command to benchmark recipe tag filtering on a seeded dataset.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Recipe, Tag
+from recipe.views import RecipeViewSet
+
+
+class Command(BaseCommand):
+    """Django command to compare DISTINCT joins with EXISTS filters.
+
+    The dataset is seeded inside a transaction that is rolled back, so the
+    command leaves the database untouched.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=20000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--tags-per-recipe', type=int, default=5)
+        parser.add_argument('--filter-tags', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            tag_ids = self._seed(options)
+            filter_ids = tag_ids[:options['filter_tags']]
+            for label, queryset in self._querysets(filter_ids):
+                timings, count = self._time(queryset, options['repeat'])
+                self.stdout.write(
+                    f'{label:<24} {count:>8} rows  '
+                    f'median {statistics.median(timings):8.2f} ms  '
+                    f'min {min(timings):8.2f} ms'
+                )
+            transaction.set_rollback(True)
+
+    def _seed(self, options):
+        """Create a throwaway user with recipes and random tag links."""
+        self.stdout.write(
+            f'Seeding {options["recipes"]} recipes and '
+            f'{options["tags"]} tags...'
+        )
+        self.user = get_user_model().objects.create_user(
+            email='benchmark@example.com',
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=self.user, name=f'Tag {i}')
+            for i in range(options['tags'])
+        )
+        recipes = Recipe.objects.bulk_create(
+            (
+                Recipe(
+                    user=self.user,
+                    title=f'Recipe {i}',
+                    time_minutes=10,
+                    price=Decimal('1.00'),
+                )
+                for i in range(options['recipes'])
+            ),
+            batch_size=5000,
+        )
+        per_recipe = min(options['tags_per_recipe'], len(tags))
+        Recipe.tags.through.objects.bulk_create(
+            (
+                Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                for recipe in recipes
+                for tag in random.sample(tags, per_recipe)
+            ),
+            batch_size=5000,
+        )
+
+        return [tag.id for tag in tags]
+
+    def _querysets(self, tag_ids):
+        """Return the labelled querysets to compare."""
+        view = RecipeViewSet()
+        through = Recipe.tags.through
+        recipes = Recipe.objects.filter(user=self.user).order_by('-id')
+
+        return [
+            (
+                'join + distinct (any)',
+                recipes.filter(tags__id__in=tag_ids).distinct(),
+            ),
+            (
+                'exists (any)',
+                view._filter_related(
+                    recipes, through, 'tag_id', tag_ids, False,
+                ),
+            ),
+            (
+                'grouped semi-join (all)',
+                view._filter_related(
+                    recipes, through, 'tag_id', tag_ids, True,
+                ),
+            ),
+        ]
+
+    def _time(self, queryset, repeat):
+        """Run the queryset repeat times, returning timings in ms."""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            ids = list(queryset.values_list('id', flat=True))
+            timings.append((time.perf_counter() - start) * 1000)
+
+        return timings, len(ids)
@@ -0,0 +1,20 @@
+"""
+Django command to pre-generate the OpenAPI schema.
+"""
+from django.core.management.base import BaseCommand
+
+from core.schema import generate_schema
+
+
+class Command(BaseCommand):
+    """Django command to write the schema served by api/schema/.
+
+    Run at startup and after deploying; running workers pick up the new
+    files on their next request.
+    """
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        for path in generate_schema():
+            self.stdout.write(f'Wrote {path}')
+        self.stdout.write(self.style.SUCCESS('Schema generated.'))
@@ -0,0 +1,149 @@
+"""
+Django command to maintain the monthly partitions of the event log.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    """Django command to partition the event log and keep it partitioned.
+
+    ``--convert`` converts the event table in place, once; it holds an
+    ACCESS EXCLUSIVE lock for the duration, so run it in a maintenance
+    window. Every run then creates the partitions of the coming months,
+    locking the table only when one is missing, so it is safe to run on
+    each deploy or from cron.
+
+    Converting drops the foreign keys of the link tables to the events
+    (PostgreSQL cannot reference a partitioned table without the partition
+    key), so nothing stops a link pointing at a missing event; ``--check``
+    reports such links.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ahead',
+            type=int,
+            default=settings.EVENT_LOG_PARTITIONS_AHEAD,
+            help='Months of future partitions to keep created.',
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convert the event table to a partitioned table.',
+        )
+        parser.add_argument(
+            '--detach',
+            metavar='YYYY-MM',
+            help='Detach the partition of this month for archiving, '
+                 'moving its links in batches (re-run to resume).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Events whose links are moved per transaction on --detach.',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Fail if any link points at a missing event.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if options['detach']:
+            self._detach(options['detach'], options['batch_size'])
+            return
+        if options['check']:
+            self._check()
+            return
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                partitioned = partitioning.is_partitioned(cursor)
+            if not partitioned:
+                if not options['convert']:
+                    self.stdout.write(
+                        'The event log is not partitioned; run with '
+                        '--convert to convert it.'
+                    )
+                    return
+                self._convert(options['ahead'])
+                self.stdout.write(self.style.SUCCESS(
+                    'Converted the event log to monthly partitions.'
+                ))
+            created = partitioning.ensure_partitions(options['ahead'])
+
+        for name in created:
+            self.stdout.write(f'Created partition {name}.')
+        self.stdout.write(self.style.SUCCESS('Event log partitions ready.'))
+
+    def _convert(self, ahead):
+        # Events then need a Thoigian, which the API only enforces with
+        # the setting on.
+        if not settings.EVENT_LOG_PARTITIONING:
+            raise CommandError(
+                'Set EVENT_LOG_PARTITIONING=1 on the app before converting.'
+            )
+        with connection.cursor() as cursor:
+            undated = partitioning.undated_events(cursor)
+        if undated:
+            raise CommandError(
+                f'{undated} events have no Thoigian; set it before '
+                f'converting, as it becomes part of the primary key.'
+            )
+        partitioning.convert_event_log(ahead)
+
+    def _check(self):
+        with connection.cursor() as cursor:
+            dangling = partitioning.dangling_links(cursor)
+        if dangling:
+            counts = ', '.join(
+                f'{count} in {table}' for table, count in dangling
+            )
+            raise CommandError(f'Links pointing at missing events: {counts}.')
+        self.stdout.write(self.style.SUCCESS(
+            'Every link points at an existing event.'
+        ))
+
+    def _detach(self, value, batch_size):
+        try:
+            month = datetime.strptime(value, '%Y-%m').date()
+        except ValueError:
+            raise CommandError(f'Invalid month {value!r}, expected YYYY-MM.')
+
+        name = partitioning.partition_name(month)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                attached = (
+                    partitioning.is_partitioned(cursor)
+                    and name in partitioning.partitions(cursor)
+                )
+                # A detached partition is resumed from moving its links.
+                if not attached and not partitioning.is_detached(
+                    cursor, month,
+                ):
+                    raise CommandError(
+                        f'No event log partition for {value}.'
+                    )
+            if attached:
+                partitioning.detach_partition(month)
+        moved = sum(partitioning.move_links(month, batch_size))
+
+        archives = [
+            partitioning.link_archive(table, month)
+            for table, column in partitioning.referencing_columns()
+        ]
+        tables = ' '.join(f'-t {table}' for table in [name, *archives])
+        self.stdout.write(self.style.SUCCESS(
+            f'Detached {name} and moved its {moved} links to '
+            f'{", ".join(archives)}; archive them (e.g. pg_dump {tables}) '
+            f'and drop them. Run rebuild_event_stats to drop its events '
+            f'from the statistics.'
+        ))
@@ -0,0 +1,21 @@
+"""
+Django command to delete expired token bookkeeping rows.
+"""
+from django.core.management.base import BaseCommand
+
+from core import tokens
+
+
+class Command(BaseCommand):
+    """Django command to prune the token deny-list and refresh families.
+
+    Rows are only needed until their tokens would have expired, so this
+    can run at any time; run it on each deploy and from cron.
+    """
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        deleted = tokens.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired token rows.'
+        ))
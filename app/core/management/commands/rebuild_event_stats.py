@@ -0,0 +1,76 @@
+"""
+Django command to rebuild the event statistics summary table.
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncMonth
+
+from core.eventstats import stats_function_sql
+from core.models import Nhatkysukien, Thongkesukien
+
+
+class Command(BaseCommand):
+    """Django command to recount Thongkesukien from the event tables.
+
+    The event tables are locked against writes while the counts are
+    rebuilt, so the triggers cannot interleave with the rebuild. The
+    trigger function is re-created first, so months follow the current
+    settings.TIME_ZONE after the zone is changed.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def _rows(self):
+        """Yield the summary rows with one GROUP BY per dimension."""
+        events = Nhatkysukien.objects.order_by()
+        for field in (Thongkesukien.CAVANHANH, Thongkesukien.LOAISC):
+            for row in events.values('user', value=F(field)).annotate(
+                count=Count('id'),
+            ):
+                yield Thongkesukien(
+                    user_id=row['user'], dimension=field,
+                    value=row['value'], count=row['count'],
+                )
+
+        months = events.filter(Thoigian__isnull=False).values(
+            'user', month=TruncMonth('Thoigian'),
+        ).annotate(count=Count('id'))
+        for row in months:
+            yield Thongkesukien(
+                user_id=row['user'], dimension=Thongkesukien.MONTH,
+                value=row['month'].strftime('%Y-%m'), count=row['count'],
+            )
+
+        # Skip links left without an event (the table has no foreign key
+        # to the events once partitioned).
+        links = Nhatkysukien.xulysukientbs.through.objects.filter(
+            nhatkysukien__user__isnull=False,
+        ).order_by().values(
+            user=F('xulysukientb__user'), value=F('xulysukientb__Tomay'),
+        ).annotate(count=Count('id'))
+        for row in links:
+            yield Thongkesukien(
+                user_id=row['user'], dimension=Thongkesukien.TOMAY,
+                value=row['value'], count=row['count'],
+            )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'LOCK TABLE core_nhatkysukien, '
+                    'core_nhatkysukien_xulysukientbs, core_xulysukientb '
+                    'IN SHARE MODE'
+                )
+                cursor.execute(stats_function_sql())
+            Thongkesukien.objects.all().delete()
+            rows = Thongkesukien.objects.bulk_create(
+                self._rows(), batch_size=options['batch_size'],
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {len(rows)} event statistics rows.'
+        ))
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_auto_20250222_1551'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(fields=['user', '-id'], name='nhatkysukien_user_id_desc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', '-id'], name='recipe_user_id_desc_idx'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+# Accent-insensitive configuration: words are passed through the unaccent
+# dictionary before the simple one, so "máy biến áp" matches "may bien ap".
+CREATE_CONFIG_SQL = """
+CREATE TEXT SEARCH CONFIGURATION vietnamese_unaccent (COPY = simple);
+ALTER TEXT SEARCH CONFIGURATION vietnamese_unaccent
+    ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+"""
+
+DROP_CONFIG_SQL = """
+DROP TEXT SEARCH CONFIGURATION IF EXISTS vietnamese_unaccent;
+"""
+
+SEARCH_COLUMNS = {
+    'core_nhatkysukien': [
+        ('title', 'A'),
+        ('"Hientuong_Dienbien"', 'B'),
+        ('"Quatrinh_Kt"', 'B'),
+    ],
+    'core_xulysukientb': [
+        ('"Tomay"', 'A'),
+        ('title', 'A'),
+        ('"Noidung_xuly"', 'B'),
+        ('"Phantich_Nguyennhan_Xl"', 'B'),
+    ],
+}
+
+
+def search_vector_sql(table, row):
+    """Return the weighted tsvector expression for a table row."""
+    return ' || '.join(
+        f"setweight(to_tsvector('vietnamese_unaccent', "
+        f"coalesce({row}.{column}, '')), '{weight}')"
+        for column, weight in SEARCH_COLUMNS[table]
+    )
+
+
+def create_trigger_sql(table):
+    return f"""
+CREATE FUNCTION {table}_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {search_vector_sql(table, 'NEW')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER {table}_search_vector_trigger
+BEFORE INSERT OR UPDATE ON {table}
+FOR EACH ROW EXECUTE FUNCTION {table}_search_vector_update();
+
+UPDATE {table} SET search_vector = {search_vector_sql(table, table)};
+"""
+
+
+def drop_trigger_sql(table):
+    return f"""
+DROP TRIGGER IF EXISTS {table}_search_vector_trigger ON {table};
+DROP FUNCTION IF EXISTS {table}_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_recipe_search_vector'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.UnaccentExtension(),
+        migrations.RunSQL(CREATE_CONFIG_SQL, DROP_CONFIG_SQL),
+        migrations.AddField(
+            model_name='nhatkysukien',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='xulysukientb',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='nhatkysukien_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xulysukientb',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='xulysukientb_search_idx'),
+        ),
+        migrations.RunSQL(
+            create_trigger_sql('core_nhatkysukien'),
+            drop_trigger_sql('core_nhatkysukien'),
+        ),
+        migrations.RunSQL(
+            create_trigger_sql('core_xulysukientb'),
+            drop_trigger_sql('core_xulysukientb'),
+        ),
+    ]
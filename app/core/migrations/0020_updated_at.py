@@ -0,0 +1,40 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nhatkysukien',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='xulysukientb',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(fields=['user', 'updated_at'], name='nhatkysukien_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'updated_at'], name='recipe_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='xulysukientb',
+            index=models.Index(fields=['user', 'updated_at'], name='xulysukientb_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(fields=['user', '-Thoigian'], name='nhatkysukien_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(fields=['user', 'LoaiSc', '-Thoigian'], name='nhatkysukien_loaisc_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(fields=['user', 'CaVanHanh', '-Thoigian'], name='nhatkysukien_ca_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(fields=['user', 'Hethong_Thietbi', '-Thoigian'], name='nhatkysukien_htb_time_idx'),
+        ),
+    ]
@@ -0,0 +1,166 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:23
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Migration 0027 replaces this with settings.TIME_ZONE (core.eventstats).
+MONTH_SQL = "to_char({row}.\"Thoigian\" AT TIME ZONE 'Asia/Ho_Chi_Minh', 'YYYY-MM')"
+
+CREATE_TRIGGERS_SQL = f"""
+CREATE FUNCTION core_thongkesukien_bump(
+    p_user bigint, p_dimension text, p_value text, p_delta integer
+) RETURNS void AS $$
+BEGIN
+    -- Decrements never insert, so deleting a user (which may remove these
+    -- rows before the user's events) cannot resurrect a counter.
+    IF p_delta < 0 THEN
+        UPDATE core_thongkesukien SET count = count + p_delta
+        WHERE user_id = p_user AND dimension = p_dimension
+            AND value = coalesce(p_value, '');
+    ELSE
+        INSERT INTO core_thongkesukien (user_id, dimension, value, count)
+        VALUES (p_user, p_dimension, coalesce(p_value, ''), p_delta)
+        ON CONFLICT (user_id, dimension, value)
+        DO UPDATE SET count = core_thongkesukien.count + EXCLUDED.count;
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE FUNCTION core_nhatkysukien_stats_update() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'CaVanHanh', OLD."CaVanHanh", -1);
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'LoaiSc', OLD."LoaiSc", -1);
+        IF OLD."Thoigian" IS NOT NULL THEN
+            PERFORM core_thongkesukien_bump(
+                OLD.user_id, 'month', {MONTH_SQL.format(row='OLD')}, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'CaVanHanh', NEW."CaVanHanh", 1);
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'LoaiSc', NEW."LoaiSc", 1);
+        IF NEW."Thoigian" IS NOT NULL THEN
+            PERFORM core_thongkesukien_bump(
+                NEW.user_id, 'month', {MONTH_SQL.format(row='NEW')}, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_nhatkysukien_stats_trigger
+AFTER INSERT OR DELETE ON core_nhatkysukien
+FOR EACH ROW EXECUTE FUNCTION core_nhatkysukien_stats_update();
+
+CREATE TRIGGER core_nhatkysukien_stats_update_trigger
+AFTER UPDATE ON core_nhatkysukien
+FOR EACH ROW
+WHEN ((OLD.user_id, OLD."CaVanHanh", OLD."LoaiSc", OLD."Thoigian")
+      IS DISTINCT FROM
+      (NEW.user_id, NEW."CaVanHanh", NEW."LoaiSc", NEW."Thoigian"))
+EXECUTE FUNCTION core_nhatkysukien_stats_update();
+
+CREATE FUNCTION core_nhatkysukien_xulysukientbs_stats_update()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM core_thongkesukien_bump(x.user_id, 'Tomay', x."Tomay", -1)
+        FROM core_xulysukientb x WHERE x.id = OLD.xulysukientb_id;
+    ELSE
+        PERFORM core_thongkesukien_bump(x.user_id, 'Tomay', x."Tomay", 1)
+        FROM core_xulysukientb x WHERE x.id = NEW.xulysukientb_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_nhatkysukien_xulysukientbs_stats_trigger
+AFTER INSERT OR DELETE ON core_nhatkysukien_xulysukientbs
+FOR EACH ROW EXECUTE FUNCTION core_nhatkysukien_xulysukientbs_stats_update();
+
+CREATE FUNCTION core_xulysukientb_stats_update() RETURNS trigger AS $$
+DECLARE
+    links integer;
+BEGIN
+    SELECT count(*) INTO links
+    FROM core_nhatkysukien_xulysukientbs WHERE xulysukientb_id = NEW.id;
+    IF links > 0 THEN
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'Tomay', OLD."Tomay", -links);
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'Tomay', NEW."Tomay", links);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_xulysukientb_stats_trigger
+AFTER UPDATE ON core_xulysukientb
+FOR EACH ROW
+WHEN ((OLD.user_id, OLD."Tomay") IS DISTINCT FROM (NEW.user_id, NEW."Tomay"))
+EXECUTE FUNCTION core_xulysukientb_stats_update();
+"""
+
+DROP_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS core_xulysukientb_stats_trigger ON core_xulysukientb;
+DROP FUNCTION IF EXISTS core_xulysukientb_stats_update();
+DROP TRIGGER IF EXISTS core_nhatkysukien_xulysukientbs_stats_trigger
+    ON core_nhatkysukien_xulysukientbs;
+DROP FUNCTION IF EXISTS core_nhatkysukien_xulysukientbs_stats_update();
+DROP TRIGGER IF EXISTS core_nhatkysukien_stats_update_trigger
+    ON core_nhatkysukien;
+DROP TRIGGER IF EXISTS core_nhatkysukien_stats_trigger ON core_nhatkysukien;
+DROP FUNCTION IF EXISTS core_nhatkysukien_stats_update();
+DROP FUNCTION IF EXISTS core_thongkesukien_bump(bigint, text, text, integer);
+"""
+
+BACKFILL_SQL = f"""
+INSERT INTO core_thongkesukien (user_id, dimension, value, count)
+SELECT user_id, 'CaVanHanh', "CaVanHanh", count(*)
+FROM core_nhatkysukien GROUP BY 1, 3
+UNION ALL
+SELECT user_id, 'LoaiSc', "LoaiSc", count(*)
+FROM core_nhatkysukien GROUP BY 1, 3
+UNION ALL
+SELECT user_id, 'month', {MONTH_SQL.format(row='core_nhatkysukien')}, count(*)
+FROM core_nhatkysukien WHERE "Thoigian" IS NOT NULL GROUP BY 1, 3
+UNION ALL
+SELECT x.user_id, 'Tomay', x."Tomay", count(*)
+FROM core_nhatkysukien_xulysukientbs l
+JOIN core_xulysukientb x ON x.id = l.xulysukientb_id
+GROUP BY 1, 3;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_event_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Thongkesukien',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('Tomay', 'Tổ máy'), ('CaVanHanh', 'Ca vận hành'), ('LoaiSc', 'Loại sự cố'), ('month', 'Tháng')], max_length=20)),
+                ('value', models.TextField(blank=True)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='thongkesukien',
+            constraint=models.UniqueConstraint(fields=('user', 'dimension', 'value'), name='thongkesukien_user_dimension_value_uniq'),
+        ),
+        migrations.RunSQL(
+            CREATE_TRIGGERS_SQL + BACKFILL_SQL,
+            DROP_TRIGGERS_SQL,
+        ),
+    ]
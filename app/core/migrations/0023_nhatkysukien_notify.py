@@ -0,0 +1,35 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:33
+
+from django.db import migrations
+
+
+# Wakes the change feed listeners (nhatkysukien.feed). NOTIFY folds
+# identical payloads of one transaction, so a batch sends one per user.
+CREATE_TRIGGER_SQL = """
+CREATE FUNCTION core_nhatkysukien_notify() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('nhatkysukien_changes', NEW.user_id::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER core_nhatkysukien_notify_trigger
+AFTER INSERT OR UPDATE ON core_nhatkysukien
+FOR EACH ROW EXECUTE FUNCTION core_nhatkysukien_notify();
+"""
+
+DROP_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS core_nhatkysukien_notify_trigger ON core_nhatkysukien;
+DROP FUNCTION IF EXISTS core_nhatkysukien_notify();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_event_statistics'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_TRIGGER_SQL, DROP_TRIGGER_SQL),
+    ]
@@ -0,0 +1,114 @@
+# Generated by Django 4.0.10 on 2026-10-18 14:34
+
+from django.db import migrations, models
+
+
+# Text fields of the handling records, merged when duplicates are folded.
+TEXT_FIELDS = [
+    'Noidung_xuly', 'Quatrinh_kiemtra', 'Dexuat_lienquan', 'Chidao',
+    'Tinhtrang_xuly', 'Quatrinh_Xuly', 'Phantich_Nguyennhan_Xl',
+    'Donvi_ghinhan', 'Cavanhanh_ghinhan',
+]
+
+
+# The oldest non-empty value of a column in the record's duplicate group.
+FIRST_VALUE_SQL = """(
+    SELECT y."{column}" FROM core_xulysukientb y
+    JOIN xulysukientb_groups m ON m.id = y.id
+    WHERE m.keep_id = g.keep_id AND y."{column}" <> ''
+    ORDER BY y.id LIMIT 1
+)"""
+
+# Every distinct non-empty text of the group, oldest first, separated by
+# a blank line.
+ALL_VALUES_SQL = """(
+    SELECT string_agg(value, E'\\n\\n' ORDER BY first_id) FROM (
+        SELECT y."{column}" AS value, min(y.id) AS first_id
+        FROM core_xulysukientb y
+        JOIN xulysukientb_groups m ON m.id = y.id
+        WHERE m.keep_id = g.keep_id AND y."{column}" <> ''
+        GROUP BY y."{column}"
+    ) group_values
+)"""
+
+# Fold each duplicate group's notes into its oldest record. The title and
+# handling time come from the oldest record that has one.
+MERGE_SQL = """
+UPDATE core_xulysukientb x SET
+    title = coalesce({title}, ''),
+    "Thoigian_xuly" = coalesce(x."Thoigian_xuly", (
+        SELECT y."Thoigian_xuly" FROM core_xulysukientb y
+        JOIN xulysukientb_groups m ON m.id = y.id
+        WHERE m.keep_id = g.keep_id AND y."Thoigian_xuly" IS NOT NULL
+        ORDER BY y.id LIMIT 1
+    )),
+    {texts},
+    updated_at = now()
+FROM (SELECT DISTINCT keep_id FROM xulysukientb_groups) g
+WHERE x.id = g.keep_id;
+""".format(
+    title=FIRST_VALUE_SQL.format(column='title'),
+    texts=',\n    '.join(
+        f'"{column}" = coalesce({ALL_VALUES_SQL.format(column=column)}, \'\')'
+        for column in TEXT_FIELDS
+    ),
+)
+
+
+# Merge duplicate (user, Tomay) records into the oldest one: their notes
+# are folded into it, events are relinked to it (and marked modified),
+# then the duplicates are deleted. Link rows are inserted and deleted
+# rather than updated so the event statistics triggers keep their Tomay
+# counts right. Foreign keys are checked immediately, since pending
+# checks would block the ALTER TABLE.
+DEDUPE_SQL = """
+SET CONSTRAINTS ALL IMMEDIATE;
+
+CREATE TEMPORARY TABLE xulysukientb_groups ON COMMIT DROP AS
+SELECT id, keep_id FROM (
+    SELECT id,
+        min(id) OVER (PARTITION BY user_id, "Tomay") AS keep_id,
+        count(*) OVER (PARTITION BY user_id, "Tomay") AS size
+    FROM core_xulysukientb
+) ranked
+WHERE size > 1;
+""" + MERGE_SQL + """
+CREATE TEMPORARY TABLE xulysukientb_duplicates ON COMMIT DROP AS
+SELECT id, keep_id FROM xulysukientb_groups WHERE id <> keep_id;
+
+UPDATE core_nhatkysukien SET updated_at = now()
+WHERE id IN (
+    SELECT l.nhatkysukien_id FROM core_nhatkysukien_xulysukientbs l
+    JOIN xulysukientb_duplicates d ON d.id = l.xulysukientb_id
+);
+
+INSERT INTO core_nhatkysukien_xulysukientbs (nhatkysukien_id, xulysukientb_id)
+SELECT DISTINCT l.nhatkysukien_id, d.keep_id
+FROM core_nhatkysukien_xulysukientbs l
+JOIN xulysukientb_duplicates d ON d.id = l.xulysukientb_id
+ON CONFLICT (nhatkysukien_id, xulysukientb_id) DO NOTHING;
+
+DELETE FROM core_nhatkysukien_xulysukientbs l
+USING xulysukientb_duplicates d WHERE l.xulysukientb_id = d.id;
+
+DELETE FROM core_xulysukientb x
+USING xulysukientb_duplicates d WHERE x.id = d.id;
+
+DROP TABLE xulysukientb_duplicates;
+DROP TABLE xulysukientb_groups;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_nhatkysukien_notify'),
+    ]
+
+    operations = [
+        migrations.RunSQL(DEDUPE_SQL, migrations.RunSQL.noop),
+        migrations.AddConstraint(
+            model_name='xulysukientb',
+            constraint=models.UniqueConstraint(fields=('user', 'Tomay'), name='xulysukientb_user_tomay_uniq'),
+        ),
+    ]
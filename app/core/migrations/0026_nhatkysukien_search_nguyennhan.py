@@ -0,0 +1,51 @@
+from django.db import migrations
+
+
+def search_vector_sql(row, columns):
+    """Return the weighted tsvector expression for an event row."""
+    return ' || '.join(
+        f"setweight(to_tsvector('vietnamese_unaccent', "
+        f"coalesce({row}.{column}, '')), '{weight}')"
+        for column, weight in columns
+    )
+
+
+def update_trigger_sql(columns):
+    """Replace the search trigger function of migration 0018 and backfill."""
+    return f"""
+CREATE OR REPLACE FUNCTION core_nhatkysukien_search_vector_update()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {search_vector_sql('NEW', columns)};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+UPDATE core_nhatkysukien
+SET search_vector = {search_vector_sql('core_nhatkysukien', columns)};
+"""
+
+
+OLD_COLUMNS = [
+    ('title', 'A'),
+    ('"Hientuong_Dienbien"', 'B'),
+    ('"Quatrinh_Kt"', 'B'),
+]
+
+NEW_COLUMNS = OLD_COLUMNS + [
+    ('"Phantich_Nguyennhan"', 'B'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            update_trigger_sql(NEW_COLUMNS),
+            update_trigger_sql(OLD_COLUMNS),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from django.db import migrations
+
+
+# settings.TIME_ZONE when this migration was written. Later zone changes
+# are applied by the rebuild_event_stats command (core.eventstats), not
+# here, so replaying the history always gives the same function.
+ZONE = 'Asia/Ho_Chi_Minh'
+
+MONTH_SQL = f"to_char({{row}}.\"Thoigian\" AT TIME ZONE '{ZONE}', 'YYYY-MM')"
+
+STATS_FUNCTION_SQL = f"""
+CREATE OR REPLACE FUNCTION core_nhatkysukien_stats_update()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'CaVanHanh', OLD."CaVanHanh", -1);
+        PERFORM core_thongkesukien_bump(
+            OLD.user_id, 'LoaiSc', OLD."LoaiSc", -1);
+        IF OLD."Thoigian" IS NOT NULL THEN
+            PERFORM core_thongkesukien_bump(
+                OLD.user_id, 'month', {MONTH_SQL.format(row='OLD')}, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'CaVanHanh', NEW."CaVanHanh", 1);
+        PERFORM core_thongkesukien_bump(
+            NEW.user_id, 'LoaiSc', NEW."LoaiSc", 1);
+        IF NEW."Thoigian" IS NOT NULL THEN
+            PERFORM core_thongkesukien_bump(
+                NEW.user_id, 'month', {MONTH_SQL.format(row='NEW')}, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+REBUCKET_MONTHS_SQL = f"""
+LOCK TABLE core_nhatkysukien IN SHARE MODE;
+DELETE FROM core_thongkesukien WHERE dimension = 'month';
+INSERT INTO core_thongkesukien (user_id, dimension, value, count)
+SELECT user_id, 'month', {MONTH_SQL.format(row='core_nhatkysukien')}, count(*)
+FROM core_nhatkysukien WHERE "Thoigian" IS NOT NULL GROUP BY 1, 3;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0026_nhatkysukien_search_nguyennhan'),
+    ]
+
+    operations = [
+        # Migration 0022 created the same function, so there is nothing
+        # to restore on the way back.
+        migrations.RunSQL(
+            STATS_FUNCTION_SQL + REBUCKET_MONTHS_SQL,
+            migrations.RunSQL.noop,
+        ),
+    ]
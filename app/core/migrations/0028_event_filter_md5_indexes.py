@@ -0,0 +1,39 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:05
+
+from django.db import migrations, models
+import django.db.models.expressions
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0027_event_stats_time_zone'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='nhatkysukien',
+            name='nhatkysukien_loaisc_time_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='nhatkysukien',
+            name='nhatkysukien_ca_time_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='nhatkysukien',
+            name='nhatkysukien_htb_time_idx',
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(models.F('user'), django.db.models.functions.text.MD5('LoaiSc'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('Thoigian'), descending=True), name='nhatkysukien_loaisc_md5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(models.F('user'), django.db.models.functions.text.MD5('CaVanHanh'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('Thoigian'), descending=True), name='nhatkysukien_ca_md5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nhatkysukien',
+            index=models.Index(models.F('user'), django.db.models.functions.text.MD5('Hethong_Thietbi'), django.db.models.expressions.OrderBy(django.db.models.expressions.F('Thoigian'), descending=True), name='nhatkysukien_htb_md5_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.0.10 on 2026-10-18 16:20
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+def bump_function_sql(key):
+    """Return the SQL replacing the counter upsert of migration 0022."""
+    return f"""
+CREATE OR REPLACE FUNCTION core_thongkesukien_bump(
+    p_user bigint, p_dimension text, p_value text, p_delta integer
+) RETURNS void AS $$
+BEGIN
+    -- Decrements never insert, so deleting a user (which may remove these
+    -- rows before the user's events) cannot resurrect a counter.
+    IF p_delta < 0 THEN
+        UPDATE core_thongkesukien SET count = count + p_delta
+        WHERE user_id = p_user AND dimension = p_dimension
+            AND {key.format(value='value')}
+                = {key.format(value="coalesce(p_value, '')")}
+            AND value = coalesce(p_value, '');
+    ELSE
+        INSERT INTO core_thongkesukien (user_id, dimension, value, count)
+        VALUES (p_user, p_dimension, coalesce(p_value, ''), p_delta)
+        ON CONFLICT (user_id, dimension, {key.format(value='value')})
+        DO UPDATE SET count = core_thongkesukien.count + EXCLUDED.count;
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0028_event_filter_md5_indexes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='thongkesukien',
+            constraint=models.UniqueConstraint(models.F('user'), models.F('dimension'), django.db.models.functions.text.MD5('value'), name='thongkesukien_user_dimension_md5_uniq'),
+        ),
+        migrations.RunSQL(
+            bump_function_sql('md5({value})'),
+            bump_function_sql('{value}'),
+        ),
+        migrations.RemoveConstraint(
+            model_name='thongkesukien',
+            name='thongkesukien_user_dimension_value_uniq',
+        ),
+    ]
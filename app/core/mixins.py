@@ -0,0 +1,281 @@
+"""
+Reusable viewset mixins.
+"""
+import hashlib
+from itertools import islice
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max, prefetch_related_objects
+from django.db.models.functions import Left
+from django.http import StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from drf_spectacular.utils import (
+    extend_schema,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+from rest_framework import serializers
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+
+from core.asyncviews import ThreadedStreamingHttpResponse
+from core.renderers import CSVRenderer, NDJSONRenderer
+from core.throttling import ClientIPThrottle, CredentialThrottle
+
+
+class ThrottleFirstMixin:
+    """Check throttles before authentication and body parsing.
+
+    DRF throttles after authenticating, so a flood still costs password
+    hashing or token lookups. The throttles used here identify clients
+    from the connection and headers only. Set ``throttle_scope`` on the
+    view or on an ``@action``; other actions are not throttled.
+    """
+    throttle_classes = [ClientIPThrottle, CredentialThrottle]
+    throttle_scope = None
+
+    def initial(self, request, *args, **kwargs):
+        self.check_throttles(request)
+        self._throttles_checked = True
+        super().initial(request, *args, **kwargs)
+
+    def check_throttles(self, request):
+        if not getattr(self, '_throttles_checked', False):
+            super().check_throttles(request)
+
+
+class ExportMixin:
+    """Add an ``export`` action streaming the list as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and serialized one chunk at
+    a time, so memory stays flat and the first bytes are sent before the
+    query has been fully read. Pick the format with ``?format=ndjson``
+    (default) or ``?format=csv``, or with the Accept header. Under ASGI
+    the rows are read on a thread of their own and awaited by the loop
+    (see ThreadedStreamingHttpResponse).
+    """
+    export_chunk_size = settings.EXPORT_CHUNK_SIZE
+    # Relations to prefetch per chunk; QuerySet.iterator() skips
+    # prefetch_related() on this Django version.
+    export_prefetch_related = ()
+
+    def _export_rows(self, queryset, prefetch):
+        """Yield serialized rows, one chunk of objects at a time."""
+        objects = queryset.iterator(chunk_size=self.export_chunk_size)
+        while chunk := list(islice(objects, self.export_chunk_size)):
+            prefetch_related_objects(chunk, *prefetch)
+            yield from self.get_serializer(chunk, many=True).data
+
+    @extend_schema(
+        responses={
+            (200, NDJSONRenderer.media_type): OpenApiTypes.STR,
+            (200, CSVRenderer.media_type): OpenApiTypes.STR,
+        },
+    )
+    @action(
+        methods=['GET'],
+        detail=False,
+        renderer_classes=[NDJSONRenderer, CSVRenderer],
+        pagination_class=None,
+        throttle_scope='export',
+    )
+    def export(self, request):
+        """Stream all rows of the list as a file download."""
+        queryset = self.filter_queryset(self.get_queryset())
+        renderer = request.accepted_renderer
+        fields = list(self.get_serializer().fields)
+        prefetch = [
+            lookup for lookup in self.export_prefetch_related
+            if lookup.split('__')[0] in fields
+        ]
+        content = renderer.stream(
+            self._export_rows(queryset, prefetch), fields,
+        )
+        response_class = StreamingHttpResponse
+        if isinstance(request._request, ASGIRequest):
+            response_class = ThreadedStreamingHttpResponse
+        response = response_class(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        filename = f'{self.basename}.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Let nginx pass chunks through instead of buffering the export.
+        response['X-Accel-Buffering'] = 'no'
+
+        return response
+
+
+class ConditionalGetMixin:
+    """Answer list and retrieve requests with 304 when nothing changed.
+
+    Validators come from a cheap aggregate, never from the serialized body:
+    lists use a weak ETag over the row count and latest ``updated_at`` of
+    the filtered queryset (a count is needed to notice deletions), details
+    use the row's ``updated_at`` for both ETag and Last-Modified. Writes
+    that bypass ``save()`` must bump ``updated_at`` themselves.
+    """
+    last_modified_field = 'updated_at'
+
+    def _etag(self, *parts):
+        key = ':'.join(str(part) for part in (
+            self.request.user.pk, self.request.get_full_path(), *parts,
+        ))
+        return f'W/"{hashlib.sha1(key.encode()).hexdigest()}"'
+
+    def _conditional_response(self, etag, last_modified=None):
+        """Return a 304 response if the client copy is still current."""
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        response = get_conditional_response(
+            self.request, etag=etag, last_modified=timestamp,
+        )
+        if response is not None:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        stats = self.filter_queryset(self.get_queryset()).aggregate(
+            count=Count('pk'),
+            last_modified=Max(self.last_modified_field),
+        )
+        etag = self._etag(stats['count'], stats['last_modified'])
+        response = self._conditional_response(etag)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            response['ETag'] = etag
+
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        last_modified = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]},
+        ).values_list(self.last_modified_field, flat=True).first()
+        if last_modified is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        etag = self._etag(last_modified)
+        response = self._conditional_response(etag, last_modified)
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+
+        return response
+
+
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of the only fields to return.',
+    ),
+    OpenApiParameter(
+        'omit',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to leave out.',
+    ),
+    OpenApiParameter(
+        'excerpt',
+        OpenApiTypes.INT,
+        description='Truncate long text fields to this many characters.',
+    ),
+]
+
+
+class SparseFieldsMixin:
+    """Let GET requests pick fields with ``?fields=`` and ``?omit=``.
+
+    Fields that are not returned are not read either: the queryset is
+    restricted with ``only()`` and relations that are no longer serialized
+    are not prefetched. ``?excerpt=N`` truncates the text fields listed in
+    ``excerpt_fields`` to N characters in SQL, so the full values are
+    never sent to the application.
+    """
+    excerpt_fields = ()
+
+    def _sparse(self):
+        """Return whether the request asks for a sparse response."""
+        request = getattr(self, 'request', None)
+        return request is not None and request.method == 'GET' and any(
+            param in request.query_params
+            for param in ('fields', 'omit', 'excerpt')
+        )
+
+    def _names(self, param):
+        value = self.request.query_params.get(param)
+        if value is None:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def _excerpt_length(self):
+        value = self.request.query_params.get('excerpt')
+        if value is None:
+            return None
+        if not value.isdigit() or int(value) < 1:
+            raise ValidationError({'excerpt': 'Must be a positive integer.'})
+        return int(value)
+
+    def _prune(self, serializer):
+        """Drop unselected fields and swap in SQL excerpts of long texts."""
+        names = list(serializer.fields)
+        selected = self._names('fields') or names
+        omitted = self._names('omit') or []
+        unknown = sorted((set(selected) | set(omitted)) - set(names))
+        if unknown:
+            raise ValidationError(
+                {'fields': f'Unknown fields: {", ".join(unknown)}.'}
+            )
+        for name in names:
+            if name not in selected or name in omitted:
+                serializer.fields.pop(name)
+
+        if self._excerpt_length():
+            for name in self.excerpt_fields:
+                if name in serializer.fields:
+                    serializer.fields[name] = serializers.CharField(
+                        source=f'{name}_excerpt', read_only=True,
+                    )
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self._sparse():
+            self._prune(getattr(serializer, 'child', serializer))
+        return serializer
+
+    def filter_queryset(self, queryset):
+        """Read only the columns and relations of the selected fields."""
+        queryset = super().filter_queryset(queryset)
+        if not self._sparse():
+            return queryset
+
+        columns = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        sources = [
+            field.source.split('.')[0]
+            for field in self.get_serializer().fields.values()
+        ]
+        if '*' in sources:
+            return queryset
+
+        lookups = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, 'prefetch_through', lookup).split('__')[0]
+            in sources
+        ]
+        queryset = queryset.prefetch_related(None).prefetch_related(*lookups)
+        length = self._excerpt_length()
+        if length:
+            queryset = queryset.annotate(**{
+                f'{name}_excerpt': Left(name, length)
+                for name in self.excerpt_fields
+                if f'{name}_excerpt' in sources
+            })
+
+        return queryset.only(
+            queryset.model._meta.pk.name,
+            *[source for source in sources if source in columns],
+        )
@@ -6,7 +6,11 @@ import os
 
 
 from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import MD5
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -71,6 +75,41 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Resized copies of image, generated in the background.
+    image_thumbnail = models.ImageField(
+        null=True,
+        editable=False,
+        upload_to=recipe_image_file_path,
+    )
+    image_medium = models.ImageField(
+        null=True,
+        editable=False,
+        upload_to=recipe_image_file_path,
+    )
+    image_webp = models.ImageField(
+        null=True,
+        editable=False,
+        upload_to=recipe_image_file_path,
+    )
+    # Maintained by the core_recipe_search_vector_trigger database trigger.
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='recipe_user_id_desc_idx',
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='recipe_user_updated_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -119,6 +158,41 @@ class Nhatkysukien(models.Model):
     Donvi_khacPhuc = models.TextField(blank=True)
     # Không cần xulysukientbs ở đây nữa
     xulysukientbs = models.ManyToManyField('Xulysukientb', blank=True)
+    # Maintained by the core_nhatkysukien_search_vector_trigger trigger.
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-id'],
+                name='nhatkysukien_user_id_desc_idx',
+            ),
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='nhatkysukien_user_updated_idx',
+            ),
+            models.Index(
+                fields=['user', '-Thoigian'],
+                name='nhatkysukien_user_time_idx',
+            ),
+            models.Index(
+                'user', MD5('LoaiSc'), F('Thoigian').desc(),
+                name='nhatkysukien_loaisc_md5_idx',
+            ),
+            models.Index(
+                'user', MD5('CaVanHanh'), F('Thoigian').desc(),
+                name='nhatkysukien_ca_md5_idx',
+            ),
+            models.Index(
+                'user', MD5('Hethong_Thietbi'), F('Thoigian').desc(),
+                name='nhatkysukien_htb_md5_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='nhatkysukien_search_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -143,6 +217,98 @@ class Xulysukientb(models.Model):
     Phantich_Nguyennhan_Xl = models.TextField(blank=True)
     Donvi_ghinhan = models.TextField(blank=True)
     Cavanhanh_ghinhan = models.TextField(blank=True)
+    # Maintained by the core_xulysukientb_search_vector_trigger trigger.
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='xulysukientb_user_updated_idx',
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='xulysukientb_search_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'Tomay'],
+                name='xulysukientb_user_tomay_uniq',
+            ),
+        ]
 
     def __str__(self):
         return self.title if self.title else "Xử lý sự kiện"
+
+
+class Thongkesukien(models.Model):
+    """Số sự kiện theo tổ máy, ca vận hành, loại sự cố và tháng.
+
+    Rows are kept up to date by the triggers created in migration 0022 and
+    can be rebuilt with the ``rebuild_event_stats`` command. Months are
+    taken in settings.TIME_ZONE (core.eventstats).
+    """
+    TOMAY = 'Tomay'
+    CAVANHANH = 'CaVanHanh'
+    LOAISC = 'LoaiSc'
+    MONTH = 'month'
+    DIMENSION_CHOICES = [
+        (TOMAY, 'Tổ máy'),
+        (CAVANHANH, 'Ca vận hành'),
+        (LOAISC, 'Loại sự cố'),
+        (MONTH, 'Tháng'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    dimension = models.CharField(max_length=20, choices=DIMENSION_CHOICES)
+    # Tomay / CaVanHanh / LoaiSc value, or YYYY-MM for the month dimension.
+    value = models.TextField(blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Keyed on md5(value): a btree cannot hold long values.
+            models.UniqueConstraint(
+                'user', 'dimension', MD5('value'),
+                name='thongkesukien_user_dimension_md5_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.dimension}={self.value}: {self.count}'
+
+
+class RevokedToken(models.Model):
+    """Deny-list of signed access tokens revoked before they expire.
+
+    Rows are only needed until ``expires_at`` and are deleted by the
+    ``prune_tokens`` command (see core.tokens).
+    """
+    jti = models.CharField(max_length=32, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class RefreshTokenFamily(models.Model):
+    """Refresh tokens descending from one login.
+
+    Each refresh bumps ``generation``, and only a refresh token of the
+    current generation is accepted, so each can be used once. Rows past
+    ``expires_at`` are deleted by the ``prune_tokens`` command.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    generation = models.IntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f'{self.user_id}/{self.pk}:{self.generation}'
@@ -0,0 +1,41 @@
+"""
+Pagination classes shared by the API apps.
+"""
+from django.conf import settings
+
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """Opt-in cursor pagination keyed on the primary key.
+
+    Pages are located with ``WHERE id < <cursor>`` so every page is an
+    index seek, however deep the client has paged. Requests that send
+    neither ``cursor`` nor ``page_size`` get the full, unpaginated list.
+    """
+    ordering = '-id'
+    page_size = settings.PAGINATION_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Paginate only when the client asks for it."""
+        params = request.query_params
+        if (
+            self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        return super().paginate_queryset(queryset, request, view)
+
+
+class SearchPagination(PageNumberPagination):
+    """Page number pagination for relevance-ranked search results.
+
+    Ranked hits have no stable key to seek on, so pages are numbered; the
+    offset only ever spans matching rows found through the search index.
+    """
+    page_size = settings.PAGINATION_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.PAGINATION_MAX_PAGE_SIZE
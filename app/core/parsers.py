@@ -0,0 +1,36 @@
+"""
+Parsers for streamed file imports.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """Parse newline delimited JSON lazily, one line at a time.
+
+    ``request.data`` becomes an iterator of ``(line number, object)`` pairs;
+    lines that are not valid JSON yield a ``ParseError`` instead of an object
+    so the caller can report them without aborting the whole body.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Return an iterator over the parsed lines of the stream."""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if stream is None:
+            return iter(())
+
+        return self._lines(stream, encoding)
+
+    def _lines(self, stream, encoding):
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line.decode(encoding))
+            except ValueError as exc:
+                yield line_number, ParseError(f'JSON parse error - {exc}')
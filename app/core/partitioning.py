@@ -0,0 +1,345 @@
+"""
+Monthly range partitioning of the nhật ký sự kiện table on ``Thoigian``.
+
+Partitioning is optional. ``convert_event_log`` turns the existing table
+into a partitioned one in place (a one-off, run by
+``partition_event_log --convert``), after which every month lives in its
+own ``core_nhatkysukien_pYYYY_MM`` partition and rows outside every
+partition land in ``core_nhatkysukien_default``.
+
+PostgreSQL requires unique constraints on a partitioned table to include
+the partition key, so the primary key becomes ``(id, "Thoigian")`` and
+``Thoigian`` becomes NOT NULL. For the same reason the foreign keys of
+the link tables to the events cannot be kept, and PostgreSQL no longer
+enforces that every link points at an event. Django deletes the links
+itself before deleting an event and ``move_links`` archives the links of
+detached events; ``dangling_links`` finds any left behind by other
+writers.
+"""
+from datetime import date, datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+TABLE = 'core_nhatkysukien'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def add_months(month, months):
+    """Return the first day of the month ``months`` after ``month``."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_bounds(month):
+    """Return the [start, end) timestamps of a month in the project zone."""
+    tz = timezone.get_default_timezone()
+    end = add_months(month, 1)
+    return (
+        datetime(month.year, month.month, 1, tzinfo=tz),
+        datetime(end.year, end.month, 1, tzinfo=tz),
+    )
+
+
+def partition_name(month):
+    """Return the partition table name of a month."""
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def current_month():
+    """Return the first day of the current month in the project zone."""
+    return timezone.localdate().replace(day=1)
+
+
+def is_partitioned(cursor):
+    """Return whether the event table is already partitioned."""
+    cursor.execute(
+        'SELECT relkind FROM pg_class WHERE oid = %s::regclass', [TABLE],
+    )
+    return cursor.fetchone()[0] == 'p'
+
+
+def partitions(cursor):
+    """Return the names of the attached monthly partitions."""
+    cursor.execute(
+        """
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass AND c.relname <> %s
+        ORDER BY c.relname
+        """,
+        [TABLE, DEFAULT_PARTITION],
+    )
+    return [name for name, in cursor.fetchall()]
+
+
+def undated_events(cursor):
+    """Return how many events have no Thoigian to partition them by."""
+    cursor.execute(f'SELECT count(*) FROM {TABLE} WHERE "Thoigian" IS NULL')
+    return cursor.fetchone()[0]
+
+
+def referencing_columns():
+    """Return the (table, column) pairs pointing at event ids."""
+    from core.models import Nhatkysukien
+
+    # Hidden relations include the auto-created many-to-many link tables.
+    return [
+        (rel.related_model._meta.db_table, rel.field.column)
+        for rel in Nhatkysukien._meta.get_fields(include_hidden=True)
+        if rel.auto_created and not rel.concrete
+        and (rel.one_to_many or rel.one_to_one)
+    ]
+
+
+def link_archive(table, month):
+    """Return the name of the table archiving a month's links of a table."""
+    return f'{table}_p{month:%Y_%m}'
+
+
+def dangling_links(cursor):
+    """Return (table, count) of the links whose event does not exist."""
+    counts = []
+    for table, column in referencing_columns():
+        column = connection.ops.quote_name(column)
+        cursor.execute(
+            f'SELECT count(*) FROM {table} l WHERE NOT EXISTS '
+            f'(SELECT 1 FROM {TABLE} e WHERE e.id = l.{column})'
+        )
+        count = cursor.fetchone()[0]
+        if count:
+            counts.append((table, count))
+    return counts
+
+
+def _definitions(cursor):
+    """Capture the indexes, constraints and triggers of the plain table."""
+    cursor.execute(
+        """
+        SELECT indexdef FROM pg_indexes i
+        WHERE i.schemaname = current_schema() AND i.tablename = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM pg_constraint c
+                WHERE c.conname = i.indexname AND c.contype = 'p'
+            )
+        """,
+        [TABLE],
+    )
+    indexes = [indexdef for indexdef, in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('c', 'f')
+        """,
+        [TABLE],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT pg_get_triggerdef(oid) FROM pg_trigger
+        WHERE tgrelid = %s::regclass AND NOT tgisinternal
+        """,
+        [TABLE],
+    )
+    triggers = [triggerdef for triggerdef, in cursor.fetchall()]
+    cursor.execute(
+        """
+        SELECT conrelid::regclass::text, conname FROM pg_constraint
+        WHERE confrelid = %s::regclass AND contype = 'f'
+        """,
+        [TABLE],
+    )
+    references = cursor.fetchall()
+    return indexes, constraints, triggers, references
+
+
+def _create_partition(cursor, month):
+    """Create the partition of a month, moving its rows out of default.
+
+    Rows are moved by deleting them from the default partition and
+    inserting them through the parent, so the row triggers see a delete
+    and an insert and the derived data (statistics) stays balanced.
+    """
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    cursor.execute(
+        f"""
+        CREATE TEMPORARY TABLE moved_events ON COMMIT DROP AS
+        SELECT * FROM {DEFAULT_PARTITION}
+        WHERE "Thoigian" >= %s AND "Thoigian" < %s
+        """,
+        [start, end],
+    )
+    cursor.execute(
+        f'DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE "Thoigian" >= %s AND "Thoigian" < %s',
+        [start, end],
+    )
+    cursor.execute(
+        f'CREATE TABLE {name} PARTITION OF {TABLE} '
+        f'FOR VALUES FROM (%s) TO (%s)',
+        [start, end],
+    )
+    cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM moved_events')
+    cursor.execute('DROP TABLE moved_events')
+
+
+def ensure_partitions(ahead):
+    """Create any missing partitions up to ``ahead`` months from now.
+
+    Returns the names of the partitions created. Must run in a transaction.
+    """
+    month = current_month()
+    months = [add_months(month, offset) for offset in range(ahead + 1)]
+    created = []
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return created
+        # Only lock the table when there is something to create.
+        if {partition_name(target) for target in months} <= set(
+            partitions(cursor)
+        ):
+            return created
+        cursor.execute(f'LOCK TABLE {TABLE} IN SHARE ROW EXCLUSIVE MODE')
+        existing = set(partitions(cursor))
+        for target in months:
+            if partition_name(target) not in existing:
+                _create_partition(cursor, target)
+                created.append(partition_name(target))
+
+    return created
+
+
+def convert_event_log(ahead):
+    """Convert the event table to a monthly partitioned table in place.
+
+    Must run in a transaction; the table is locked for the duration. Every
+    event must have a Thoigian (see undated_events).
+    """
+    with connection.cursor() as cursor:
+        # Deferred foreign key checks would block ALTER TABLE.
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE')
+        indexes, constraints, triggers, references = _definitions(cursor)
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+        cursor.execute(
+            f'SELECT min("Thoigian"), max("Thoigian") FROM {TABLE}'
+        )
+        first, last = cursor.fetchone()
+
+        old = f'{TABLE}_unpartitioned'
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("Thoigian")'
+        )
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} '
+                       f'PARTITION OF {TABLE} DEFAULT')
+
+        month = current_month()
+        if first is not None:
+            month = min(month, timezone.localtime(first).date().replace(day=1))
+        end = add_months(current_month(), ahead)
+        if last is not None:
+            end = max(end, timezone.localtime(last).date().replace(day=1))
+        while month <= end:
+            start, stop = month_bounds(month)
+            cursor.execute(
+                f'CREATE TABLE {partition_name(month)} PARTITION OF {TABLE} '
+                f'FOR VALUES FROM (%s) TO (%s)',
+                [start, stop],
+            )
+            month = add_months(month, 1)
+
+        # Copied before the triggers exist, so nothing is recounted.
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {old}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id')
+        for table, name in references:
+            cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT {name}')
+        cursor.execute(f'DROP TABLE {old}')
+
+        cursor.execute(f'ALTER TABLE {TABLE} ALTER "Thoigian" SET NOT NULL')
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey '
+            f'PRIMARY KEY (id, "Thoigian")'
+        )
+        for indexdef in indexes:
+            cursor.execute(indexdef)
+        for name, definition in constraints:
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}'
+            )
+        for triggerdef in triggers:
+            cursor.execute(triggerdef)
+
+
+def is_detached(cursor, month):
+    """Return whether a month's partition exists outside the event table."""
+    cursor.execute(
+        """
+        SELECT NOT EXISTS (SELECT 1 FROM pg_inherits WHERE inhrelid = t.oid)
+        FROM (SELECT to_regclass(%s) AS oid) t WHERE t.oid IS NOT NULL
+        """,
+        [partition_name(month)],
+    )
+    row = cursor.fetchone()
+    return row is not None and row[0]
+
+
+def detach_partition(month):
+    """Detach a month's partition from the event table for archiving.
+
+    Detaching only updates the catalog, so it takes the same time however
+    many rows the partition holds. The (empty) link archives are created
+    alongside; the links themselves are moved by ``move_links``. Returns
+    the name of the detached partition. Must run in a transaction.
+    """
+    name = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+        for table, column in referencing_columns():
+            cursor.execute(
+                f'CREATE TABLE {link_archive(table, month)} (LIKE {table})'
+            )
+
+    return name
+
+
+def move_links(month, batch_size):
+    """Move the links of a detached month's events to the link archives.
+
+    Goes through the detached events in id order, ``batch_size`` at a
+    time, each batch in its own transaction: the links of a batch are
+    found through the index on their event column, so the work follows
+    the number of links moved and no lock is held for long. Links stay
+    dangling until their batch is moved; re-running resumes. Yields the
+    number of links moved per batch.
+    """
+    name = partition_name(month)
+    references = [
+        (table, connection.ops.quote_name(column), link_archive(table, month))
+        for table, column in referencing_columns()
+    ]
+    last = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM {name} WHERE id > %s ORDER BY id LIMIT %s',
+                [last, batch_size],
+            )
+            ids = [id for id, in cursor.fetchall()]
+            if not ids:
+                return
+            moved = 0
+            for table, column, archive in references:
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM {table} '
+                    f'WHERE {column} = ANY(%s) RETURNING *) '
+                    f'INSERT INTO {archive} SELECT * FROM moved',
+                    [ids],
+                )
+                moved += cursor.rowcount
+        last = ids[-1]
+        yield moved
@@ -0,0 +1,62 @@
+"""
+Renderers for streamed file exports.
+"""
+import csv
+import json
+
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class _Echo:
+    """File-like object that returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+    """Render rows as newline delimited JSON, one object per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def _line(self, row):
+        return json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render a non-streamed response, such as an error."""
+        rows = data if isinstance(data, list) else [data]
+        return ''.join(self._line(row) for row in rows).encode(self.charset)
+
+    def stream(self, rows, fields):
+        """Yield one line per row."""
+        for row in rows:
+            yield self._line(row)
+
+
+class CSVRenderer(renderers.BaseRenderer):
+    """Render rows as CSV, JSON encoding nested values in their cell."""
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def _cell(self, value):
+        if value is None:
+            return ''
+        if isinstance(value, (list, dict)):
+            return json.dumps(value, cls=JSONEncoder, ensure_ascii=False)
+        return value
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render a non-streamed response, such as an error."""
+        rows = data if isinstance(data, list) else [data]
+        fields = list(rows[0]) if rows else []
+        return ''.join(self.stream(rows, fields)).encode(self.charset)
+
+    def stream(self, rows, fields):
+        """Yield the header line, then one line per row."""
+        writer = csv.writer(_Echo())
+        yield writer.writerow(fields)
+        for row in rows:
+            yield writer.writerow([self._cell(row.get(f)) for f in fields])
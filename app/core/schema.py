@@ -0,0 +1,137 @@
+"""
+Pre-generated OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so it is
+done once (by the generate_schema command at startup, or on the first
+request) and written gzipped to API_SCHEMA_DIR. Workers keep the bytes in
+memory and reload them when the file changes.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from drf_spectacular.renderers import (
+    OpenApiJsonRenderer,
+    OpenApiYamlRenderer,
+)
+from drf_spectacular.settings import spectacular_settings
+
+
+RENDERERS = {
+    'yaml': OpenApiYamlRenderer,
+    'json': OpenApiJsonRenderer,
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+class CachedSchema:
+    """Gzipped schema document with its ETag."""
+
+    def __init__(self, body, mtime=None):
+        self.body = body
+        self.mtime = mtime
+        self.etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+
+    def decompressed(self):
+        return gzip.decompress(self.body)
+
+
+def schema_path(fmt):
+    return os.path.join(settings.API_SCHEMA_DIR, f'schema.{fmt}.gz')
+
+
+def render_schema():
+    """Generate the schema and return it gzipped, by format."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(
+        urlconf=spectacular_settings.SERVE_URLCONF,
+    )
+    schema = generator.get_schema(
+        request=None, public=spectacular_settings.SERVE_PUBLIC,
+    )
+    # mtime=0 keeps the bytes, and so the ETag, stable across runs.
+    return {
+        fmt: gzip.compress(
+            renderer().render(schema, renderer_context={}), mtime=0,
+        )
+        for fmt, renderer in RENDERERS.items()
+    }
+
+
+def _write(path, body):
+    """Replace path atomically, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        os.chmod(tmp, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def generate_schema():
+    """Regenerate the schema files and return their paths."""
+    os.makedirs(settings.API_SCHEMA_DIR, exist_ok=True)
+    paths = []
+    with _lock:
+        for fmt, body in render_schema().items():
+            path = schema_path(fmt)
+            _write(path, body)
+            paths.append(path)
+        _cache.clear()
+
+    return paths
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _load(fmt):
+    """Read the schema file, generating it if missing. Must hold the lock."""
+    path = schema_path(fmt)
+    mtime = _mtime(path)
+    if mtime is None:
+        rendered = render_schema()
+        try:
+            os.makedirs(settings.API_SCHEMA_DIR, exist_ok=True)
+            for other, body in rendered.items():
+                _write(schema_path(other), body)
+        except OSError:
+            # Unwritable directory: keep the schema in this process only.
+            for other, body in rendered.items():
+                _cache[other] = CachedSchema(body)
+            return _cache[fmt]
+        mtime = _mtime(path)
+
+    with open(path, 'rb') as f:
+        _cache[fmt] = CachedSchema(f.read(), mtime)
+    return _cache[fmt]
+
+
+def get_schema(fmt):
+    """Return the CachedSchema of a format ('yaml' or 'json')."""
+    cached = _cache.get(fmt)
+    # One stat() per request picks up a schema regenerated by the command.
+    if cached is not None and (
+        cached.mtime is None or cached.mtime == _mtime(schema_path(fmt))
+    ):
+        return cached
+
+    with _lock:
+        return _load(fmt)
+
+
+def clear_cache():
+    """Forget the schema held in memory."""
+    with _lock:
+        _cache.clear()
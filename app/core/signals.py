@@ -0,0 +1,84 @@
+"""
+Signal handlers keeping ``updated_at`` and cached credentials in step.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.authentication import invalidate_tokens, invalidate_user
+from core.models import Ingredient, Nhatkysukien, Recipe, Tag, Xulysukientb
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_recipes_for_tag(sender, instance, **kwargs):
+    """Mark recipes showing a renamed or deleted tag as modified."""
+    if kwargs.get('created'):
+        return
+    Recipe.objects.filter(tags=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_recipes_for_ingredient(sender, instance, **kwargs):
+    """Mark recipes showing a renamed or deleted ingredient as modified."""
+    if kwargs.get('created'):
+        return
+    Recipe.objects.filter(ingredients=instance).update(
+        updated_at=timezone.now(),
+    )
+
+
+_deleting_unlinked = contextvars.ContextVar(
+    'deleting_unlinked', default=False,
+)
+
+
+@contextmanager
+def deleting_unlinked_xulysukientbs():
+    """Delete handling records known to be shown by no event.
+
+    Inside the block, deleting a Xulysukientb marks no events, saving the
+    query that would look for them.
+    """
+    token = _deleting_unlinked.set(True)
+    try:
+        yield
+    finally:
+        _deleting_unlinked.reset(token)
+
+
+@receiver(post_save, sender=Xulysukientb)
+@receiver(pre_delete, sender=Xulysukientb)
+def touch_nhatkysukiens_for_xulysukientb(sender, instance, **kwargs):
+    """Mark events showing an edited or deleted handling record."""
+    if kwargs.get('created') or (
+        kwargs['signal'] is pre_delete and _deleting_unlinked.get()
+    ):
+        return
+    Nhatkysukien.objects.filter(xulysukientbs=instance).update(
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token from the auth cache."""
+    invalidate_tokens([instance.key])
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def forget_user_tokens(sender, instance, created=False, **kwargs):
+    """Drop cached credentials of an edited or deleted user."""
+    if created:
+        return
+    invalidate_user(instance.pk)
+    invalidate_tokens(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
@@ -0,0 +1,188 @@
+"""
+Tests for the async serving of read endpoints.
+"""
+import asyncio
+import threading
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import include, path, resolve
+from rest_framework.authtoken.models import Token
+
+from core import asyncviews
+from core.asyncviews import (
+    ASGIHandler,
+    AsyncReadRouter,
+    ThreadedStream,
+    ThreadedStreamingHttpResponse,
+    run_in_db_thread,
+)
+from core.models import Tag
+from recipe.views import RecipeViewSet, TagViewSet
+
+
+router = AsyncReadRouter()
+router.register('tags', TagViewSet)
+router.register('recipes', RecipeViewSet)
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
+
+
+def close_db_threads():
+    """Close the connections of the pool threads and stop the pool."""
+    executor, asyncviews._executor = asyncviews._executor, None
+    if executor is None:
+        return
+    # Occupy every thread at once, so each one closes its connections.
+    barrier = threading.Barrier(executor._max_workers)
+
+    def close():
+        barrier.wait()
+        connections.close_all()
+
+    for _ in range(executor._max_workers):
+        executor.submit(close)
+    executor.shutdown(wait=True)
+
+
+@override_settings(ROOT_URLCONF='core.test.test_asyncviews')
+class AsyncReadViewTests(TransactionTestCase):
+    """Test list and detail reads are served by async views."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.tag = Tag.objects.create(user=self.user, name='Vegan')
+
+    def tearDown(self):
+        close_db_threads()
+
+    def _auth(self):
+        return {'AUTHORIZATION': f'Token {self.token.key}'}
+
+    def test_only_async_reads_viewsets_wrapped(self):
+        """Test routes of viewsets without async_reads stay sync."""
+        self.assertTrue(asyncio.iscoroutinefunction(resolve('/tags/').func))
+        self.assertFalse(
+            asyncio.iscoroutinefunction(resolve('/recipes/').func)
+        )
+        self.assertIs(resolve('/tags/').func.cls, TagViewSet)
+
+    async def test_runs_on_db_threads(self):
+        """Test the database work runs on the bounded thread pool."""
+        name = await run_in_db_thread(lambda: threading.current_thread().name)
+
+        self.assertTrue(name.startswith('async-db'))
+
+    async def test_list(self):
+        """Test listing through the async view."""
+        res = await self.async_client.get('/tags/', **self._auth())
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [tag['name'] for tag in res.json()], [self.tag.name],
+        )
+
+    async def test_requires_authentication(self):
+        """Test the async view keeps the viewset's permissions."""
+        res = await self.async_client.get('/tags/')
+
+        self.assertEqual(res.status_code, 401)
+
+    async def test_writes_still_served(self):
+        """Test other methods on an async route go to the viewset."""
+        res = await self.async_client.patch(
+            f'/tags/{self.tag.id}/',
+            {'name': 'Dessert'},
+            content_type='application/json',
+            **self._auth(),
+        )
+
+        self.assertEqual(res.status_code, 200)
+        tag = await sync_to_async(Tag.objects.get)(id=self.tag.id)
+        self.assertEqual(tag.name, 'Dessert')
+
+    async def test_concurrent_reads(self):
+        """Test concurrent reads all complete on the pool."""
+        responses = await asyncio.gather(*(
+            self.async_client.get('/tags/', **self._auth())
+            for _ in range(20)
+        ))
+
+        self.assertEqual({res.status_code for res in responses}, {200})
+
+
+class ThreadedStreamTests(SimpleTestCase):
+    """Test streams produced on their own thread."""
+
+    def test_parts_and_errors_reach_the_reader(self):
+        """Test parts arrive in order and a failure is raised to the reader."""
+        def parts():
+            yield 'a'
+            yield 'b'
+            raise ValueError('broken')
+
+        async def read():
+            received = []
+            with self.assertRaisesMessage(ValueError, 'broken'):
+                async for part in ThreadedStream(parts()):
+                    received.append(part)
+            return received
+
+        self.assertEqual(asyncio.run(read()), ['a', 'b'])
+
+    def test_close_stops_the_thread(self):
+        """Test closing an unread stream ends and closes its generator."""
+        closed = threading.Event()
+
+        def parts():
+            try:
+                while True:
+                    yield 'x'
+            finally:
+                closed.set()
+
+        stream = ThreadedStream(parts(), ahead=1)
+        stream.close()
+
+        self.assertTrue(closed.wait(5))
+
+    def test_handler_awaits_parts(self):
+        """Test the loop keeps running while the next part is produced."""
+        released = threading.Event()
+
+        def parts():
+            yield 'a'
+            # Only set by a coroutine, so only if the loop is not blocked.
+            yield 'b' if released.wait(5) else 'blocked'
+
+        async def release():
+            await asyncio.sleep(0.05)
+            released.set()
+
+        async def serve():
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            response = ThreadedStreamingHttpResponse(parts())
+            await asyncio.gather(
+                ASGIHandler().send_response(response, send), release(),
+            )
+            return messages
+
+        messages = asyncio.run(serve())
+
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertEqual(
+            b''.join(message.get('body', b'') for message in messages[1:]),
+            b'ab',
+        )
+        self.assertFalse(messages[-1].get('more_body'))
@@ -0,0 +1,107 @@
+"""
+Tests for the cached token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.authentication import token_cache_key
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token resolution is cached and invalidated."""
+
+    def setUp(self):
+        caches['auth'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123', name='Test',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_repeat_requests_skip_token_query(self):
+        """Test only the first request resolves the token in the DB."""
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_cache_holds_no_password_hash(self):
+        """Test the cached credentials leave the password hash out."""
+        self.client.get(ME_URL)
+
+        cached = caches['auth'].get(token_cache_key(self.token.key))
+
+        self.assertNotIn(self.user.password, repr(cached))
+
+    def test_password_change_through_cached_user(self):
+        """Test a cached user can still change its password."""
+        self.client.get(ME_URL)
+
+        res = self.client.patch(ME_URL, {'password': 'newpass123'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('newpass123'))
+        self.assertEqual(self.user.name, 'Test')
+
+    def test_deleted_token_rejected(self):
+        """Test a deleted token stops working immediately."""
+        self.client.get(ME_URL)
+
+        self.token.delete()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_token_rejected_by_other_workers(self):
+        """Test deleting a token reaches the cache of every worker."""
+        self.client.get(ME_URL)
+        # A separate backend instance, as another uWSGI worker would have.
+        other_worker = caches.create_connection('auth')
+        cache_key = token_cache_key(self.token.key)
+        self.assertIsNotNone(other_worker.get(cache_key))
+
+        self.token.delete()
+
+        self.assertIsNone(other_worker.get(cache_key))
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user revokes its cached token."""
+        self.client.get(ME_URL)
+
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_reloaded(self):
+        """Test requests see the user as updated through the API."""
+        self.client.get(ME_URL)
+
+        self.client.patch(ME_URL, {'name': 'Renamed'})
+        res = self.client.get(ME_URL)
+
+        self.assertEqual(res.data['name'], 'Renamed')
+
+    def test_invalid_token_not_cached(self):
+        """Test unknown tokens are rejected on every request."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                res = self.client.get(ME_URL)
+            self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,75 @@
+"""
+Tests for cache backends.
+"""
+import os
+import tempfile
+import threading
+import time
+
+from django.test import SimpleTestCase
+
+from core.cache import LRUFileBasedCache
+
+
+class LRUFileBasedCacheTests(SimpleTestCase):
+    """Test the LRU file based cache."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = LRUFileBasedCache(
+            self.dir.name,
+            {'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}},
+        )
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _age(self, key, seconds):
+        """Backdate the last use of a cache entry."""
+        fname = self.cache._key_to_file(key)
+        stamp = time.time() - seconds
+        os.utime(fname, (stamp, stamp))
+
+    def test_get_and_miss(self):
+        """Test values round trip and misses return the default."""
+        self.cache.set('a', [1, 2])
+
+        self.assertEqual(self.cache.get('a'), [1, 2])
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+    def test_evicts_least_recently_used(self):
+        """Test culling removes the entry that was read least recently."""
+        for key, age in (('a', 30), ('b', 20), ('c', 10)):
+            self.cache.set(key, key)
+            self._age(key, age)
+        self.cache.get('a')
+
+        self.cache.set('d', 'd')
+
+        self.assertIsNone(self.cache.get('b'))
+        for key in ('a', 'c', 'd'):
+            self.assertEqual(self.cache.get(key), key)
+
+    def test_lock_serialises_updates(self):
+        """Test updates under lock() from several processes' caches add up."""
+        caches = [
+            LRUFileBasedCache(self.dir.name, {}) for _ in range(4)
+        ]
+        self.cache.set('n', 0)
+
+        def bump(cache):
+            for _ in range(20):
+                with cache.lock('n'):
+                    value = cache.get('n')
+                    time.sleep(0.001)
+                    cache.set('n', value + 1)
+
+        threads = [
+            threading.Thread(target=bump, args=(cache,)) for cache in caches
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.cache.get('n'), 80)
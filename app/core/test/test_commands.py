@@ -1,12 +1,24 @@
 """
 Test custom Django management commands.
 """
+from datetime import timedelta
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2OpError
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from core.models import (
+    Nhatkysukien,
+    Recipe,
+    RevokedToken,
+    Thongkesukien,
+    Xulysukientb,
+)
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -31,3 +43,98 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BenchmarkRecipeFiltersTests(TestCase):
+    """Test the recipe filter benchmark command."""
+
+    def test_benchmark_leaves_no_data(self):
+        """Test the benchmark reports timings and rolls back its dataset."""
+        out = StringIO()
+
+        call_command(
+            'benchmark_recipe_filters',
+            recipes=20, tags=5, repeat=1, stdout=out,
+        )
+
+        self.assertIn('exists (any)', out.getvalue())
+        self.assertIn('grouped semi-join (all)', out.getvalue())
+        self.assertFalse(Recipe.objects.exists())
+
+
+class RebuildEventStatsTests(TestCase):
+    """Test the event statistics rebuild command."""
+
+    def test_rebuild_matches_triggers(self):
+        """Test a rebuild reproduces the incrementally kept counts."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        unit = Xulysukientb.objects.create(user=user, Tomay='H1')
+        for shift in ('Ca 1', 'Ca 1', 'Ca 2'):
+            event = Nhatkysukien.objects.create(
+                user=user, title='Sự cố', CaVanHanh=shift,
+                Thoigian='2025-05-01T08:00:00+07:00',
+            )
+            event.xulysukientbs.add(unit)
+        expected = set(Thongkesukien.objects.values_list(
+            'user', 'dimension', 'value', 'count',
+        ))
+        Thongkesukien.objects.all().delete()
+
+        out = StringIO()
+        call_command('rebuild_event_stats', stdout=out)
+
+        self.assertEqual(set(Thongkesukien.objects.values_list(
+            'user', 'dimension', 'value', 'count',
+        )), expected)
+        self.assertIn(f'Rebuilt {len(expected)}', out.getvalue())
+
+    def test_months_follow_time_zone(self):
+        """Test months are bucketed in settings.TIME_ZONE."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        # 1 June in Vietnam, still 31 May in UTC.
+        Nhatkysukien.objects.create(
+            user=user, title='Sự cố', Thoigian='2025-06-01T03:00:00+07:00',
+        )
+
+        def months():
+            return list(Thongkesukien.objects.filter(
+                dimension=Thongkesukien.MONTH,
+            ).values_list('value', 'count'))
+
+        self.assertEqual(months(), [('2025-06', 1)])
+
+        with self.settings(TIME_ZONE='UTC'):
+            call_command('rebuild_event_stats', stdout=StringIO())
+            self.assertEqual(months(), [('2025-05', 1)])
+
+            Nhatkysukien.objects.create(
+                user=user, title='Sự cố',
+                Thoigian='2025-06-01T06:00:00+07:00',
+            )
+            self.assertEqual(months(), [('2025-05', 2)])
+
+
+class PruneTokensTests(TestCase):
+    """Test pruning expired token rows."""
+
+    def test_prune_tokens(self):
+        """Test the command deletes expired rows only."""
+        now = timezone.now()
+        RevokedToken.objects.create(
+            jti='old', expires_at=now - timedelta(seconds=1),
+        )
+        RevokedToken.objects.create(
+            jti='new', expires_at=now + timedelta(hours=1),
+        )
+        out = StringIO()
+
+        call_command('prune_tokens', stdout=out)
+
+        self.assertIn('Deleted 1 expired token rows.', out.getvalue())
+        self.assertEqual(
+            list(RevokedToken.objects.values_list('jti', flat=True)), ['new'],
+        )
@@ -0,0 +1,207 @@
+"""
+Tests for the database connection pool and backend.
+"""
+import threading
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection, InterfaceError
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.db import pool as pool_module
+from core.db.pool import ConnectionPool, PoolTimeout
+from core.db.postgresql.base import DatabaseWrapper
+
+
+DB_CONNECTIONS_URL = reverse('db-connections')
+
+
+class FakeConnection:
+    """Stand-in for a DB-API connection."""
+
+    def __init__(self):
+        self.closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """Test the in-process connection pool."""
+
+    def test_reuses_returned_connection(self):
+        """Test a returned connection is handed out again."""
+        pool = ConnectionPool(max_size=2)
+        conn = pool.getconn(FakeConnection)
+        pool.putconn(conn)
+
+        self.assertIs(pool.getconn(FakeConnection), conn)
+        stats = pool.stats()
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['in_use'], 1)
+
+    def test_overflow_closed_on_return(self):
+        """Test connections beyond max_size are not kept."""
+        pool = ConnectionPool(max_size=1, max_overflow=1)
+        first = pool.getconn(FakeConnection)
+        second = pool.getconn(FakeConnection)
+        pool.putconn(first)
+        pool.putconn(second)
+
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        stats = pool.stats()
+        self.assertEqual(stats['overflow_created'], 1)
+        self.assertEqual((stats['size'], stats['idle']), (1, 1))
+
+    def test_timeout(self):
+        """Test a checkout fails once the pool stays exhausted."""
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        pool.getconn(FakeConnection)
+
+        with self.assertRaises(PoolTimeout):
+            pool.getconn(FakeConnection)
+
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['timeouts']), (1, 1))
+
+    def test_waits_for_returned_connection(self):
+        """Test a checkout waits for a connection to come back."""
+        pool = ConnectionPool(max_size=1, timeout=5)
+        conn = pool.getconn(FakeConnection)
+        timer = threading.Timer(0.05, pool.putconn, [conn])
+        timer.start()
+
+        self.assertIs(pool.getconn(FakeConnection), conn)
+        timer.join()
+        self.assertGreater(pool.stats()['wait_seconds_max'], 0)
+
+    def test_failed_check_replaces_connection(self):
+        """Test idle connections failing the check are replaced."""
+        pool = ConnectionPool(max_size=1)
+        stale = pool.getconn(FakeConnection)
+        pool.putconn(stale)
+
+        conn = pool.getconn(FakeConnection, check=lambda conn: False)
+
+        self.assertIsNot(conn, stale)
+        self.assertTrue(stale.closed)
+        self.assertEqual(pool.stats()['size'], 1)
+
+    def test_failed_connect_releases_slot(self):
+        """Test a failed connect does not use up the pool."""
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+
+        def fail():
+            raise OSError('Connection refused')
+
+        with self.assertRaises(OSError):
+            pool.getconn(fail)
+        self.assertIsInstance(pool.getconn(FakeConnection), FakeConnection)
+
+    def test_new_pool_after_fork(self):
+        """Test a forked process does not reuse its parent's pool."""
+        key = ('fork-test', 'db')
+        pool = pool_module.get_pool(key, max_size=1)
+
+        with patch('core.db.pool.os.getpid', return_value=-1):
+            self.assertIsNot(pool_module.get_pool(key, max_size=1), pool)
+
+
+class DatabaseWrapperTests(TestCase):
+    """Test health checks and pooling of the database backend."""
+
+    def _wrapper(self, **settings):
+        return DatabaseWrapper(
+            {**connection.settings_dict, **settings}, alias=connection.alias,
+        )
+
+    def _break(self, wrapper):
+        """Close the connection behind Django's back, as a restart would."""
+        wrapper.ensure_connection()
+        wrapper.connection.close()
+        # Start of the next request.
+        wrapper.close_if_unusable_or_obsolete()
+
+    def test_health_check_replaces_broken_connection(self):
+        """Test a dead persistent connection is replaced before use."""
+        wrapper = self._wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=True)
+        self._break(wrapper)
+
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            self.assertEqual(cursor.fetchone(), (1,))
+        wrapper.close()
+
+    def test_without_health_check_broken_connection_fails(self):
+        """Test the check is what rescues the request."""
+        wrapper = self._wrapper(CONN_MAX_AGE=None, CONN_HEALTH_CHECKS=False)
+        self._break(wrapper)
+
+        with self.assertRaises(InterfaceError):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        wrapper.connection = None
+
+    def test_pooled_connection_reused(self):
+        """Test closing returns the connection to the pool for reuse."""
+        wrapper = self._wrapper(
+            CONN_MAX_AGE=0,
+            CONN_HEALTH_CHECKS=True,
+            POOL={'MAX_SIZE': 1, 'TIMEOUT': 1},
+        )
+        pool = wrapper.pool
+        self.addCleanup(pool.closeall)
+
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        wrapper.close()
+        with wrapper.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+        self.assertIs(wrapper.connection, raw)
+        wrapper.close()
+        stats = pool.stats()
+        self.assertEqual(stats['connections_created'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertEqual(stats['idle'], 1)
+
+
+class DatabaseConnectionStatsApiTests(TestCase):
+    """Test the connection statistics endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_requires_admin(self):
+        """Test regular users cannot read the statistics."""
+        user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client.force_authenticate(user)
+
+        res = self.client.get(DB_CONNECTIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_stats(self):
+        """Test the statistics of the serving worker are returned."""
+        admin = get_user_model().objects.create_superuser(
+            'admin@example.com', 'testpass123',
+        )
+        self.client.force_authenticate(admin)
+
+        res = self.client.get(DB_CONNECTIONS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('pid', res.data)
+        default = res.data['databases']['default']
+        self.assertEqual(
+            default['conn_max_age'],
+            connection.settings_dict['CONN_MAX_AGE'],
+        )
+        self.assertIsNone(default['pool'])
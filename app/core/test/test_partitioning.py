@@ -0,0 +1,305 @@
+"""
+Tests for monthly partitioning of the event log.
+"""
+from datetime import date
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import partitioning
+from core.models import Nhatkysukien, Thongkesukien, Xulysukientb
+
+
+NHATKYSUKIEN_URL = reverse('nhatkysukien:nhatkysukien-list')
+
+
+def stats(user):
+    """Return the non-empty statistics of a user as a set of tuples."""
+    return set(Thongkesukien.objects.filter(
+        user=user, count__gt=0,
+    ).values_list(
+        'dimension', 'value', 'count',
+    ))
+
+
+@patch('core.partitioning.current_month', return_value=date(2025, 5, 1))
+@override_settings(EVENT_LOG_PARTITIONING=True)
+class PartitionEventLogTests(TestCase):
+    """Test the partition_event_log command."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.march = Nhatkysukien.objects.create(
+            user=self.user, title='Máy biến áp', CaVanHanh='Ca 1',
+            Thoigian='2025-03-31T23:00:00+07:00',
+        )
+        self.march.xulysukientbs.add(
+            Xulysukientb.objects.create(user=self.user, Tomay='H1'),
+        )
+
+    def _partition(self, **options):
+        out = StringIO()
+        call_command('partition_event_log', stdout=out, **options)
+        return out.getvalue()
+
+    def _partition_of(self, event):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT tableoid::regclass::text FROM core_nhatkysukien '
+                'WHERE id = %s',
+                [event.id],
+            )
+            return cursor.fetchone()[0]
+
+    def test_not_converted_without_flag(self, patched_month):
+        """Test deploys do not convert the table, only --convert does."""
+        out = self._partition()
+
+        self.assertIn('--convert', out)
+        with connection.cursor() as cursor:
+            self.assertFalse(partitioning.is_partitioned(cursor))
+
+    @override_settings(EVENT_LOG_PARTITIONING=False)
+    def test_convert_requires_setting(self, patched_month):
+        """Test converting needs the API to require Thoigian first."""
+        with self.assertRaises(CommandError):
+            self._partition(convert=True)
+
+    def test_convert_refuses_undated_events(self, patched_month):
+        """Test events without Thoigian block the conversion."""
+        Nhatkysukien.objects.create(user=self.user, title='Chưa rõ')
+
+        with self.assertRaisesRegex(CommandError, '1 events'):
+            self._partition(convert=True)
+
+        with connection.cursor() as cursor:
+            self.assertFalse(partitioning.is_partitioned(cursor))
+
+    def test_convert_keeps_data(self, patched_month):
+        """Test converting keeps rows, links, statistics and triggers."""
+        before = stats(self.user)
+
+        self._partition(convert=True, ahead=2)
+
+        with connection.cursor() as cursor:
+            self.assertTrue(partitioning.is_partitioned(cursor))
+            cursor.execute(
+                "SELECT pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = 'core_nhatkysukien'::regclass "
+                "AND contype = 'p'"
+            )
+            self.assertEqual(
+                cursor.fetchone()[0], 'PRIMARY KEY (id, "Thoigian")',
+            )
+            self.assertEqual(partitioning.partitions(cursor), [
+                'core_nhatkysukien_p2025_03', 'core_nhatkysukien_p2025_04',
+                'core_nhatkysukien_p2025_05', 'core_nhatkysukien_p2025_06',
+                'core_nhatkysukien_p2025_07',
+            ])
+        # Tháng tính theo giờ Việt Nam.
+        self.assertEqual(
+            self._partition_of(self.march), 'core_nhatkysukien_p2025_03',
+        )
+        self.assertEqual(stats(self.user), before)
+        self.assertEqual(
+            Nhatkysukien.objects.get(id=self.march.id)
+            .xulysukientbs.get().Tomay,
+            'H1',
+        )
+        self.assertTrue(Nhatkysukien.objects.filter(
+            search_vector='may', id=self.march.id,
+        ).exists())
+
+        event = Nhatkysukien.objects.create(
+            user=self.user, title='Mới', CaVanHanh='Ca 1',
+            Thoigian='2025-05-02T08:00:00+07:00',
+        )
+        self.assertGreater(event.id, self.march.id)
+        self.assertIn(('CaVanHanh', 'Ca 1', 2), stats(self.user))
+        event.delete()
+        self.assertEqual(stats(self.user), before)
+
+        late = Nhatkysukien.objects.create(
+            user=self.user, title='Sau', Thoigian='2030-01-01T08:00:00+07:00',
+        )
+        self.assertEqual(
+            self._partition_of(late), 'core_nhatkysukien_default',
+        )
+
+    def test_primary_key_enforced(self, patched_month):
+        """Test the partitioned table still rejects duplicate rows."""
+        self._partition(convert=True)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'INSERT INTO core_nhatkysukien '
+                    'SELECT * FROM core_nhatkysukien WHERE id = %s',
+                    [self.march.id],
+                )
+
+    def test_maintenance_does_not_lock(self, patched_month):
+        """Test runs with every partition present take no table lock."""
+        self._partition(convert=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            out = self._partition()
+
+        self.assertNotIn('Created', out)
+        self.assertFalse(
+            [q for q in ctx.captured_queries if 'LOCK' in q['sql']]
+        )
+
+    def test_api_after_convert(self, patched_month):
+        """Test the event API works on the partitioned table."""
+        self._partition(convert=True)
+        payload = {
+            'title': 'Sự cố',
+            'Thoigian': '2025-05-10T08:00:00+07:00',
+            'xulysukientbs': [{'Tomay': 'H1'}],
+        }
+
+        res = self.client.post(NHATKYSUKIEN_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        payload.pop('Thoigian')
+        res = self.client.post(NHATKYSUKIEN_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Thoigian', res.data)
+        res = self.client.get(NHATKYSUKIEN_URL, {
+            'Thoigian_after': '2025-03-01T00:00:00+07:00',
+            'Thoigian_before': '2025-04-01T00:00:00+07:00',
+        })
+        self.assertEqual([n['id'] for n in res.data], [self.march.id])
+        res = self.client.delete(
+            reverse('nhatkysukien:nhatkysukien-detail', args=[self.march.id])
+        )
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_time_range_prunes_partitions(self, patched_month):
+        """Test time-range queries only scan the matching partitions."""
+        self._partition(convert=True)
+
+        plan = Nhatkysukien.objects.filter(
+            user=self.user,
+            Thoigian__gte='2025-03-01T00:00:00+07:00',
+            Thoigian__lt='2025-04-01T00:00:00+07:00',
+        ).order_by('-id').explain()
+
+        self.assertIn('core_nhatkysukien_p2025_03', plan)
+        self.assertNotIn('core_nhatkysukien_p2025_04', plan)
+        self.assertNotIn('core_nhatkysukien_default', plan)
+
+    def test_future_partitions_take_rows_from_default(self, patched_month):
+        """Test a new month's partition adopts rows from the default one."""
+        self._partition(convert=True, ahead=0)
+        late = Nhatkysukien.objects.create(
+            user=self.user, title='Sau', CaVanHanh='Ca 2',
+            Thoigian='2025-06-15T08:00:00+07:00',
+        )
+        before = stats(self.user)
+        self.assertEqual(
+            self._partition_of(late), 'core_nhatkysukien_default',
+        )
+
+        patched_month.return_value = date(2025, 6, 1)
+        out = self._partition(ahead=0)
+
+        self.assertIn('core_nhatkysukien_p2025_06', out)
+        self.assertEqual(
+            self._partition_of(late), 'core_nhatkysukien_p2025_06',
+        )
+        self.assertEqual(stats(self.user), before)
+
+    def test_detach_partition(self, patched_month):
+        """Test detaching a month moves its events and their links out."""
+        self._partition(convert=True)
+
+        out = self._partition(detach='2025-03')
+
+        self.assertIn('core_nhatkysukien_p2025_03', out)
+        self.assertIn('core_nhatkysukien_xulysukientbs_p2025_03', out)
+        self.assertFalse(
+            Nhatkysukien.objects.filter(id=self.march.id).exists()
+        )
+        self.assertFalse(Nhatkysukien.xulysukientbs.through.objects.filter(
+            nhatkysukien_id=self.march.id,
+        ).exists())
+        self.assertNotIn(('Tomay', 'H1', 1), stats(self.user))
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT count(*) FROM core_nhatkysukien_p2025_03')
+            self.assertEqual(cursor.fetchone()[0], 1)
+            cursor.execute(
+                'SELECT nhatkysukien_id '
+                'FROM core_nhatkysukien_xulysukientbs_p2025_03'
+            )
+            self.assertEqual(cursor.fetchall(), [(self.march.id,)])
+
+    def test_detach_moves_links_in_batches(self, patched_month):
+        """Test links are moved a batch of events at a time."""
+        self._partition(convert=True)
+        unit = Xulysukientb.objects.create(user=self.user, Tomay='H2')
+        for day in (1, 2):
+            Nhatkysukien.objects.create(
+                user=self.user, title='Sự cố',
+                Thoigian=f'2025-03-0{day}T08:00:00+07:00',
+            ).xulysukientbs.add(unit)
+
+        out = self._partition(detach='2025-03', batch_size=1)
+
+        self.assertIn('moved its 3 links', out)
+        self.assertFalse(Nhatkysukien.xulysukientbs.through.objects.exists())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM core_nhatkysukien_xulysukientbs_p2025_03'
+            )
+            self.assertEqual(cursor.fetchone()[0], 3)
+
+    def test_detach_resumes_moving_links(self, patched_month):
+        """Test re-running an interrupted detach moves the links left."""
+        self._partition(convert=True)
+        with transaction.atomic():
+            partitioning.detach_partition(date(2025, 3, 1))
+
+        out = self._partition(detach='2025-03')
+
+        self.assertIn('moved its 1 links', out)
+        self.assertFalse(Nhatkysukien.xulysukientbs.through.objects.filter(
+            nhatkysukien_id=self.march.id,
+        ).exists())
+
+    def test_check_reports_dangling_links(self, patched_month):
+        """Test --check finds links the lost foreign key let through."""
+        self._partition(convert=True)
+        self.assertIn('Every link points', self._partition(check=True))
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM core_nhatkysukien WHERE id = %s',
+                [self.march.id],
+            )
+
+        with self.assertRaisesMessage(
+            CommandError, '1 in core_nhatkysukien_xulysukientbs',
+        ):
+            self._partition(check=True)
+
+    def test_detach_unknown_month(self, patched_month):
+        """Test detaching a missing partition fails."""
+        self._partition(convert=True)
+
+        with self.assertRaises(CommandError):
+            self._partition(detach='1999-01')
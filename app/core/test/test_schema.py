@@ -0,0 +1,114 @@
+"""
+Tests for the pre-generated OpenAPI schema.
+"""
+import gzip
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import schema
+
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class CachedSchemaApiTests(SimpleTestCase):
+    """Test serving the schema from core.schema."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.schema_dir = tmp.name
+        settings = override_settings(API_SCHEMA_DIR=tmp.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        schema.clear_cache()
+        self.addCleanup(schema.clear_cache)
+        self.client = APIClient()
+
+    def test_generated_once(self):
+        """Test the schema is generated on the first request only."""
+        with patch(
+            'core.schema.render_schema', wraps=schema.render_schema,
+        ) as render:
+            first = self.client.get(SCHEMA_URL)
+            second = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertIn(b'/api/user/token/pair/', first.content)
+        self.assertTrue(os.path.exists(schema.schema_path('yaml')))
+
+    def test_gzip(self):
+        """Test the compressed bytes go to clients accepting gzip."""
+        plain = self.client.get(SCHEMA_URL, {'format': 'json'})
+        res = self.client.get(
+            SCHEMA_URL, {'format': 'json'}, HTTP_ACCEPT_ENCODING='gzip',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+        self.assertEqual(json.loads(plain.content)['openapi'], '3.0.3')
+        self.assertIn('Accept-Encoding', res['Vary'])
+
+    def test_gzip_refused(self):
+        """Test gzip is not sent when refused or only named in passing."""
+        for accept_encoding in ('gzip;q=0', 'br, gzip; q=0.0', 'x-gzipped'):
+            with self.subTest(accept_encoding=accept_encoding):
+                res = self.client.get(
+                    SCHEMA_URL, HTTP_ACCEPT_ENCODING=accept_encoding,
+                )
+
+                self.assertFalse(res.has_header('Content-Encoding'))
+
+        res = self.client.get(
+            SCHEMA_URL, HTTP_ACCEPT_ENCODING='br;q=1.0, *;q=0.5',
+        )
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+
+    def test_not_modified(self):
+        """Test a current ETag is answered with 304."""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+        other = self.client.get(
+            SCHEMA_URL, {'format': 'json'}, HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+        self.assertEqual(other.status_code, status.HTTP_200_OK)
+
+    def test_command_regenerates(self):
+        """Test running workers serve the schema written by the command."""
+        self.client.get(SCHEMA_URL)
+        rendered = schema.render_schema()
+        rendered['yaml'] = gzip.compress(b'openapi: 3.0.3\n')
+        path = schema.schema_path('yaml')
+        stat = os.stat(path)
+
+        with patch('core.schema.render_schema', return_value=rendered):
+            call_command('generate_schema', stdout=StringIO())
+        # Make sure the change is seen on coarse mtime filesystems.
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.content, b'openapi: 3.0.3\n')
+
+    def test_unwritable_directory(self):
+        """Test the schema is kept in memory if it cannot be written."""
+        with patch('core.schema.os.makedirs', side_effect=PermissionError):
+            res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(b'openapi', res.content)
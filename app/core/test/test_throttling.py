@@ -0,0 +1,196 @@
+"""
+Tests for the token-bucket throttles.
+"""
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import tokens
+from core.cache import LRUFileBasedCache
+from core.models import Recipe
+from core.throttling import ClientIPThrottle
+
+
+TOKEN_URL = reverse('user:token')
+RECIPES_EXPORT_URL = reverse('recipe:recipe-export')
+
+REST_FRAMEWORK = {
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'NUM_PROXIES': 1,
+    'DEFAULT_THROTTLE_RATES': {
+        'login': '2/min',
+        'upload': '2/min',
+        'export': '2/min',
+    },
+}
+
+
+def upload_url(recipe_id):
+    """Create and return an image upload URL."""
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK)
+class ThrottleTests(TestCase):
+    """Test expensive endpoints are throttled."""
+
+    def setUp(self):
+        caches['throttle'].clear()
+        caches['auth'].clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com', password='testpass123',
+        )
+        self.client = APIClient()
+
+    def _login(self, **extra):
+        return self.client.post(TOKEN_URL, {
+            'email': 'user@example.com',
+            'password': 'testpass123',
+        }, **extra)
+
+    def test_login_burst_rejected_before_authentication(self):
+        """Test logins over the bucket size get 429 without a query."""
+        for _ in range(2):
+            self.assertEqual(self._login().status_code, status.HTTP_200_OK)
+
+        with patch('user.serializers.authenticate') as authenticate:
+            with self.assertNumQueries(0):
+                res = self._login()
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        authenticate.assert_not_called()
+        self.assertGreater(int(res['Retry-After']), 0)
+
+    def test_spoofed_forwarded_for_throttled(self):
+        """Test a new X-Forwarded-For per request gets no new bucket."""
+        responses = [
+            # As forwarded by the proxy, which appends the real address.
+            self._login(HTTP_X_FORWARDED_FOR=f'203.0.113.{i}, 10.0.0.1')
+            for i in range(3)
+        ]
+
+        self.assertEqual(
+            responses[-1].status_code, status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+
+    def test_login_limited_per_ip(self):
+        """Test each client IP has its own bucket."""
+        for _ in range(2):
+            self._login(REMOTE_ADDR='10.0.0.1')
+
+        self.assertEqual(
+            self._login(REMOTE_ADDR='10.0.0.1').status_code,
+            status.HTTP_429_TOO_MANY_REQUESTS,
+        )
+        self.assertEqual(
+            self._login(REMOTE_ADDR='10.0.0.2').status_code,
+            status.HTTP_200_OK,
+        )
+
+    def test_bucket_refills(self):
+        """Test tokens come back at the configured rate."""
+        with patch('core.throttling.TokenBucketThrottle.timer') as timer:
+            timer.return_value = 1000.0
+            for _ in range(2):
+                self._login()
+            self.assertEqual(self._login().status_code, 429)
+
+            # 2/min refills one token every 30 seconds.
+            timer.return_value = 1031.0
+            self.assertEqual(self._login().status_code, 200)
+            self.assertEqual(self._login().status_code, 429)
+
+    def test_upload_limited_per_user(self):
+        """Test uploads share one bucket per user across client IPs."""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Recipe', time_minutes=5, price=1,
+        )
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        for ip in ['10.0.0.1', '10.0.0.2']:
+            res = self.client.post(
+                upload_url(recipe.id), {}, REMOTE_ADDR=ip,
+            )
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        with self.assertNumQueries(0):
+            res = self.client.post(
+                upload_url(recipe.id), {}, REMOTE_ADDR='10.0.0.3',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_signed_tokens_share_user_bucket(self):
+        """Test a user's access tokens draw from the same bucket."""
+        for ip in ['10.0.0.1', '10.0.0.2']:
+            access = tokens.make_token(self.user, tokens.ACCESS)
+            self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+            res = self.client.get(RECIPES_EXPORT_URL, REMOTE_ADDR=ip)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        access = tokens.make_token(self.user, tokens.ACCESS)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        res = self.client.get(RECIPES_EXPORT_URL, REMOTE_ADDR='10.0.0.3')
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_unscoped_actions_not_throttled(self):
+        """Test plain list requests are not throttled."""
+        self.client.force_authenticate(self.user)
+
+        for _ in range(5):
+            res = self.client.get(reverse('recipe:recipe-list'))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+@override_settings(REST_FRAMEWORK=REST_FRAMEWORK)
+class SharedBucketTests(TestCase):
+    """Test buckets shared by workers through the file cache."""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def test_racing_workers_cannot_overspend(self):
+        """Test concurrent requests get no more tokens than the bucket."""
+        read = LRUFileBasedCache.get
+
+        def slow_get(cache, *args, **kwargs):
+            # Widen the window between reading and writing the bucket.
+            value = read(cache, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        view = type('View', (), {'throttle_scope': 'login'})()
+        request = RequestFactory().post(TOKEN_URL)
+        allowed = []
+
+        def attempt():
+            # Each thread opens its own cache, as each worker does.
+            allowed.append(ClientIPThrottle().allow_request(request, view))
+
+        cache_settings = {**settings.CACHES, 'throttle': {
+            'BACKEND': 'core.cache.LRUFileBasedCache',
+            'LOCATION': self.dir.name,
+        }}
+        with override_settings(CACHES=cache_settings), \
+                patch.object(LRUFileBasedCache, 'get', slow_get):
+            threads = [threading.Thread(target=attempt) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(allowed.count(True), 2)
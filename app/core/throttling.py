@@ -0,0 +1,119 @@
+"""
+Token-bucket throttles for expensive endpoints.
+"""
+import hashlib
+import threading
+
+from django.core import signing
+from django.core.cache import caches
+from rest_framework.authentication import get_authorization_header
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from core import tokens
+
+
+# Serialises bucket updates in backends without a lock() of their own,
+# such as locmem, whose buckets are private to the process anyway.
+_process_lock = threading.Lock()
+
+
+class TokenBucketThrottle(SimpleRateThrottle):
+    """Limit a view's ``throttle_scope`` with a token bucket.
+
+    A rate of ``N/period`` gives a bucket of N tokens refilled at N per
+    period, so short bursts pass while the sustained rate stays bounded.
+    Buckets live in the ``throttle`` cache, shared by the workers when it
+    uses the file backend, whose lock() makes each update atomic so that
+    concurrent workers cannot both spend the same token. Views without a
+    scope are not throttled.
+    """
+    cache_format = 'throttle_%(scope)s_%(ident)s'
+
+    def __init__(self):
+        # The scope comes from the view, in allow_request.
+        pass
+
+    @property
+    def cache(self):
+        return caches['throttle']
+
+    def get_rate(self):
+        # Read the rates on each request so they follow settings changes.
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_ident_key(self, request):
+        """Return who the bucket belongs to, or None to skip it."""
+        raise NotImplementedError('.get_ident_key() must be overridden')
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_key(request)
+        if ident is None:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scope', None)
+        self.rate = self.get_rate() if self.scope else None
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        cache = self.cache
+        lock = getattr(cache, 'lock', None)
+        with lock(self.key) if lock else _process_lock:
+            refill = self.num_requests / self.duration
+            now = self.timer()
+            level, stamp = cache.get(self.key, (self.num_requests, now))
+            level = min(self.num_requests, level + (now - stamp) * refill)
+            if level < 1:
+                self._wait = (1 - level) / refill
+                return False
+
+            # Untouched buckets are full again after one period.
+            cache.set(self.key, (level - 1, now), self.duration)
+        return True
+
+    def wait(self):
+        return self._wait
+
+
+class ClientIPThrottle(TokenBucketThrottle):
+    """Token bucket per client IP address.
+
+    The address is the last X-Forwarded-For entry, as appended by the
+    proxy (NUM_PROXIES), never one the client wrote itself.
+    """
+
+    def get_ident_key(self, request):
+        return f'ip:{self.get_ident(request)}'
+
+
+class CredentialThrottle(TokenBucketThrottle):
+    """Token bucket per user, identified without touching the database.
+
+    Signed access tokens name their user; DRF tokens, one per user, are
+    keyed by their hash. Requests without such credentials are left to
+    the per-IP bucket.
+    """
+
+    def get_ident_key(self, request):
+        auth = get_authorization_header(request).split()
+        if len(auth) != 2:
+            return None
+
+        keyword, credentials = auth[0].lower(), auth[1]
+        if keyword == b'bearer':
+            try:
+                token = credentials.decode()
+                payload = tokens.read_token(token, tokens.ACCESS)
+            except (signing.BadSignature, UnicodeError):
+                return None
+            return f'user:{payload["u"]}'
+        if keyword == b'token':
+            return f'token:{hashlib.sha256(credentials).hexdigest()}'
+        return None
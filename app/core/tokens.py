@@ -0,0 +1,188 @@
+"""
+Signed, expiring access and refresh tokens.
+
+Tokens are ``django.core.signing`` strings carrying the user id and a
+random id (jti), so they verify without a database lookup. Access tokens
+are short-lived. Refresh tokens carry the family (login) they descend
+from and its generation; exchanging one for a new pair bumps the
+generation, so each works once. The deny-list only holds explicitly
+revoked access tokens until they would have expired anyway; the
+``prune_tokens`` command removes stale rows.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from core.models import RefreshTokenFamily, RevokedToken
+
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+
+class TokenRevoked(signing.BadSignature):
+    """Signature is valid but the token is on the deny-list."""
+
+
+def _salt(kind):
+    return f'core.tokens.{kind}'
+
+
+def _lifetime(kind):
+    if kind == ACCESS:
+        return settings.ACCESS_TOKEN_LIFETIME
+    return settings.REFRESH_TOKEN_LIFETIME
+
+
+def _password_hash(user):
+    """Return a short fingerprint of the user's password hash."""
+    return user.get_session_auth_hash()[:16]
+
+
+def make_token(user, kind, family=None):
+    """Return a new signed token of the given kind for the user.
+
+    Refresh tokens need the RefreshTokenFamily they belong to.
+    """
+    payload = {'u': user.pk, 'j': uuid.uuid4().hex}
+    if kind == REFRESH:
+        # Changing the password invalidates outstanding refresh tokens.
+        payload['p'] = _password_hash(user)
+        payload['f'] = family.pk
+        payload['g'] = family.generation
+    return signing.dumps(payload, salt=_salt(kind), compress=True)
+
+
+def _family_expiry():
+    return timezone.now() + timedelta(seconds=_lifetime(REFRESH))
+
+
+def token_pair(user, family=None):
+    """Return a new access and refresh token for the user.
+
+    Without a family (on login), a new one is started.
+    """
+    if family is None:
+        family = RefreshTokenFamily.objects.create(
+            user=user, expires_at=_family_expiry(),
+        )
+    return {
+        'access': make_token(user, ACCESS),
+        'refresh': make_token(user, REFRESH, family),
+        'expires_in': settings.ACCESS_TOKEN_LIFETIME,
+    }
+
+
+def read_token(token, kind):
+    """Return the payload of a valid, unexpired token.
+
+    Raises ``signing.BadSignature`` (``signing.SignatureExpired`` when it
+    is too old) for anything else. The deny-list is not consulted.
+    """
+    return signing.loads(token, salt=_salt(kind), max_age=_lifetime(kind))
+
+
+def revoked_cache_key(jti):
+    """Return the cache key of a token id's deny-list entry."""
+    return f'auth-revoked:{jti}'
+
+
+def is_revoked(jti):
+    """Return whether a token id is on the deny-list.
+
+    The answer is kept in the ``auth`` cache, shared by the workers, so
+    access tokens usually verify without a query; revoke() overwrites it.
+    """
+    cache_key = revoked_cache_key(jti)
+    revoked = caches['auth'].get(cache_key)
+    if revoked is None:
+        revoked = RevokedToken.objects.filter(jti=jti).exists()
+        # add() cannot undo a concurrent revoke() that already set True.
+        caches['auth'].add(cache_key, revoked)
+    return revoked
+
+
+def verify_access_token(token):
+    """Return the payload of a valid access token."""
+    payload = read_token(token, ACCESS)
+    if is_revoked(payload['j']):
+        raise TokenRevoked('Token has been revoked.')
+    return payload
+
+
+def revoke(payload, kind):
+    """Revoke a token; return False if it was already revoked.
+
+    A refresh token ends its whole family. An access token is added to
+    the deny-list.
+    """
+    if kind == REFRESH:
+        deleted, _ = RefreshTokenFamily.objects.filter(
+            pk=payload.get('f'), user_id=payload['u'],
+        ).delete()
+        return bool(deleted)
+
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(
+                jti=payload['j'],
+                expires_at=timezone.now() + timedelta(
+                    seconds=_lifetime(kind),
+                ),
+            )
+    except IntegrityError:
+        return False
+    finally:
+        caches['auth'].set(revoked_cache_key(payload['j']), True)
+    return True
+
+
+def refresh_token_pair(token):
+    """Exchange a refresh token for a new pair of the same family.
+
+    Raises ``signing.BadSignature`` if the token is invalid, was already
+    used or revoked, its user is inactive or changed their password.
+    Reusing an exchanged token ends the family, since it has leaked.
+    """
+    payload = read_token(token, REFRESH)
+    user = get_user_model().objects.filter(
+        pk=payload['u'], is_active=True,
+    ).first()
+    if user is None or 'f' not in payload or not constant_time_compare(
+        payload.get('p', ''), _password_hash(user),
+    ):
+        raise signing.BadSignature('Token is no longer valid.')
+
+    family = RefreshTokenFamily(
+        pk=payload['f'], user=user, generation=payload['g'] + 1,
+        expires_at=_family_expiry(),
+    )
+    rotated = RefreshTokenFamily.objects.filter(
+        pk=family.pk, user=user, generation=payload['g'],
+        expires_at__gt=timezone.now(),
+    ).update(generation=F('generation') + 1, expires_at=family.expires_at)
+    if not rotated:
+        RefreshTokenFamily.objects.filter(pk=family.pk).delete()
+        raise TokenRevoked('Token has been used or revoked.')
+    return token_pair(user, family)
+
+
+def prune():
+    """Delete expired deny-list entries and refresh token families.
+
+    Returns the number of rows deleted.
+    """
+    now = timezone.now()
+    revoked, _ = RevokedToken.objects.filter(expires_at__lte=now).delete()
+    families, _ = RefreshTokenFamily.objects.filter(
+        expires_at__lte=now,
+    ).delete()
+    return revoked + families
@@ -0,0 +1,107 @@
+"""
+Views for operating the API.
+"""
+import os
+
+from django.db import connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from core.db.pool import all_pools
+from core.schema import get_schema
+
+
+class DatabaseConnectionStatsView(APIView):
+    """Connection settings and pool counters of the serving worker.
+
+    Each worker process has its own pools; the ``pid`` tells which one
+    answered, so repeat the request to sample the others.
+    """
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses=OpenApiTypes.OBJECT)
+    def get(self, request):
+        pools = all_pools()
+        databases = {}
+        for alias in connections:
+            settings_dict = connections[alias].settings_dict
+            pool = pools.get((alias, settings_dict['NAME']))
+            databases[alias] = {
+                'conn_max_age': settings_dict['CONN_MAX_AGE'],
+                'health_checks': settings_dict.get(
+                    'CONN_HEALTH_CHECKS', False,
+                ),
+                'pool': pool.stats() if pool is not None else None,
+            }
+
+        return Response({'pid': os.getpid(), 'databases': databases})
+
+
+def accepts_gzip(request):
+    """Return whether the client's Accept-Encoding allows gzip.
+
+    Codings are matched by name with their q-values (RFC 9110), so
+    ``gzip;q=0`` refuses gzip and an explicit entry overrides ``*``.
+    """
+    qvalues = {}
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for coding in header.split(','):
+        name, *params = [part.strip() for part in coding.split(';')]
+        qvalue = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        qvalues[name.lower()] = qvalue
+
+    return qvalues.get('gzip', qvalues.get('*', 0.0)) > 0
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """OpenAPI schema served from core.schema instead of per request.
+
+    Answers with the gzipped bytes when the client accepts them, and with
+    304 when its ETag is current. Requests for another language or
+    version are generated as before.
+    """
+
+    def _get_schema_response(self, request):
+        if request.GET.get('lang') or request.GET.get('version'):
+            return super()._get_schema_response(request)
+
+        schema = get_schema(request.accepted_renderer.format)
+        response = get_conditional_response(request, etag=schema.etag)
+        if response is None:
+            renderer = request.accepted_renderer
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type = f'{content_type}; charset={renderer.charset}'
+            if accepts_gzip(request):
+                response = HttpResponse(schema.body, content_type=content_type)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(
+                    schema.decompressed(), content_type=content_type,
+                )
+        response['ETag'] = schema.etag
+        response['Content-Disposition'] = (
+            f'inline; filename="{self._get_filename(request, None)}"'
+        )
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
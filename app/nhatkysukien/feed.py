@@ -0,0 +1,128 @@
+"""
+Wake-ups for the nhật ký sự kiện change feed.
+
+The ``core_nhatkysukien_notify`` trigger (migration 0023) sends a NOTIFY
+on ``CHANNEL`` with the owner's id whenever an event is inserted or
+updated; edits of handling records reach it through the ``updated_at``
+bump in ``core.signals``. One listener thread per process holds a single
+LISTEN connection and wakes the long-poll requests waiting for that
+user, so an idle request costs a coroutine rather than queries.
+"""
+import asyncio
+import os
+import select
+import threading
+import time
+
+import psycopg2
+from django.db import connections
+
+
+CHANNEL = 'nhatkysukien_changes'
+
+
+class ChangeListener:
+    """Dispatch change notifications to waiting asyncio tasks."""
+    retry_delay = 1
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._waiters = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._wakeup = None
+
+    def _connect(self):
+        params = connections[self.alias].get_connection_params()
+        conn = psycopg2.connect(**params)
+        conn.set_isolation_level(
+            psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT,
+        )
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        return conn
+
+    def start(self):
+        """Start listening, blocking until the LISTEN is in place."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            conn = self._connect()
+            self._wakeup = os.pipe()
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(conn, self._wakeup[0]),
+                name='nhatkysukien-changes',
+                daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self):
+        """Stop the listener thread and close its connection."""
+        with self._lock:
+            thread, wakeup = self._thread, self._wakeup
+            self._thread = self._wakeup = None
+        if thread is not None:
+            os.write(wakeup[1], b'x')
+            thread.join()
+            os.close(wakeup[1])
+
+    def _run(self, conn, stop_fd):
+        try:
+            while True:
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    ready = select.select([conn, stop_fd], [], [])[0]
+                    if stop_fd in ready:
+                        return
+                    conn.poll()
+                    users = {notify.payload for notify in conn.notifies}
+                    conn.notifies.clear()
+                except psycopg2.Error:
+                    # Notifications may have been lost while disconnected.
+                    if conn is not None:
+                        conn.close()
+                    conn = None
+                    users = None
+                    time.sleep(self.retry_delay)
+                self._wake(users)
+        finally:
+            if conn is not None:
+                conn.close()
+            os.close(stop_fd)
+
+    def _wake(self, users):
+        """Wake the waiters of the given user ids, or everyone for None."""
+        with self._lock:
+            waiters = [
+                waiter
+                for user, user_waiters in self._waiters.items()
+                if users is None or user in users
+                for waiter in user_waiters
+            ]
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The request's event loop already finished.
+                pass
+
+    def subscribe(self, user_id):
+        """Return an asyncio.Event set on the next change for a user."""
+        event = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), event)
+        with self._lock:
+            self._waiters.setdefault(str(user_id), set()).add(waiter)
+        return event
+
+    def unsubscribe(self, user_id, event):
+        """Forget a waiter registered with subscribe()."""
+        with self._lock:
+            user_waiters = self._waiters.get(str(user_id), set())
+            user_waiters.discard((asyncio.get_running_loop(), event))
+            if not user_waiters:
+                self._waiters.pop(str(user_id), None)
+
+
+listener = ChangeListener()
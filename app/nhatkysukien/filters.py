@@ -0,0 +1,45 @@
+"""
+Filters for the nhật ký sự kiện APIs.
+"""
+import hashlib
+
+import django_filters
+from django.db.models.functions import MD5
+
+from core.models import Nhatkysukien
+
+
+class NhatkysukienFilter(django_filters.FilterSet):
+    """Lọc nhật ký sự kiện theo thời gian và phân loại.
+
+    Each filter is served by an index declared on the model: Thoigian by
+    ``(user, Thoigian DESC)``, the text fields by ``(user, md5(<field>),
+    Thoigian DESC)``, since a btree cannot hold long text values.
+    """
+    Thoigian = django_filters.IsoDateTimeFromToRangeFilter(
+        help_text='Khoảng thời gian: Thoigian_after / Thoigian_before '
+                  '(ISO 8601, inclusive).',
+    )
+    LoaiSc = django_filters.CharFilter(
+        method='filter_hashed', help_text='Loại sự cố.',
+    )
+    CaVanHanh = django_filters.CharFilter(
+        method='filter_hashed', help_text='Ca vận hành.',
+    )
+    Hethong_Thietbi = django_filters.CharFilter(
+        method='filter_hashed', help_text='Hệ thống / thiết bị.',
+    )
+
+    class Meta:
+        model = Nhatkysukien
+        fields = ['Thoigian', 'LoaiSc', 'CaVanHanh', 'Hethong_Thietbi']
+
+    def filter_hashed(self, queryset, name, value):
+        """Match a text field through its md5 index.
+
+        The field itself is compared too, so md5 collisions never match.
+        """
+        digest = hashlib.md5(value.encode()).hexdigest()
+        return queryset.alias(**{f'{name}_md5': MD5(name)}).filter(
+            **{f'{name}_md5': digest, name: value},
+        )
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from core.models import Nhatkysukien, Xulysukientb
+
+from core.models import Nhatkysukien, Thongkesukien, Xulysukientb
+from core.signals import deleting_unlinked_xulysukientbs
 
 
 class XulysukientbSerializer(serializers.ModelSerializer):
@@ -14,12 +18,68 @@ class XulysukientbSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
+    TOMAY_TAKEN = 'A record with this Tomay already exists.'
+
+    def validate_Tomay(self, value):
+        """Tổ máy must stay unique per user when renaming a record."""
+        if self.instance is not None and Xulysukientb.objects.filter(
+            user=self.instance.user_id,
+            Tomay=value,
+        ).exclude(id=self.instance.id).exists():
+            raise serializers.ValidationError(self.TOMAY_TAKEN)
+        return value
+
+    def update(self, instance, validated_data):
+        """Rename a record; a concurrent rename to the same Tomay loses.
+
+        validate_Tomay only checks before saving, so the unique constraint
+        has the last word.
+        """
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except IntegrityError:
+            raise serializers.ValidationError({'Tomay': [self.TOMAY_TAKEN]})
+
+
+class NhatkysukienListSerializer(serializers.ListSerializer):
+    """Tạo nhiều nhật ký sự kiện cùng lúc (giao ca).
+
+    Events, missing handling records and link rows are each written with a
+    single bulk insert, inside one transaction.
+    """
+
+    @transaction.atomic
+    def create(self, validated_data):
+        xulysukientbs = [
+            data.pop('xulysukientbs', []) for data in validated_data
+        ]
+        objs = self.child._get_or_create_xulysukientbs(
+            [item for items in xulysukientbs for item in items]
+        )
+        by_tomay = {obj.Tomay: obj for obj in objs}
+        nhatkysukiens = Nhatkysukien.objects.bulk_create(
+            Nhatkysukien(**data) for data in validated_data
+        )
+
+        through = Nhatkysukien.xulysukientbs.through
+        through.objects.bulk_create(
+            through(
+                nhatkysukien_id=nhatkysukien.id,
+                xulysukientb_id=by_tomay[name].id,
+            )
+            for nhatkysukien, items in zip(nhatkysukiens, xulysukientbs)
+            for name in dict.fromkeys(item['Tomay'] for item in items)
+        )
+        return nhatkysukiens
+
 
 class NhatkysukienSerializer(serializers.ModelSerializer):
     xulysukientbs = XulysukientbSerializer(many=True, required=False)
 
     class Meta:
         model = Nhatkysukien
+        list_serializer_class = NhatkysukienListSerializer
         fields = [
             'id', 'title', 'Thoigian', 'Hethong_Thietbi', 'Hientuong_Dienbien',
             'Quatrinh_Kt', 'LoaiSc', 'Baocao_Chidao', 'DeNghi', 'CaVanHanh',
@@ -27,40 +87,72 @@ class NhatkysukienSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id']
 
-    def _get_or_create_xulysukientbs(self, xulysukientbs, nhatkysukien):
-        """Handle getting or creating Xulysukientb as needed."""
+    def validate(self, attrs):
+        """Require Thoigian once the event log is partitioned on it."""
+        if settings.EVENT_LOG_PARTITIONING and attrs.get(
+            'Thoigian', getattr(self.instance, 'Thoigian', None),
+        ) is None:
+            raise serializers.ValidationError({
+                'Thoigian': 'Bắt buộc khi nhật ký sự kiện được phân vùng.',
+            })
+        return attrs
+
+    def _get_or_create_xulysukientbs(self, xulysukientbs):
+        """Return Xulysukientb for the given Tomay, bulk creating missing.
+
+        Missing records are inserted with ON CONFLICT DO NOTHING on the
+        (user, Tomay) constraint, so concurrent requests creating the same
+        Tomay resolve to the same row instead of failing or duplicating.
+        """
+        if not xulysukientbs:
+            return []
         auth_user = self.context['request'].user
-        for xulysukientb in xulysukientbs:
-            xulysukientb_obj, created = Xulysukientb.objects.get_or_create(
-                user=auth_user,
-                Tomay=xulysukientb['Tomay']
+        names = list(dict.fromkeys(
+            xulysukientb['Tomay'] for xulysukientb in xulysukientbs
+        ))
+        records = Xulysukientb.objects.filter(user=auth_user)
+        existing = {
+            obj.Tomay: obj for obj in records.filter(Tomay__in=names)
+        }
+        missing = [name for name in names if name not in existing]
+        if missing:
+            Xulysukientb.objects.bulk_create(
+                [Xulysukientb(user=auth_user, Tomay=name) for name in missing],
+                ignore_conflicts=True,
             )
-            nhatkysukien.xulysukientbs.add(xulysukientb_obj)
+            existing.update(
+                (obj.Tomay, obj) for obj in records.filter(Tomay__in=missing)
+            )
+
+        return [existing[name] for name in names]
 
     def create(self, validated_data):
         """Create a Nhatkysukien."""
         xulysukientbs = validated_data.pop('xulysukientbs', [])
         nhatkysukien = Nhatkysukien.objects.create(**validated_data)
-        self._get_or_create_xulysukientbs(xulysukientbs, nhatkysukien)
+        nhatkysukien.xulysukientbs.add(
+            *self._get_or_create_xulysukientbs(xulysukientbs)
+        )
         return nhatkysukien
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """CN Nhatkysukien and làm đúng Xulysukientb assignments."""
         xulysukientbs = validated_data.pop('xulysukientbs', None)
         if xulysukientbs is not None:
-            # Get new Tomay names from request
-            new_tomay_names = {
-                xulysukientb['Tomay'] for xulysukientb in xulysukientbs
-                }
-            # Remove old Xulysukientbs not in the new list
-            instance.xulysukientbs.exclude(Tomay__in=new_tomay_names).delete()
-
-            for xulysukientb in xulysukientbs:
-                xulysukientb_obj, created = Xulysukientb.objects.get_or_create(
-                    user=self.context['request'].user,
-                    Tomay=xulysukientb['Tomay']
-                )
-                instance.xulysukientbs.add(xulysukientb_obj)
+            removed = set(
+                instance.xulysukientbs.values_list('id', flat=True)
+            )
+            objs = self._get_or_create_xulysukientbs(xulysukientbs)
+            instance.xulysukientbs.set(objs)
+            removed.difference_update(obj.id for obj in objs)
+            # Xulysukientb có thể dùng chung với sự kiện khác: chỉ xóa
+            # những bản ghi không còn gắn với sự kiện nào; không có sự kiện
+            # nào cần đánh dấu, nên số truy vấn không đổi.
+            with deleting_unlinked_xulysukientbs():
+                Xulysukientb.objects.filter(
+                    id__in=removed, nhatkysukien__isnull=True,
+                ).delete()
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -77,3 +169,26 @@ class NhatkysukienDetailSerializer(NhatkysukienSerializer):
             'Hethong_Thietbi', 'Hientuong_Dienbien', 'Quatrinh_Kt', 'LoaiSc',
             'Baocao_Chidao', 'DeNghi', 'CaVanHanh', 'Donvi_khacPhuc'
         ]
+
+
+class NhatkysukienBatchResultSerializer(serializers.Serializer):
+    """Serializer for the IDs created by a batch of nhật ký sự kiện."""
+    ids = serializers.ListField(child=serializers.IntegerField())
+
+
+class SearchHitSerializer(serializers.Serializer):
+    """Serializer for a nhật ký sự kiện / xử lý sự kiện search hit."""
+    type = serializers.CharField()
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    rank = serializers.FloatField()
+    snippet = serializers.CharField()
+
+
+class ThongkesukienSerializer(serializers.ModelSerializer):
+    """Serializer for một nhóm thống kê sự kiện."""
+
+    class Meta:
+        model = Thongkesukien
+        fields = ['dimension', 'value', 'count']
+        read_only_fields = fields
@@ -0,0 +1,213 @@
+"""
+Tests for the nhật ký sự kiện change feed.
+"""
+import asyncio
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import psycopg2
+
+from django.contrib.auth import get_user_model
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Nhatkysukien, Xulysukientb
+from nhatkysukien.feed import ChangeListener, listener
+
+
+CHANGES_URL = reverse('nhatkysukien:changes')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_nhatkysukien(user, **params):
+    """Create and return a nhật ký sự kiện."""
+    return Nhatkysukien.objects.create(user=user, title='Sự cố', **params)
+
+
+class ChangesApiTests(TestCase):
+    """Test change feed requests answered without waiting."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def tearDown(self):
+        listener.stop()
+
+    def test_auth_required(self):
+        """Test the feed needs a valid token."""
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(res['WWW-Authenticate'], 'Token')
+
+    def test_initial_cursor(self):
+        """Test a request without cursor returns the latest position."""
+        create_nhatkysukien(self.user)
+        latest = create_nhatkysukien(self.user)
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'], [])
+        self.assertEqual(res.json()['since_id'], latest.id)
+
+    def test_changes_after_cursor(self):
+        """Test new and updated events after the cursor are returned."""
+        old = create_nhatkysukien(self.user)
+        cursor = self.client.get(CHANGES_URL).json()
+        new = create_nhatkysukien(self.user)
+        create_nhatkysukien(create_user(email='other@example.com'))
+        unit = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        old.xulysukientbs.add(unit)
+        unit.Noidung_xuly = 'Đã xử lý'
+        unit.save()
+
+        res = self.client.get(CHANGES_URL, {**cursor, 'timeout': 0})
+
+        data = res.json()
+        self.assertEqual([row['id'] for row in data['results']],
+                         [new.id, old.id])
+        self.assertEqual(data['since_id'], old.id)
+        res = self.client.get(CHANGES_URL, {
+            'since_updated_at': data['since_updated_at'],
+            'since_id': data['since_id'],
+            'timeout': 0,
+        })
+        self.assertEqual(res.json()['results'], [])
+
+    def test_since_id_only(self):
+        """Test following new events with since_id alone."""
+        first = create_nhatkysukien(self.user)
+        second = create_nhatkysukien(self.user)
+
+        res = self.client.get(CHANGES_URL, {'since_id': first.id})
+
+        self.assertEqual(
+            [row['id'] for row in res.json()['results']], [second.id],
+        )
+
+    @patch.object(listener, 'start')
+    def test_no_wait_under_wsgi(self, patched_start):
+        """Test WSGI requests are answered without holding the worker."""
+        started = time.monotonic()
+
+        res = self.client.get(CHANGES_URL, {'since_id': 0, 'timeout': 5})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['results'], [])
+        self.assertLess(time.monotonic() - started, 2)
+        patched_start.assert_not_called()
+
+    def test_invalid_params(self):
+        """Test malformed cursors are rejected."""
+        res = self.client.get(CHANGES_URL, {
+            'since_id': 'x', 'since_updated_at': 'yesterday',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('since_id', res.json())
+        self.assertIn('since_updated_at', res.json())
+
+
+class ChangeListenerTests(TestCase):
+    """Test the listener thread's handling of connection errors."""
+
+    def test_broken_connection_closed(self):
+        """Test a failed connection is closed before reconnecting."""
+        ready, ready_w = os.pipe()
+        idle, idle_w = os.pipe()
+        stop, stop_w = os.pipe()
+        os.write(ready_w, b'x')
+        broken = Mock(fileno=Mock(return_value=ready))
+        broken.poll.side_effect = psycopg2.OperationalError
+        fresh = Mock(fileno=Mock(return_value=idle))
+        changes = ChangeListener()
+        changes.retry_delay = 0
+
+        def reconnect():
+            os.write(stop_w, b'x')
+            return fresh
+
+        with patch.object(changes, '_connect', side_effect=reconnect):
+            changes._run(broken, stop)
+
+        broken.close.assert_called_once_with()
+        fresh.close.assert_called_once_with()
+        for fd in (ready, ready_w, idle, idle_w, stop_w):
+            os.close(fd)
+
+
+class ChangesLongPollTests(TransactionTestCase):
+    """Test long-poll requests woken by committed writes."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.token = Token.objects.create(user=self.user)
+
+    def tearDown(self):
+        listener.stop()
+
+    def _poll(self, params, result):
+        """Request the feed through ASGI, as the long-poll needs."""
+        async def get():
+            try:
+                return await AsyncClient().get(
+                    CHANGES_URL, params, authorization=f'Token {self.token}',
+                )
+            finally:
+                # Close the connection of the thread running the sync code.
+                await sync_to_async(connections.close_all)()
+
+        started = time.monotonic()
+        try:
+            result['response'] = asyncio.run(get())
+        finally:
+            result['elapsed'] = time.monotonic() - started
+
+    def test_woken_by_new_event(self):
+        """Test a waiting request returns as soon as an event is saved."""
+        since = timezone.now()
+        result = {}
+        poll = threading.Thread(target=self._poll, args=(
+            {'since_updated_at': since.isoformat(), 'timeout': 10}, result,
+        ))
+        poll.start()
+        time.sleep(0.5)
+
+        nhatkysukien = create_nhatkysukien(self.user)
+        poll.join(10)
+
+        self.assertLess(result['elapsed'], 5)
+        self.assertEqual(
+            [row['id'] for row in result['response'].json()['results']],
+            [nhatkysukien.id],
+        )
+
+    def test_timeout_without_changes(self):
+        """Test a request returns empty after its timeout."""
+        create_nhatkysukien(create_user(email='other@example.com'))
+        result = {}
+
+        self._poll({'since_id': 0, 'timeout': 0.5}, result)
+
+        self.assertEqual(result['response'].json()['results'], [])
+        self.assertGreaterEqual(result['elapsed'], 0.5)
@@ -1,11 +1,21 @@
+import asyncio
+import json
+from unittest.mock import patch
+from datetime import datetime, timedelta, timezone
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection, connections
+from django.test import AsyncClient, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 from core.models import Nhatkysukien, Xulysukientb
+from nhatkysukien.filters import NhatkysukienFilter
 from nhatkysukien.serializers import (
     NhatkysukienSerializer,
     NhatkysukienDetailSerializer,
@@ -13,6 +23,8 @@ from nhatkysukien.serializers import (
 
 
 NHATKYSUKIEN_URL = reverse('nhatkysukien:nhatkysukien-list')
+EXPORT_URL = reverse('nhatkysukien:nhatkysukien-export')
+BATCH_URL = reverse('nhatkysukien:nhatkysukien-batch-create')
 
 
 def detail_url(nhatkysukien_id):
@@ -321,3 +333,413 @@ class PrivateNhatkysukienApiTests(TestCase):
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(nhatkysukien.xulysukientbs.count(), 0)
+
+    def test_list_paginated_with_cursor(self):
+        """Kiểm tra phân trang nhật ký sự kiện bằng cursor."""
+        nhatkysukiens = [create_nhatkysukien(user=self.user) for _ in range(3)]
+        expected_ids = [n.id for n in reversed(nhatkysukiens)]
+
+        res = self.client.get(NHATKYSUKIEN_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [n['id'] for n in res.data['results']],
+            expected_ids[:2],
+        )
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [n['id'] for n in res.data['results']],
+            expected_ids[2:],
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_export_ndjson(self):
+        """Kiểm tra xuất nhật ký sự kiện dạng NDJSON."""
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        xulysukientb = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        nhatkysukien.xulysukientbs.add(xulysukientb)
+
+        res = self.client.get(EXPORT_URL)
+        body = b''.join(res.streaming_content).decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], nhatkysukien.id)
+        self.assertEqual(rows[0]['title'], nhatkysukien.title)
+        self.assertEqual(rows[0]['xulysukientbs'][0]['Tomay'], 'H1')
+
+    def test_list_etag_follows_xulysukientb(self):
+        """Kiểm tra ETag thay đổi khi xử lý sự kiện lồng nhau thay đổi."""
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        xulysukientb = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        nhatkysukien.xulysukientbs.add(xulysukientb)
+        etag = self.client.get(NHATKYSUKIEN_URL)['ETag']
+
+        res = self.client.get(NHATKYSUKIEN_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        xulysukientb.Noidung_xuly = 'Đã xử lý'
+        xulysukientb.save()
+        res = self.client.get(NHATKYSUKIEN_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_update_unlinks_shared_xulysukientb(self):
+        """Kiểm tra gỡ xử lý sự kiện dùng chung không xóa nó."""
+        shared = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        other = create_nhatkysukien(user=self.user)
+        nhatkysukien.xulysukientbs.add(shared)
+        other.xulysukientbs.add(shared)
+
+        payload = {'xulysukientbs': [{'Tomay': 'H2'}]}
+        res = self.client.patch(
+            detail_url(nhatkysukien.id), payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn(shared, nhatkysukien.xulysukientbs.all())
+        self.assertIn(shared, other.xulysukientbs.all())
+
+    def test_update_deletes_orphaned_xulysukientb(self):
+        """Kiểm tra xử lý sự kiện không còn gắn với sự kiện nào bị xóa."""
+        orphaned = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        kept = Xulysukientb.objects.create(user=self.user, Tomay='H2')
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        nhatkysukien.xulysukientbs.add(orphaned, kept)
+
+        payload = {'xulysukientbs': [{'Tomay': 'H2'}]}
+        res = self.client.patch(
+            detail_url(nhatkysukien.id), payload, format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(Xulysukientb.objects.filter(id=orphaned.id).exists())
+        self.assertEqual(list(nhatkysukien.xulysukientbs.all()), [kept])
+
+    def _count_update_queries(self, units):
+        """Cập nhật sự kiện với số tổ máy cho trước, trả về số truy vấn."""
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        nhatkysukien.xulysukientbs.add(*[
+            Xulysukientb.objects.create(
+                user=self.user, Tomay=f'Old{units}-{i}',
+            )
+            for i in range(units)
+        ])
+        Xulysukientb.objects.bulk_create([
+            Xulysukientb(user=self.user, Tomay=f'Kept{units}-{i}')
+            for i in range(units)
+        ])
+        payload = {'xulysukientbs': [
+            {'Tomay': f'{prefix}{units}-{i}'}
+            for prefix in ('Kept', 'New') for i in range(units)
+        ]}
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(
+                detail_url(nhatkysukien.id), payload, format='json',
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(nhatkysukien.xulysukientbs.count(), 2 * units)
+        return len(ctx.captured_queries)
+
+    def test_update_xulysukientbs_constant_queries(self):
+        """Kiểm tra số truy vấn không phụ thuộc số tổ máy."""
+        self.assertEqual(
+            self._count_update_queries(5),
+            self._count_update_queries(50),
+        )
+
+    def test_filter_by_time_range(self):
+        """Kiểm tra lọc nhật ký sự kiện theo khoảng thời gian."""
+        early = create_nhatkysukien(
+            user=self.user, Thoigian='2025-05-01T08:00:00+07:00',
+        )
+        inside = create_nhatkysukien(
+            user=self.user, Thoigian='2025-05-10T08:00:00+07:00',
+        )
+        create_nhatkysukien(
+            user=self.user, Thoigian='2025-05-20T08:00:00+07:00',
+        )
+
+        res = self.client.get(NHATKYSUKIEN_URL, {
+            'Thoigian_after': '2025-05-05T00:00:00+07:00',
+            'Thoigian_before': '2025-05-15T00:00:00+07:00',
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([n['id'] for n in res.data], [inside.id])
+
+        res = self.client.get(NHATKYSUKIEN_URL, {
+            'Thoigian_before': '2025-05-05T00:00:00+07:00',
+        })
+        self.assertEqual([n['id'] for n in res.data], [early.id])
+
+    def test_filter_by_fields(self):
+        """Kiểm tra lọc theo loại sự cố, ca vận hành và thiết bị."""
+        match = create_nhatkysukien(
+            user=self.user, LoaiSc='Sự cố', CaVanHanh='Ca 1',
+            Hethong_Thietbi='H1',
+        )
+        create_nhatkysukien(
+            user=self.user, LoaiSc='Sự cố', CaVanHanh='Ca 2',
+            Hethong_Thietbi='H1',
+        )
+        create_nhatkysukien(
+            user=self.user, LoaiSc='Bất thường', CaVanHanh='Ca 1',
+            Hethong_Thietbi='H2',
+        )
+
+        res = self.client.get(NHATKYSUKIEN_URL, {
+            'LoaiSc': 'Sự cố', 'CaVanHanh': 'Ca 1',
+        })
+        self.assertEqual([n['id'] for n in res.data], [match.id])
+
+        res = self.client.get(NHATKYSUKIEN_URL, {'Hethong_Thietbi': 'H2'})
+        self.assertEqual(len(res.data), 1)
+
+    def test_long_field_values(self):
+        """Kiểm tra giá trị dài vẫn lưu và lọc được (index md5)."""
+        long_value = ' '.join(['Máy biến áp'] * 800)
+        payload = {
+            'title': 'Sự kiện dài',
+            'Thoigian': '2025-05-01T08:00:00+07:00',
+            'Hethong_Thietbi': long_value,
+        }
+
+        res = self.client.post(NHATKYSUKIEN_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        res = self.client.get(NHATKYSUKIEN_URL, {
+            'Hethong_Thietbi': long_value,
+        })
+        self.assertEqual(len(res.data), 1)
+
+    def test_filter_invalid_time_rejected(self):
+        """Kiểm tra thời gian không hợp lệ trả về lỗi 400."""
+        res = self.client.get(NHATKYSUKIEN_URL, {'Thoigian_after': 'hôm qua'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_sparse_fields_skip_heavy_columns(self):
+        """Kiểm tra ?fields= chỉ đọc các cột được chọn."""
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        nhatkysukien.xulysukientbs.add(
+            Xulysukientb.objects.create(user=self.user, Tomay='H1'),
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                NHATKYSUKIEN_URL, {'fields': 'id,title,Thoigian'},
+            )
+
+        self.assertEqual(list(res.data[0]), ['id', 'title', 'Thoigian'])
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('Hientuong_Dienbien', queries[-1]['sql'])
+
+    def test_excerpt_long_texts(self):
+        """Kiểm tra ?excerpt= cắt ngắn văn bản dài trong SQL."""
+        create_nhatkysukien(user=self.user, Hientuong_Dienbien='Máy ' * 100)
+
+        res = self.client.get(NHATKYSUKIEN_URL, {
+            'omit': 'xulysukientbs', 'excerpt': 7,
+        })
+
+        self.assertEqual(res.data[0]['Hientuong_Dienbien'], 'Máy Máy')
+        self.assertNotIn('xulysukientbs', res.data[0])
+
+    def test_batch_create(self):
+        """Kiểm tra tạo nhiều nhật ký sự kiện trong một request."""
+        existing = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        payload = [
+            {
+                'title': 'Sự cố 1',
+                'CaVanHanh': 'Ca 1',
+                'xulysukientbs': [{'Tomay': 'H1'}, {'Tomay': 'H2'}],
+            },
+            {'title': 'Sự cố 2', 'CaVanHanh': 'Ca 1'},
+            {'title': 'Sự cố 3', 'xulysukientbs': [{'Tomay': 'H2'}]},
+        ]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        nhatkysukiens = [
+            Nhatkysukien.objects.get(id=pk, user=self.user)
+            for pk in res.data['ids']
+        ]
+        self.assertEqual(
+            [n.title for n in nhatkysukiens],
+            ['Sự cố 1', 'Sự cố 2', 'Sự cố 3'],
+        )
+        self.assertIn(existing, nhatkysukiens[0].xulysukientbs.all())
+        self.assertEqual(nhatkysukiens[0].xulysukientbs.count(), 2)
+        self.assertEqual(nhatkysukiens[1].xulysukientbs.count(), 0)
+        self.assertEqual(
+            Xulysukientb.objects.filter(user=self.user, Tomay='H2').count(),
+            1,
+        )
+
+    def test_batch_create_invalid_writes_nothing(self):
+        """Kiểm tra một sự kiện lỗi thì không ghi sự kiện nào."""
+        payload = [{'title': 'Hợp lệ'}, {'CaVanHanh': 'Ca 2'}]
+
+        res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('title', res.data[1])
+        self.assertFalse(Nhatkysukien.objects.exists())
+
+    def test_concurrent_tomay_resolves_to_one_record(self):
+        """Kiểm tra Tomay vừa được tạo song song không bị nhân đôi."""
+        serializer = NhatkysukienSerializer(
+            context={'request': type('Request', (), {'user': self.user})},
+        )
+        racing = Xulysukientb(user=self.user, Tomay='H1')
+        real_filter = Xulysukientb.objects.filter
+
+        def filter_then_race(*args, **kwargs):
+            # Another request inserts H1 right after the first lookup.
+            queryset = real_filter(*args, **kwargs)
+            if racing.id is None:
+                racing.save()
+            return queryset
+
+        with patch.object(Xulysukientb.objects, 'filter', filter_then_race):
+            objs = serializer._get_or_create_xulysukientbs(
+                [{'Tomay': 'H1'}, {'Tomay': 'H2'}],
+            )
+
+        self.assertEqual(objs[0].id, racing.id)
+        self.assertEqual(
+            Xulysukientb.objects.filter(user=self.user).count(), 2,
+        )
+
+    def test_rename_to_existing_tomay_rejected(self):
+        """Kiểm tra đổi Tomay trùng với bản ghi khác bị từ chối."""
+        Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        other = Xulysukientb.objects.create(user=self.user, Tomay='H2')
+        url = reverse('nhatkysukien:xulysukientb-detail', args=[other.id])
+
+        res = self.client.patch(url, {'Tomay': 'H1'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Tomay', res.data)
+
+    def test_batch_create_empty(self):
+        """Kiểm tra danh sách rỗng bị từ chối."""
+        res = self.client.post(BATCH_URL, [], format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def _count_batch_queries(self, size):
+        """Tạo một lô sự kiện, trả về số truy vấn đã chạy."""
+        payload = [
+            {
+                'title': f'Sự cố {i}',
+                'xulysukientbs': [{'Tomay': f'H{i % 7}'}, {'Tomay': 'H0'}],
+            }
+            for i in range(size)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(BATCH_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['ids']), size)
+        return len(ctx.captured_queries)
+
+    def test_batch_create_constant_queries(self):
+        """Kiểm tra 100 sự kiện chỉ tốn vài truy vấn."""
+        # Lookup, upsert and re-read of the new Tomay, events, link rows.
+        self.assertLessEqual(self._count_batch_queries(100), 7)
+        self.assertEqual(
+            self._count_batch_queries(10), self._count_batch_queries(100),
+        )
+
+
+class AsgiExportTests(TransactionTestCase):
+    """Kiểm tra xuất nhật ký sự kiện khi chạy ASGI."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_export_ndjson(self):
+        """Kiểm tra dữ liệu xuất được đọc ngoài event loop."""
+        nhatkysukien = create_nhatkysukien(user=self.user)
+        xulysukientb = Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        nhatkysukien.xulysukientbs.add(xulysukientb)
+
+        async def get():
+            try:
+                res = await AsyncClient().get(
+                    EXPORT_URL, authorization=f'Token {self.token}',
+                )
+                # Read like core.asyncviews.ASGIHandler, awaiting parts.
+                parts = [
+                    res.make_bytes(part)
+                    async for part in res.threaded_stream
+                ]
+                return res, b''.join(parts).decode()
+            finally:
+                await sync_to_async(connections.close_all)()
+
+        res, body = asyncio.run(get())
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [nhatkysukien.id])
+        self.assertEqual(rows[0]['xulysukientbs'][0]['Tomay'], 'H1')
+
+
+class NhatkysukienFilterIndexTests(TestCase):
+    """Kiểm tra các bộ lọc dùng index (EXPLAIN)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user(email='user@example.com', password='test123')
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        # Hai năm nhật ký, mỗi giờ một sự kiện, để planner có thống kê thật.
+        Nhatkysukien.objects.bulk_create([
+            Nhatkysukien(
+                user=cls.user,
+                title=f'Sự kiện {i}',
+                Thoigian=start + timedelta(hours=i),
+                LoaiSc=f'Loại {i % 20}',
+                CaVanHanh=f'Ca {i % 30}',
+                Hethong_Thietbi=f'H{i % 40}',
+            )
+            for i in range(2 * 365 * 24)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_nhatkysukien')
+
+    def _plan(self, params):
+        queryset = Nhatkysukien.objects.filter(user=self.user).order_by('-id')
+        filterset = NhatkysukienFilter(params, queryset=queryset)
+        self.assertTrue(filterset.is_valid())
+        return filterset.qs.explain()
+
+    def test_time_range_uses_index(self):
+        plan = self._plan({
+            'Thoigian_after': '2021-05-01T00:00:00Z',
+            'Thoigian_before': '2021-05-02T00:00:00Z',
+        })
+
+        self.assertIn('nhatkysukien_user_time_idx', plan)
+
+    def test_field_filters_use_index(self):
+        for field, index in (
+            ('LoaiSc', 'nhatkysukien_loaisc_md5_idx'),
+            ('CaVanHanh', 'nhatkysukien_ca_md5_idx'),
+            ('Hethong_Thietbi', 'nhatkysukien_htb_md5_idx'),
+        ):
+            with self.subTest(field=field):
+                plan = self._plan({
+                    field: 'x',
+                    'Thoigian_after': '2021-05-01T00:00:00Z',
+                })
+                self.assertIn(index, plan)
@@ -0,0 +1,125 @@
+"""
+Tests for the nhật ký sự kiện search API.
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Nhatkysukien, Xulysukientb
+
+
+SEARCH_URL = reverse('nhatkysukien:search')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+class PublicSearchApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to search."""
+        res = self.client.get(SEARCH_URL, {'q': 'may'})
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSearchApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_search_without_accents(self):
+        """Test searching without diacritics matches accented text."""
+        event = Nhatkysukien.objects.create(
+            user=self.user,
+            title='Sự cố H1',
+            Hientuong_Dienbien='Máy biến áp bị cháy, mất điện toàn bộ.',
+        )
+        Nhatkysukien.objects.create(
+            user=self.user,
+            title='Kiểm tra định kỳ',
+            Hientuong_Dienbien='Vận hành bình thường.',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'may bien ap'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['count'], 1)
+        hit = res.data['results'][0]
+        self.assertEqual(hit['type'], 'nhatkysukien')
+        self.assertEqual(hit['id'], event.id)
+        self.assertIn('<mark>Máy</mark>', hit['snippet'])
+
+    def test_search_ranks_events_and_handling_records(self):
+        """Test hits from both tables are ranked together."""
+        xulysukientb = Xulysukientb.objects.create(
+            user=self.user,
+            Tomay='H2',
+            Noidung_xuly='Thay thế rơ le bảo vệ.',
+        )
+        event = Nhatkysukien.objects.create(
+            user=self.user,
+            title='Rơ le bảo vệ tác động',
+            Hientuong_Dienbien='Rơ le bảo vệ so lệch tác động.',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'ro le'})
+
+        self.assertEqual(
+            [(hit['type'], hit['id']) for hit in res.data['results']],
+            [('nhatkysukien', event.id), ('xulysukientb', xulysukientb.id)],
+        )
+
+    def test_search_cause_analysis(self):
+        """Test the cause analysis of events is searched."""
+        event = Nhatkysukien.objects.create(
+            user=self.user,
+            title='Mất điện tự dùng',
+            Phantich_Nguyennhan='Hỏng cách điện cáp lực.',
+        )
+
+        res = self.client.get(SEARCH_URL, {'q': 'cach dien'})
+
+        self.assertEqual(res.data['count'], 1)
+        hit = res.data['results'][0]
+        self.assertEqual(hit['id'], event.id)
+        self.assertIn('<mark>cách</mark>', hit['snippet'])
+
+    def test_search_limited_to_user(self):
+        """Test search only returns the authenticated user's records."""
+        other_user = create_user(email='other@example.com')
+        Nhatkysukien.objects.create(user=other_user, title='Máy cắt')
+
+        res = self.client.get(SEARCH_URL, {'q': 'may cat'})
+
+        self.assertEqual(res.data['count'], 0)
+
+    def test_search_requires_query(self):
+        """Test an empty search phrase is rejected."""
+        res = self.client.get(SEARCH_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_uses_index(self):
+        """Test the search vector is matched through the GIN index."""
+        sql = 'SET LOCAL enable_seqscan = off; EXPLAIN ' \
+            'SELECT id FROM core_nhatkysukien WHERE search_vector @@ ' \
+            "websearch_to_tsquery('vietnamese_unaccent', 'may')"
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        self.assertIn('nhatkysukien_search_idx', plan)
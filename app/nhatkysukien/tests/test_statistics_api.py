@@ -0,0 +1,126 @@
+"""
+Tests for the nhật ký sự kiện statistics API.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Nhatkysukien, Thongkesukien, Xulysukientb
+
+
+STATISTICS_URL = reverse('nhatkysukien:statistics')
+NHATKYSUKIEN_URL = reverse('nhatkysukien:nhatkysukien-list')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return a user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def stats(user, dimension):
+    """Return the non-empty groups of a dimension as a dict."""
+    return dict(Thongkesukien.objects.filter(
+        user=user, dimension=dimension, count__gt=0,
+    ).values_list('value', 'count'))
+
+
+class PublicStatisticsApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required to read statistics."""
+        res = self.client.get(STATISTICS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatisticsApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create_event(self, **params):
+        payload = {
+            'title': 'Sự cố',
+            'Thoigian': '2025-05-31T23:30:00+07:00',
+            'CaVanHanh': 'Ca 1',
+            'LoaiSc': 'Sự cố',
+            'xulysukientbs': [{'Tomay': 'H1'}, {'Tomay': 'H2'}],
+        }
+        payload.update(params)
+        res = self.client.post(NHATKYSUKIEN_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return Nhatkysukien.objects.get(id=res.data['id'])
+
+    def test_statistics_follow_writes(self):
+        """Test counts follow event and handling record writes."""
+        event = self._create_event()
+        self._create_event(CaVanHanh='Ca 2', xulysukientbs=[{'Tomay': 'H1'}])
+
+        self.assertEqual(stats(self.user, 'Tomay'), {'H1': 2, 'H2': 1})
+        self.assertEqual(stats(self.user, 'CaVanHanh'), {'Ca 1': 1, 'Ca 2': 1})
+        self.assertEqual(stats(self.user, 'LoaiSc'), {'Sự cố': 2})
+        # Tháng tính theo giờ Việt Nam, không theo UTC.
+        self.assertEqual(stats(self.user, 'month'), {'2025-05': 2})
+
+        event.CaVanHanh = 'Ca 2'
+        event.save()
+        Xulysukientb.objects.filter(Tomay='H2').update(Tomay='H3')
+        self.assertEqual(stats(self.user, 'CaVanHanh'), {'Ca 2': 2})
+        self.assertEqual(stats(self.user, 'Tomay'), {'H1': 2, 'H3': 1})
+
+        event.delete()
+        self.assertEqual(stats(self.user, 'Tomay'), {'H1': 1})
+        self.assertEqual(stats(self.user, 'month'), {'2025-05': 1})
+
+    def test_statistics_long_values(self):
+        """Test values too long for a btree entry are still counted."""
+        long_value = ' '.join(['Máy biến áp'] * 800)
+        event = self._create_event(CaVanHanh=long_value, LoaiSc=long_value)
+        self._create_event(CaVanHanh=long_value)
+
+        self.assertEqual(stats(self.user, 'CaVanHanh'), {long_value: 2})
+
+        event.delete()
+        self.assertEqual(stats(self.user, 'CaVanHanh'), {long_value: 1})
+        self.assertEqual(stats(self.user, 'LoaiSc'), {'Sự cố': 1})
+
+    def test_list_statistics(self):
+        """Test the endpoint lists the user's non-empty groups."""
+        self._create_event()
+        self._create_event(xulysukientbs=[{'Tomay': 'H1'}])
+        other = create_user(email='other@example.com')
+        Nhatkysukien.objects.create(user=other, title='Khác', CaVanHanh='X')
+
+        res = self.client.get(STATISTICS_URL, {'dimension': 'Tomay'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [
+            {'dimension': 'Tomay', 'value': 'H1', 'count': 2},
+            {'dimension': 'Tomay', 'value': 'H2', 'count': 1},
+        ])
+        res = self.client.get(STATISTICS_URL)
+        self.assertNotIn('X', [row['value'] for row in res.data])
+
+    def test_invalid_dimension(self):
+        """Test an unknown dimension is rejected."""
+        res = self.client.get(STATISTICS_URL, {'dimension': 'year'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_user_with_events(self):
+        """Test deleting a user also deletes its statistics."""
+        self._create_event()
+
+        self.user.delete()
+
+        self.assertFalse(Thongkesukien.objects.exists())
@@ -1,6 +1,8 @@
 """
 Tests for the tags API.
 """
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.test import TestCase
@@ -88,6 +90,25 @@ class PrivateTagsApiTests(TestCase):
         xulysukientb.refresh_from_db()
         self.assertEqual(xulysukientb.Tomay, payload['Tomay'])
 
+    def test_update_concurrent_rename(self):
+        """Test a rename racing past validation is rejected, not a 500."""
+        Xulysukientb.objects.create(user=self.user, Tomay='H1')
+        xulysukientb = Xulysukientb.objects.create(user=self.user, Tomay='H2')
+
+        # The other rename commits between validation and save.
+        with patch.object(
+            XulysukientbSerializer, 'validate_Tomay',
+            lambda self, value: value,
+        ):
+            res = self.client.patch(detail_url(xulysukientb.id), {
+                'Tomay': 'H1',
+            })
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Tomay', res.data)
+        xulysukientb.refresh_from_db()
+        self.assertEqual(xulysukientb.Tomay, 'H2')
+
     def test_delete_tag(self):
         """Test Xóa một xử lý sự kiện thiết bị"""
         xulysukientb = Xulysukientb.objects.create(user=self.user, Tomay='H2')
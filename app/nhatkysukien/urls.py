@@ -6,17 +6,23 @@ from django.urls import (
     include,
 )
 
-from rest_framework.routers import DefaultRouter
-
+from core.asyncviews import get_router
 from nhatkysukien import views
 
 
-router = DefaultRouter()
+router = get_router()
 router.register('themnhatkysukien', views.NhatkysukienViewSet)
 router.register('xulysukientb', views.XulysukientbViewset)
 
 app_name = 'nhatkysukien'
 
 urlpatterns = [
+    path('search/', views.NhatkysukienSearchView.as_view(), name='search'),
+    path('changes/', views.nhatkysukien_changes, name='changes'),
+    path(
+        'thongke/',
+        views.NhatkysukienStatisticsView.as_view(),
+        name='statistics',
+    ),
     path('', include(router.urls)),
 ]
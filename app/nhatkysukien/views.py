@@ -1,28 +1,88 @@
 """
 Views for the nhật ký sự kiện APIs
 """
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+import asyncio
+from datetime import timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+)
+from django.db.models import F, Q, TextField, Value
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models.functions import Concat
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils.dateparse import parse_datetime
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiParameter,
+    OpenApiTypes,
+)
+from rest_framework import generics, viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
 from rest_framework.permissions import IsAuthenticated
 
-from core.models import Nhatkysukien, Xulysukientb
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from core.mixins import (
+    ConditionalGetMixin,
+    ExportMixin,
+    SPARSE_FIELDS_PARAMETERS,
+    SparseFieldsMixin,
+    ThrottleFirstMixin,
+)
+from core.models import Nhatkysukien, Thongkesukien, Xulysukientb
+from core.pagination import KeysetPagination, SearchPagination
 from nhatkysukien import serializers
+from nhatkysukien.feed import listener
+from nhatkysukien.filters import NhatkysukienFilter
 
 
-class NhatkysukienViewSet(viewsets.ModelViewSet):
+@extend_schema_view(
+    list=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
+)
+class NhatkysukienViewSet(ThrottleFirstMixin,
+                          SparseFieldsMixin,
+                          ExportMixin,
+                          ConditionalGetMixin,
+                          viewsets.ModelViewSet):
     """View for manage nhật ký sự kiện APIs."""
     serializer_class = serializers.NhatkysukienDetailSerializer
     queryset = Nhatkysukien.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    async_reads = True
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = NhatkysukienFilter
+    export_prefetch_related = ('xulysukientbs',)
+    excerpt_fields = (
+        'Hethong_Thietbi', 'Hientuong_Dienbien', 'Quatrinh_Kt', 'LoaiSc',
+        'Baocao_Chidao', 'DeNghi', 'CaVanHanh', 'Donvi_khacPhuc',
+    )
 
     def get_queryset(self):
         """Retrieve nhật ký sự kiện for authenticated user."""
-        return self.queryset.filter(user=self.request.user).order_by('-id')
+        return self.queryset.filter(
+            user=self.request.user,
+        ).order_by('-id').prefetch_related('xulysukientbs')
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
-        if self.action == 'list':
+        if self.action in ('list', 'batch_create'):
             return serializers.NhatkysukienSerializer
 
         return self.serializer_class
@@ -31,15 +91,321 @@ class NhatkysukienViewSet(viewsets.ModelViewSet):
         """Tạo mới 1 nhật ký sự kiện"""
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        request=serializers.NhatkysukienSerializer(many=True),
+        responses={201: serializers.NhatkysukienBatchResultSerializer},
+    )
+    @action(methods=['POST'], detail=False, url_path='batch')
+    def batch_create(self, request):
+        """Tạo nhiều nhật ký sự kiện của một ca trong một request.
+
+        Every event is validated first; nothing is written unless all of
+        them are valid.
+        """
+        serializer = self.get_serializer(
+            data=request.data, many=True, allow_empty=False,
+        )
+        serializer.is_valid(raise_exception=True)
+        nhatkysukiens = serializer.save(user=request.user)
+        result = serializers.NhatkysukienBatchResultSerializer(
+            {'ids': [nhatkysukien.id for nhatkysukien in nhatkysukiens]}
+        )
+
+        return Response(result.data, status=status.HTTP_201_CREATED)
+
 
 class XulysukientbViewset(mixins.DestroyModelMixin, mixins.UpdateModelMixin,
                           mixins.ListModelMixin, viewsets.GenericViewSet):
     """Quản lý xủ lý sự kiện TB trong cơ sở dữ liệu"""
     serializer_class = serializers.XulysukientbSerializer
     queryset = Xulysukientb.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    async_reads = True
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
         return self.queryset.filter(user=self.request.user).order_by('-Tomay')
+
+
+# Text search configuration created in migration 0018 (unaccent + simple).
+SEARCH_CONFIG = 'vietnamese_unaccent'
+
+# Hit type -> (model, text fields the snippet is cut from).
+SEARCH_MODELS = {
+    'nhatkysukien': (
+        Nhatkysukien,
+        ['Hientuong_Dienbien', 'Phantich_Nguyennhan', 'Quatrinh_Kt'],
+    ),
+    'xulysukientb': (Xulysukientb, ['Noidung_xuly', 'Phantich_Nguyennhan_Xl']),
+}
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            'q',
+            OpenApiTypes.STR,
+            required=True,
+            description='Search phrase, with or without Vietnamese accents.',
+        ),
+    ]
+)
+class NhatkysukienSearchView(generics.ListAPIView):
+    """Tìm kiếm không dấu trong nhật ký sự kiện và xử lý sự kiện."""
+    serializer_class = serializers.SearchHitSerializer
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def _search_query(self):
+        """Build the search query from the q parameter."""
+        search = self.request.query_params.get('q', '').strip()
+        if not search:
+            raise ValidationError({'q': 'This query parameter is required.'})
+
+        return SearchQuery(
+            search, config=SEARCH_CONFIG, search_type='websearch',
+        )
+
+    def get_queryset(self):
+        """Rank matching events and handling records of the user."""
+        query = self._search_query()
+        hits = [
+            model.objects.filter(
+                user=self.request.user,
+                search_vector=query,
+            ).annotate(
+                type=Value(hit_type, output_field=TextField()),
+                rank=SearchRank(F('search_vector'), query),
+            ).values('type', 'id', 'title', 'rank')
+            for hit_type, (model, _) in SEARCH_MODELS.items()
+        ]
+
+        return hits[0].union(*hits[1:], all=True).order_by(
+            '-rank', 'type', '-id',
+        )
+
+    def _snippets(self, hits):
+        """Return highlighted snippets for a page of hits."""
+        query = self._search_query()
+        snippets = {}
+        for hit_type, (model, fields) in SEARCH_MODELS.items():
+            ids = [hit['id'] for hit in hits if hit['type'] == hit_type]
+            if not ids:
+                continue
+            text = Concat(
+                *[part for field in fields for part in (F(field), Value(' '))],
+                output_field=TextField(),
+            )
+            rows = model.objects.filter(id__in=ids).annotate(
+                snippet=SearchHeadline(
+                    text,
+                    query,
+                    config=SEARCH_CONFIG,
+                    start_sel='<mark>',
+                    stop_sel='</mark>',
+                    max_fragments=2,
+                ),
+            ).values_list('id', 'snippet')
+            snippets.update(((hit_type, pk), snippet) for pk, snippet in rows)
+
+        return snippets
+
+    def list(self, request, *args, **kwargs):
+        """Return a page of hits, highlighting only the rows on the page."""
+        page = self.paginate_queryset(self.get_queryset())
+        snippets = self._snippets(page)
+        for hit in page:
+            hit['snippet'] = snippets.get((hit['type'], hit['id']), '')
+
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            'dimension',
+            OpenApiTypes.STR,
+            enum=[choice for choice, _ in Thongkesukien.DIMENSION_CHOICES],
+            description='Only return groups of this dimension.',
+        ),
+    ]
+)
+class NhatkysukienStatisticsView(generics.ListAPIView):
+    """Thống kê sự kiện theo tổ máy, ca vận hành, loại sự cố và tháng.
+
+    Reads the incrementally maintained summary table, so the cost grows
+    with the number of groups rather than the number of events.
+    """
+    serializer_class = serializers.ThongkesukienSerializer
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [IsAuthenticated]
+    pagination_class = None
+
+    def get_queryset(self):
+        """Return the non-empty groups of the authenticated user."""
+        queryset = Thongkesukien.objects.filter(
+            user=self.request.user,
+            count__gt=0,
+        )
+        dimension = self.request.query_params.get('dimension')
+        if dimension is not None:
+            if dimension not in dict(Thongkesukien.DIMENSION_CHOICES):
+                raise ValidationError({'dimension': 'Unknown dimension.'})
+            queryset = queryset.filter(dimension=dimension)
+
+        return queryset.order_by('dimension', '-count', 'value')
+
+
+def _format_cursor(value):
+    """Return an URL-safe ISO timestamp (UTC, "Z" suffix)."""
+    return value.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def _authenticate(request):
+    """Authenticate a plain Django request with the API token."""
+    for authentication in (
+        CachedTokenAuthentication(),
+        SignedTokenAuthentication(),
+    ):
+        result = authentication.authenticate(request)
+        if result is not None:
+            return result[0]
+    raise AuthenticationFailed()
+
+
+def _parse_changes_params(params):
+    """Return (since_updated_at, since_id, timeout) from query params."""
+    errors = {}
+    since_updated_at = params.get('since_updated_at')
+    if since_updated_at is not None:
+        since_updated_at = parse_datetime(since_updated_at)
+        if since_updated_at is None or since_updated_at.tzinfo is None:
+            errors['since_updated_at'] = 'Must be an ISO 8601 timestamp.'
+    since_id = params.get('since_id')
+    if since_id is not None:
+        if not since_id.isdigit():
+            errors['since_id'] = 'Must be an integer.'
+        since_id = int(since_id) if since_id.isdigit() else None
+    timeout = params.get('timeout', settings.CHANGE_FEED_TIMEOUT)
+    try:
+        timeout = min(max(float(timeout), 0), settings.CHANGE_FEED_TIMEOUT)
+    except ValueError:
+        errors['timeout'] = 'Must be a number of seconds.'
+    if errors:
+        raise ValidationError(errors)
+
+    return since_updated_at, since_id, timeout
+
+
+def _changes(request, user, since_updated_at, since_id):
+    """Return the feed page after a cursor, or the current cursor."""
+    queryset = Nhatkysukien.objects.filter(user=user)
+    if since_updated_at is None and since_id is None:
+        latest = queryset.order_by('-updated_at', '-id').values(
+            'updated_at', 'id',
+        ).first()
+        return {
+            'results': [],
+            'since_updated_at': latest and _format_cursor(
+                latest['updated_at']
+            ),
+            'since_id': latest and latest['id'],
+        }
+
+    if since_updated_at is not None:
+        queryset = queryset.filter(
+            Q(updated_at__gt=since_updated_at)
+            | Q(updated_at=since_updated_at, id__gt=since_id or 0)
+        )
+    else:
+        queryset = queryset.filter(id__gt=since_id)
+    rows = list(queryset.order_by('updated_at', 'id').prefetch_related(
+        'xulysukientbs',
+    )[:settings.PAGINATION_PAGE_SIZE])
+    data = {
+        'results': serializers.NhatkysukienSerializer(
+            rows, many=True, context={'request': request},
+        ).data,
+        'since_updated_at': since_updated_at and _format_cursor(
+            since_updated_at
+        ),
+        'since_id': since_id,
+    }
+    if rows:
+        data['since_updated_at'] = _format_cursor(rows[-1].updated_at)
+        data['since_id'] = rows[-1].id
+
+    return data
+
+
+async def nhatkysukien_changes(request):
+    """Long-poll feed of nhật ký sự kiện created or updated after a cursor.
+
+    Pass the ``since_updated_at`` and ``since_id`` of the previous response
+    (or just ``since_id`` to follow new events). Without any change the
+    request waits up to ``timeout`` seconds for one; without a cursor it
+    returns the current cursor at once. Deletions are not reported.
+
+    Only under ASGI (SERVER_MODE=asgi) does the request wait: a WSGI
+    worker would be blocked for the whole wait, so there the feed is
+    answered at once and clients poll.
+
+    ``updated_at`` and ``id`` are assigned before the writing transaction
+    commits, so a change committed after a later one was already read
+    falls behind the cursor and is not reported. Clients needing every
+    change should now and then re-read from a cursor a few seconds back;
+    results are keyed by id, so repeats are harmless.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    try:
+        user = await sync_to_async(_authenticate)(request)
+        cursor = _parse_changes_params(request.GET)
+    except (AuthenticationFailed, ValidationError) as exc:
+        detail = exc.detail
+        if not isinstance(detail, dict):
+            detail = {'detail': detail}
+        response = JsonResponse(detail, status=exc.status_code)
+        if exc.status_code == 401:
+            response['WWW-Authenticate'] = 'Token'
+        return response
+
+    since_updated_at, since_id, timeout = cursor
+    has_cursor = since_updated_at is not None or since_id is not None
+    if not (isinstance(request, ASGIRequest) and has_cursor and timeout):
+        return JsonResponse(await sync_to_async(_changes)(
+            request, user, since_updated_at, since_id,
+        ))
+
+    await sync_to_async(listener.start)()
+    # Subscribe before reading, so no write can slip in between.
+    changed = listener.subscribe(user.id)
+    try:
+        data = await sync_to_async(_changes)(
+            request, user, since_updated_at, since_id,
+        )
+        if not data['results']:
+            try:
+                await asyncio.wait_for(changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            else:
+                data = await sync_to_async(_changes)(
+                    request, user, since_updated_at, since_id,
+                )
+    finally:
+        listener.unsubscribe(user.id, changed)
+
+    return JsonResponse(data)
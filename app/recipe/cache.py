@@ -0,0 +1,22 @@
+"""
+Response cache for the tag and ingredient list APIs.
+"""
+from django.core.cache import caches
+
+
+def attr_list_cache():
+    """Return the cache holding tag and ingredient list responses."""
+    return caches['api']
+
+
+def attr_list_key(basename, user_id, assigned_only):
+    """Return the cache key of one user's tag or ingredient list."""
+    return f'recipe-attr-list:{basename}:{user_id}:{int(assigned_only)}'
+
+
+def invalidate_attr_lists(basename, user_id, assigned_only=None):
+    """Drop a user's cached lists, or only one assigned_only variant."""
+    variants = [False, True] if assigned_only is None else [assigned_only]
+    attr_list_cache().delete_many(
+        [attr_list_key(basename, user_id, variant) for variant in variants]
+    )
@@ -0,0 +1,244 @@
+"""
+Background processing of uploaded recipe images.
+"""
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.models import Recipe
+
+
+# Field -> (bounding box, Pillow format, file extension).
+VARIANTS = {
+    'image_thumbnail': ((200, 200), 'JPEG', '.jpg'),
+    'image_medium': ((800, 800), 'JPEG', '.jpg'),
+    'image_webp': ((800, 800), 'WEBP', '.webp'),
+}
+
+# Formats Pillow opens under a name it cannot save as.
+SAVE_FORMATS = {'MPO': 'JPEG'}
+
+# APP1 (EXIF, XMP), APP13 (IPTC) and COM segments of a JPEG.
+JPEG_METADATA_MARKERS = {0xE1, 0xED, 0xFE}
+
+ORIENTATION = 0x0112
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    """Return the worker pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='recipe-image',
+        )
+    return _executor
+
+
+def available_variants():
+    """Return the VARIANTS this Pillow build can encode.
+
+    WebP needs Pillow built against libwebp; without it that variant is
+    left empty rather than failing the others.
+    """
+    return {
+        field: variant for field, variant in VARIANTS.items()
+        if variant[1] != 'WEBP' or features.check('webp')
+    }
+
+
+def strip_jpeg_metadata(data, orientation=None):
+    """Return JPEG bytes without their metadata, losslessly.
+
+    EXIF, XMP, IPTC and comment segments are dropped without decoding the
+    image, as are the extra images of MPO files. A non-default EXIF
+    ``orientation`` is written back on its own, since the pixels are not
+    rotated.
+    """
+    if data[:2] != b'\xff\xd8':
+        raise ValueError('Not a JPEG file.')
+    parts = [data[:2]]
+    if orientation not in (None, 1):
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        payload = exif.tobytes()
+        parts.append(b'\xff\xe1' + (len(payload) + 2).to_bytes(2, 'big'))
+        parts.append(payload)
+
+    pos = 2
+    while True:
+        if data[pos] != 0xFF:
+            raise ValueError('Corrupt JPEG marker.')
+        marker = data[pos + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker.
+            pos += 1
+            continue
+        if marker == 0xDA:
+            break
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], 'big')
+        segment = data[pos:end]
+        if marker not in JPEG_METADATA_MARKERS and not (
+            marker == 0xE2 and segment[4:8] == b'MPF\x00'
+        ):
+            parts.append(segment)
+        pos = end
+
+    # Entropy-coded data escapes 0xFF bytes, so the first EOI marker ends
+    # the primary image; anything after it belongs to an MPO.
+    end = data.find(b'\xff\xd9', pos)
+    parts.append(data[pos:] if end == -1 else data[pos:end + 2])
+    return b''.join(parts)
+
+
+def strip_metadata(img, data):
+    """Return the bytes of an uploaded image without its metadata.
+
+    JPEGs are rewritten losslessly (see strip_jpeg_metadata). Other
+    formats are re-encoded, keeping the colour profile, only if they carry
+    EXIF, XMP or text chunks; animated images are returned unchanged so
+    they keep their frames.
+    """
+    image_format = SAVE_FORMATS.get(img.format, img.format)
+    if image_format == 'JPEG':
+        return strip_jpeg_metadata(data, img.getexif().get(ORIENTATION))
+    has_metadata = (
+        img.getexif()
+        or getattr(img, 'text', None)
+        or {'xmp', 'XML:com.adobe.xmp'} & set(img.info)
+    )
+    if getattr(img, 'is_animated', False) or not has_metadata:
+        return data
+
+    options = {
+        key: img.info[key] for key in ('icc_profile', 'transparency')
+        if key in img.info
+    }
+    img.info = {}
+    buffer = io.BytesIO()
+    img.save(buffer, format=image_format, quality=95, **options)
+    return buffer.getvalue()
+
+
+def render_variants(image_file):
+    """Decode an image once and return its variants as files.
+
+    The image is rotated according to its EXIF orientation, and the
+    variants are written without any EXIF metadata. The original, without
+    its metadata, is returned under ``'image'`` if it had any. A variant
+    that cannot be made is logged and left out, without losing the others.
+    """
+    data = image_file.read()
+    variants = {}
+    with Image.open(io.BytesIO(data)) as img:
+        try:
+            stripped = strip_metadata(img, data)
+            if stripped != data:
+                variants['image'] = stripped
+        except Exception:
+            logger.exception(
+                'Stripping the metadata of %s failed.', img.format,
+            )
+        img = ImageOps.exif_transpose(img)
+
+    img = img.convert('RGB')
+    for field, (size, image_format, ext) in available_variants().items():
+        try:
+            variant = img.copy()
+            variant.thumbnail(size)
+            buffer = io.BytesIO()
+            variant.save(buffer, format=image_format, quality=85)
+        except Exception:
+            logger.exception('Rendering the %s variant failed.', field)
+            continue
+        variants[field] = ContentFile(buffer.getvalue(), name=f'{field}{ext}')
+
+    return variants
+
+
+def _replace_file(path, content):
+    """Overwrite a stored file atomically, keeping its name and URL."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        os.chmod(tmp, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def delete_files(names):
+    """Delete stored files replaced by a newer upload."""
+    for name in names:
+        if name:
+            default_storage.delete(name)
+
+
+def process_recipe_image(recipe_id, image_name, stale_files=()):
+    """Strip the metadata of a recipe image and record its variants.
+
+    ``stale_files`` (the previous upload and its variants) are deleted
+    first. Does nothing else if the recipe is gone or its image was
+    replaced by a newer upload in the meantime; that upload schedules its
+    own processing.
+    """
+    delete_files(stale_files)
+    recipe = Recipe.objects.filter(id=recipe_id, image=image_name).first()
+    if recipe is None:
+        return
+
+    with recipe.image.open('rb') as image_file:
+        variants = render_variants(image_file)
+    if 'image' in variants:
+        _replace_file(recipe.image.path, variants.pop('image'))
+    for field, content in variants.items():
+        getattr(recipe, field).save(content.name, content, save=False)
+
+    Recipe.objects.filter(id=recipe_id, image=image_name).update(
+        updated_at=timezone.now(),
+        **{field: getattr(recipe, field).name for field in variants},
+    )
+
+
+def _process_in_worker(recipe_id, image_name, stale_files):
+    """Run process_recipe_image on a worker thread's own connection."""
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id, image_name, stale_files)
+    except Exception:
+        # Nobody waits on the future, so this is the only trace of it.
+        logger.exception(
+            'Processing image %s of recipe %s failed.', image_name, recipe_id,
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_recipe_image(recipe, stale_files=()):
+    """Process the recipe image off the request thread.
+
+    With IMAGE_PROCESSING_WORKERS set to 0 the image is processed inline.
+    """
+    if settings.IMAGE_PROCESSING_WORKERS <= 0:
+        process_recipe_image(recipe.id, recipe.image.name, stale_files)
+        return None
+
+    return _get_executor().submit(
+        _process_in_worker, recipe.id, recipe.image.name, stale_files,
+    )
@@ -0,0 +1,90 @@
+"""
+Bulk importer for recipe APIs
+"""
+from django.conf import settings
+from django.db import transaction
+from rest_framework.exceptions import ParseError, ValidationError
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_attr_lists
+
+
+class RecipeImporter:
+    """Validate recipes one by one and write them in batches.
+
+    Each line is validated with the regular recipe serializer; a single
+    serializer instance is reused so its field tree is built only once. Valid
+    recipes are buffered and flushed with one bulk insert per table: tags
+    and ingredients are resolved by name for the whole batch, then the
+    recipes and their M2M link rows are inserted.
+    """
+    batch_size = settings.IMPORT_BATCH_SIZE
+
+    def __init__(self, serializer_class, context):
+        self.user = context['request'].user
+        self.serializer = serializer_class(context=context)
+        self.created = 0
+        self.errors = []
+
+    def run(self, lines):
+        """Import (line number, data) pairs, returning a summary."""
+        batch = []
+        for line_number, data in lines:
+            if isinstance(data, ParseError):
+                self.errors.append(
+                    {'line': line_number, 'errors': [data.detail]}
+                )
+                continue
+            try:
+                batch.append(self.serializer.run_validation(data))
+            except ValidationError as exc:
+                self.errors.append({'line': line_number, 'errors': exc.detail})
+                continue
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+        return {'created': self.created, 'errors': self.errors}
+
+    def _resolve(self, model, batch, key):
+        """Map names used in the batch to objects, creating missing ones."""
+        attrs = [attr for data in batch for attr in data.get(key, [])]
+        objs = self.serializer._get_or_create_attrs(model, attrs)
+        return {obj.name: obj for obj in objs}
+
+    @transaction.atomic
+    def _write(self, batch):
+        """Insert a batch of validated recipes and their relations."""
+        tags = self._resolve(Tag, batch, 'tags')
+        ingredients = self._resolve(Ingredient, batch, 'ingredients')
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=self.user,
+                **{
+                    field: value for field, value in data.items()
+                    if field not in ('tags', 'ingredients')
+                },
+            )
+            for data in batch
+        )
+
+        links = [
+            (Recipe.tags.through, 'tags', 'tag_id', tags),
+            (Recipe.ingredients.through, 'ingredients', 'ingredient_id',
+             ingredients),
+        ]
+        for through, key, column, objs in links:
+            through.objects.bulk_create(
+                through(recipe_id=recipe.id, **{column: objs[name].id})
+                for recipe, data in zip(recipes, batch)
+                for name in dict.fromkeys(
+                    attr['name'] for attr in data.get(key, [])
+                )
+            )
+
+        self.created += len(recipes)
+        # Link rows were bulk inserted without m2m_changed signals.
+        for basename in ('tag', 'ingredient'):
+            invalidate_attr_lists(basename, self.user.id, assigned_only=True)
@@ -4,6 +4,7 @@ Serializers for recipe APIs
 from rest_framework import serializers
 
 from core.models import Recipe, Tag, Ingredient
+from recipe.cache import invalidate_attr_lists
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -34,37 +35,43 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'time_minutes',
             'price', 'link', 'tags',
-            'ingredients', 'image'
+            'ingredients', 'image', 'image_thumbnail',
             ]
-        read_only_fields = ['id']
-
-    def _get_or_create_tags(self, tags, recipe):
-        """Handle getting or creating tags as needed."""
-        auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-                )
-            recipe.tags.add(tag_obj)
+        read_only_fields = ['id', 'image_thumbnail']
 
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """Handle getting or creating ingredients as needed"""
+    def _get_or_create_attrs(self, model, attrs):
+        """Return objects for the given names, bulk creating missing ones."""
+        if not attrs:
+            return []
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj, created = Ingredient.objects.get_or_create(
+        names = list(dict.fromkeys(attr['name'] for attr in attrs))
+        existing = {
+            obj.name: obj for obj in model.objects.filter(
                 user=auth_user,
-                **ingredient,
+                name__in=names,
             )
-            recipe.ingredients.add(ingredient_obj)
+        }
+        missing = [
+            model(user=auth_user, name=name)
+            for name in names if name not in existing
+        ]
+        if missing:
+            model.objects.bulk_create(missing)
+            existing.update((obj.name, obj) for obj in missing)
+            # bulk_create() sends no post_save for recipe.signals to catch.
+            invalidate_attr_lists(model._meta.model_name, auth_user.id)
+
+        return [existing[name] for name in names]
 
     def create(self, validated_data):
         """Create a recipe."""
         tags = validated_data.pop('tags', [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        recipe.tags.add(*self._get_or_create_attrs(Tag, tags))
+        recipe.ingredients.add(
+            *self._get_or_create_attrs(Ingredient, ingredients)
+        )
 
         return recipe
 
@@ -73,11 +80,11 @@ class RecipeSerializer(serializers.ModelSerializer):
         tags = validated_data.pop('tags', None)
         ingredients = validated_data.pop('ingredients', None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            instance.tags.set(self._get_or_create_attrs(Tag, tags))
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            instance.ingredients.set(
+                self._get_or_create_attrs(Ingredient, ingredients)
+            )
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -89,7 +96,12 @@ class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
 
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ['description', 'image']
+        fields = RecipeSerializer.Meta.fields + [
+            'description', 'image', 'image_medium', 'image_webp',
+        ]
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + [
+            'image_medium', 'image_webp',
+        ]
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
@@ -97,6 +109,22 @@ class RecipeImageSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
-        read_only_fields = ['id']
+        fields = [
+            'id', 'image', 'image_thumbnail', 'image_medium', 'image_webp',
+        ]
+        read_only_fields = [
+            'id', 'image_thumbnail', 'image_medium', 'image_webp',
+        ]
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class RecipeImportErrorSerializer(serializers.Serializer):
+    """Serializer for a rejected line of a recipe import."""
+    line = serializers.IntegerField()
+    errors = serializers.JSONField()
+
+
+class RecipeImportResultSerializer(serializers.Serializer):
+    """Serializer for the summary of a recipe import."""
+    created = serializers.IntegerField()
+    errors = RecipeImportErrorSerializer(many=True)
@@ -0,0 +1,39 @@
+"""
+Signal handlers invalidating cached tag and ingredient lists.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.cache import invalidate_attr_lists
+
+
+ATTR_BASENAMES = {Tag: 'tag', Ingredient: 'ingredient'}
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_on_attr_change(sender, instance, **kwargs):
+    """Drop the owner's lists when a tag or ingredient changes."""
+    invalidate_attr_lists(ATTR_BASENAMES[sender], instance.user_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_on_link_change(sender, instance, action, model, **kwargs):
+    """Drop assigned_only lists when recipe links change."""
+    if not action.startswith('post_'):
+        return
+    attr_model = model if isinstance(instance, Recipe) else type(instance)
+    invalidate_attr_lists(
+        ATTR_BASENAMES[attr_model], instance.user_id, assigned_only=True,
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def invalidate_on_recipe_delete(sender, instance, **kwargs):
+    """Drop assigned_only lists when a recipe and its links are deleted."""
+    for basename in ATTR_BASENAMES.values():
+        invalidate_attr_lists(basename, instance.user_id, assigned_only=True)
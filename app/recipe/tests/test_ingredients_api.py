@@ -3,6 +3,7 @@ Tests for the ingredients API.
 """
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
 from django.test import TestCase
 
@@ -47,6 +48,7 @@ class PrivateIngredientsApiTests(TestCase):
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
+        caches['api'].clear()
 
     def test_retrieve_ingredients(self):
         """Test retrieving a list of ingredients."""
@@ -137,3 +139,21 @@ class PrivateIngredientsApiTests(TestCase):
         res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_ingredient_list_cache_invalidated_by_recipe_write(self):
+        """Test ingredients created through a recipe refresh the list."""
+        self.assertEqual(self.client.get(INGREDIENTS_URL).data, [])
+        payload = {
+            'title': 'Pho',
+            'time_minutes': 60,
+            'price': '4.50',
+            'ingredients': [{'name': 'Star Anise'}],
+        }
+        self.client.post(
+            reverse('recipe:recipe-list'), payload, format='json',
+        )
+
+        res = self.client.get(INGREDIENTS_URL, {'assigned_only': 1})
+        self.assertEqual([i['name'] for i in res.data], ['Star Anise'])
+        res = self.client.get(INGREDIENTS_URL)
+        self.assertEqual([i['name'] for i in res.data], ['Star Anise'])
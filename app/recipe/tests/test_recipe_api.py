@@ -2,24 +2,44 @@
 Tests for recipe APIs.
 """
 from decimal import Decimal
+import asyncio
+import csv
+import io
+import json
 import tempfile
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import connection, connections
+from django.test import (
+    AsyncClient,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.authtoken.models import Token
 from rest_framework.test import APIClient
 
 from core.models import Recipe, Tag, Ingredient
+from core.pagination import KeysetPagination
 
 from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
+from recipe.images import VARIANTS, _process_in_worker, available_variants
+from recipe.importers import RecipeImporter
+from recipe.views import RecipeViewSet
 
 
 RECIPES_URL = reverse('recipe:recipe-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+IMPORT_URL = reverse('recipe:recipe-bulk-import')
 
 
 def detail_url(recipe_id):
@@ -376,6 +396,45 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(recipe.ingredients.count(), 0)
 
+    def test_create_recipe_tags_query_count(self):
+        """Test nested tags and ingredients are resolved in bulk."""
+        Tag.objects.create(user=self.user, name='Tag0')
+        payload = {
+            'title': 'Banh Xeo',
+            'time_minutes': 40,
+            'price': Decimal('3.00'),
+            'tags': [{'name': f'Tag{i}'} for i in range(30)],
+            'ingredients': [{'name': f'Ingredient{i}'} for i in range(30)],
+        }
+
+        with self.assertNumQueries(11):
+            res = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.count(), 30)
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 30)
+
+    def test_update_recipe_tags_diff(self):
+        """Test updating tags keeps unchanged links and swaps the rest."""
+        recipe = create_recipe(user=self.user)
+        tag_keep = Tag.objects.create(user=self.user, name='Keep')
+        tag_drop = Tag.objects.create(user=self.user, name='Drop')
+        recipe.tags.add(tag_keep, tag_drop)
+        through = Recipe.tags.through
+        keep_link = through.objects.get(recipe=recipe, tag=tag_keep)
+
+        payload = {'tags': [{'name': 'Keep'}, {'name': 'New'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'Keep', 'New'},
+        )
+        self.assertTrue(through.objects.filter(id=keep_link.id).exists())
+
     def test_filter_by_tags(self):
         """Test filtering recipes by tags."""
         r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
@@ -416,6 +475,366 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_list_paginated_with_cursor(self):
+        """Test paging through recipes with the keyset cursor."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+        expected_ids = [r.id for r in reversed(recipes)]
+
+        res = self.client.get(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            expected_ids[:2],
+        )
+        seen_ids = [r['id'] for r in res.data['results']]
+        next_url = res.data['next']
+        while next_url:
+            res = self.client.get(next_url)
+            seen_ids += [r['id'] for r in res.data['results']]
+            next_url = res.data['next']
+        self.assertEqual(seen_ids, expected_ids)
+
+    def test_list_page_size_capped(self):
+        """Test page size cannot exceed the configured maximum."""
+        for _ in range(3):
+            create_recipe(user=self.user)
+
+        with patch.object(KeysetPagination, 'max_page_size', 2):
+            res = self.client.get(RECIPES_URL, {'page_size': 100})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_list_query_count_constant(self):
+        """Test listing recipes uses the same number of queries at any size.
+
+        One query computes the ETag, then recipes, tags and ingredients.
+        """
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        ingredient = Ingredient.objects.create(user=self.user, name='Salt')
+        created = 0
+        for size in [1, 10, 100]:
+            while created < size:
+                recipe = create_recipe(user=self.user)
+                recipe.tags.add(tag)
+                recipe.ingredients.add(ingredient)
+                created += 1
+
+            with self.subTest(size=size), self.assertNumQueries(4):
+                res = self.client.get(RECIPES_URL)
+
+            self.assertEqual(len(res.data), size)
+
+    def test_detail_query_count(self):
+        """Test recipe detail loads tags and ingredients in bulk."""
+        recipe = create_recipe(user=self.user)
+        for i in range(5):
+            recipe.tags.add(Tag.objects.create(user=self.user, name=f'T{i}'))
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f'I{i}')
+            )
+
+        with self.assertNumQueries(4):
+            res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(len(res.data['tags']), 5)
+        self.assertEqual(len(res.data['ingredients']), 5)
+
+    def test_filter_by_tags_match_all(self):
+        """Test filtering recipes having every listed tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        r1 = create_recipe(user=self.user, title='Vegan Curry')
+        r1.tags.add(tag1, tag2)
+        r2 = create_recipe(user=self.user, title='Vegan Salad')
+        r2.tags.add(tag1)
+
+        params = {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_by_ingredients_match_all(self):
+        """Test filtering recipes having every listed ingredient."""
+        in1 = Ingredient.objects.create(user=self.user, name='Rice')
+        in2 = Ingredient.objects.create(user=self.user, name='Egg')
+        r1 = create_recipe(user=self.user, title='Fried Rice')
+        r1.ingredients.add(in1, in2)
+        r2 = create_recipe(user=self.user, title='Steamed Rice')
+        r2.ingredients.add(in1)
+
+        params = {'ingredients': f'{in1.id},{in2.id}', 'match': 'all'}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data], [r1.id])
+
+    def test_filter_by_tags_no_duplicates_or_distinct(self):
+        """Test recipes matching several tags appear once without DISTINCT."""
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+        self.assertNotIn('DISTINCT', queries[0]['sql'])
+
+    def test_search_recipes(self):
+        """Test full-text search ranks title matches above description."""
+        r1 = create_recipe(
+            user=self.user,
+            title='Chicken Pho',
+            description='Noodle soup.',
+        )
+        r2 = create_recipe(
+            user=self.user,
+            title='Rice Bowl',
+            description='Topped with grilled chicken.',
+        )
+        create_recipe(user=self.user, title='Vegan Curry', description='')
+
+        res = self.client.get(RECIPES_URL, {'q': 'chickens'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data], [r1.id, r2.id])
+
+    def test_search_reflects_updates(self):
+        """Test the search vector follows edits to the recipe."""
+        recipe = create_recipe(user=self.user, title='Banh Mi')
+        payload = {'title': 'Spring Rolls'}
+        self.client.patch(detail_url(recipe.id), payload)
+
+        res = self.client.get(RECIPES_URL, {'q': 'rolls'})
+
+        self.assertEqual([r['id'] for r in res.data], [recipe.id])
+        res = self.client.get(RECIPES_URL, {'q': 'banh'})
+        self.assertEqual(res.data, [])
+
+    def test_export_ndjson(self):
+        """Test exporting recipes streams one JSON object per line."""
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        r1 = create_recipe(user=self.user, title='Pho')
+        r1.tags.add(tag)
+        r2 = create_recipe(user=self.user, title='Bun Cha')
+        create_recipe(user=create_user(email='other@example.com'))
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 1):
+            res = self.client.get(EXPORT_URL)
+            body = b''.join(res.streaming_content).decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [r2.id, r1.id])
+        self.assertEqual(rows[1]['tags'], [{'id': tag.id, 'name': 'Soup'}])
+        self.assertEqual(rows[1]['description'], r1.description)
+
+    def test_export_csv(self):
+        """Test exporting recipes as CSV with a header row."""
+        recipe = create_recipe(user=self.user, title='Goi Cuon')
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+        body = b''.join(res.streaming_content).decode()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('recipe.csv', res['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['id'], str(recipe.id))
+        self.assertEqual(rows[0]['title'], 'Goi Cuon')
+        self.assertEqual(rows[0]['tags'], '[]')
+
+    def _import(self, lines):
+        """Post recipes as an NDJSON body to the import endpoint."""
+        body = '\n'.join(
+            line if isinstance(line, str) else json.dumps(line)
+            for line in lines
+        )
+        return self.client.post(
+            IMPORT_URL,
+            body.encode(),
+            content_type='application/x-ndjson',
+        )
+
+    def test_bulk_import(self):
+        """Test importing recipes with shared tags and ingredients."""
+        Tag.objects.create(user=self.user, name='Soup')
+        lines = [
+            {
+                'title': 'Pho',
+                'time_minutes': 60,
+                'price': '4.50',
+                'tags': [{'name': 'Soup'}, {'name': 'Beef'}],
+                'ingredients': [{'name': 'Noodles'}],
+            },
+            {
+                'title': 'Bun Bo',
+                'time_minutes': 50,
+                'price': '4.00',
+                'description': 'Spicy beef noodle soup.',
+                'tags': [{'name': 'Soup'}, {'name': 'Beef'}],
+                'ingredients': [{'name': 'Noodles'}, {'name': 'Lemongrass'}],
+            },
+        ]
+
+        res = self._import(lines)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data, {'created': 2, 'errors': []})
+        bun_bo = Recipe.objects.get(user=self.user, title='Bun Bo')
+        self.assertEqual(bun_bo.description, 'Spicy beef noodle soup.')
+        self.assertEqual(
+            set(bun_bo.tags.values_list('name', flat=True)),
+            {'Soup', 'Beef'},
+        )
+        self.assertEqual(bun_bo.ingredients.count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user).count(), 2,
+        )
+
+    def test_bulk_import_reports_line_errors(self):
+        """Test invalid lines are reported and valid ones still imported."""
+        valid = {'title': 'Com Tam', 'time_minutes': 20, 'price': '3.00'}
+        lines = [valid, {'title': 'No price'}, '{not json', valid]
+
+        with patch.object(RecipeImporter, 'batch_size', 1):
+            res = self._import(lines)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(
+            [error['line'] for error in res.data['errors']], [2, 3],
+        )
+        self.assertIn('price', res.data['errors'][0]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_import_query_count(self):
+        """Test a batch of recipes is written with a fixed query count."""
+        lines = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '1.00',
+                'tags': [{'name': f'Tag {i % 3}'}],
+                'ingredients': [{'name': 'Salt'}],
+            }
+            for i in range(50)
+        ]
+
+        with self.assertNumQueries(9):
+            res = self._import(lines)
+
+        self.assertEqual(res.data['created'], 50)
+
+    def test_list_not_modified(self):
+        """Test the recipe list answers 304 while nothing has changed."""
+        create_recipe(user=self.user)
+        res = self.client.get(RECIPES_URL)
+        etag = res['ETag']
+
+        with self.assertNumQueries(1):
+            res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_list_etag_changes(self):
+        """Test the list ETag follows creates, edits, deletes and tags."""
+        recipe = create_recipe(user=self.user)
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+        recipe.tags.add(tag)
+        etags = [self.client.get(RECIPES_URL)['ETag']]
+
+        other = create_recipe(user=self.user)
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        self.client.patch(detail_url(recipe.id), {'title': 'New title'})
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        tag.name = 'Dinner'
+        tag.save()
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+        other.delete()
+        etags.append(self.client.get(RECIPES_URL)['ETag'])
+
+        self.assertEqual(len(set(etags)), len(etags))
+        res = self.client.get(RECIPES_URL, HTTP_IF_NONE_MATCH=etags[0])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_not_modified(self):
+        """Test recipe detail supports ETag and Last-Modified validators."""
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        res = self.client.get(url)
+
+        res_etag = self.client.get(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        res_date = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'],
+        )
+
+        self.assertEqual(res_etag.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res_date.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_sparse_fields(self):
+        """Test ?fields= returns and reads only the selected fields."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [dict(row) for row in res.data],
+            [{'id': recipe.id, 'title': recipe.title}],
+        )
+        # ETag aggregate and the recipe rows; no tag/ingredient prefetch.
+        self.assertEqual(len(queries), 2)
+        self.assertNotIn('"link"', queries[-1]['sql'])
+
+    def test_sparse_omit(self):
+        """Test ?omit= leaves out fields and their relations."""
+        recipe = create_recipe(user=self.user)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id), {'omit': 'tags'})
+
+        self.assertNotIn('tags', res.data)
+        self.assertIn('ingredients', res.data)
+        self.assertEqual(res.data['description'], recipe.description)
+
+    def test_sparse_unknown_field(self):
+        """Test unknown field names are rejected."""
+        res = self.client.get(RECIPES_URL, {'fields': 'id,secret'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_excerpt(self):
+        """Test ?excerpt= truncates the description in SQL."""
+        recipe = create_recipe(user=self.user, description='x' * 500)
+
+        res = self.client.get(detail_url(recipe.id), {'excerpt': 20})
+
+        self.assertEqual(res.data['description'], 'x' * 20)
+        res = self.client.get(detail_url(recipe.id), {'excerpt': 0})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_sparse_fields(self):
+        """Test exports honour ?fields=."""
+        create_recipe(user=self.user, title='Pho')
+
+        res = self.client.get(EXPORT_URL, {'fields': 'title'})
+
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).splitlines()
+        ]
+        self.assertEqual(rows, [{'title': 'Pho'}])
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
@@ -430,7 +849,10 @@ class ImageUploadTests(TestCase):
         self.recipe = create_recipe(user=self.user)
 
     def tearDown(self):
+        self.recipe.refresh_from_db()
         self.recipe.image.delete()
+        for field in VARIANTS:
+            getattr(self.recipe, field).delete()
 
     def test_upload_image(self):
         """Test uploading an image to a recipe."""
@@ -454,3 +876,234 @@ class ImageUploadTests(TestCase):
         res = self.client.post(url, payload, format='multipart')
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_generates_variants(self):
+        """Test uploading an image records resized variants without EXIF."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            img = Image.new('RGB', (1600, 1200))
+            exif = Image.Exif()
+            exif[0x010f] = 'Camera maker'
+            img.save(image_file, format='JPEG', exif=exif)
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    url, {'image': image_file}, format='multipart',
+                )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        expected = {
+            'image_thumbnail': ('JPEG', (200, 150)),
+            'image_medium': ('JPEG', (800, 600)),
+            'image_webp': ('WEBP', (800, 600)),
+        }
+        expected = {
+            field: expected[field] for field in available_variants()
+        }
+        for field, (image_format, size) in expected.items():
+            with Image.open(getattr(self.recipe, field).path) as variant:
+                self.assertEqual(variant.format, image_format)
+                self.assertEqual(variant.size, size)
+                self.assertEqual(len(variant.getexif()), 0)
+
+        with Image.open(self.recipe.image.path) as original:
+            self.assertEqual(original.size, (1600, 1200))
+            self.assertEqual(len(original.getexif()), 0)
+
+        res = self.client.get(RECIPES_URL)
+        self.assertTrue(
+            res.data[0]['image_thumbnail'].endswith(
+                self.recipe.image_thumbnail.name.split('/')[-1]
+            )
+        )
+
+    def _upload(self, content, suffix):
+        """Upload raw image bytes with processing run inline."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix=suffix) as image_file:
+            image_file.write(content)
+            image_file.seek(0)
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(
+                    url, {'image': image_file}, format='multipart',
+                )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_jpeg_stripped_losslessly(self):
+        """Test EXIF is dropped from a JPEG without re-encoding it."""
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera maker'
+        exif[0x0112] = 6
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300), 'green').save(
+            buffer, format='JPEG', exif=exif,
+        )
+        content = buffer.getvalue()
+
+        self._upload(content, '.jpg')
+
+        with open(self.recipe.image.path, 'rb') as f:
+            stored = f.read()
+        # The compressed image data is kept byte for byte.
+        scan = content.index(b'\xff\xda')
+        self.assertTrue(stored.endswith(content[scan:]))
+        with Image.open(self.recipe.image.path) as original:
+            self.assertEqual(dict(original.getexif()), {0x0112: 6})
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_animated_image_kept(self):
+        """Test an animated GIF keeps its frames."""
+        frames = [Image.new('P', (40, 40), color) for color in range(3)]
+        buffer = io.BytesIO()
+        frames[0].save(
+            buffer, format='GIF', save_all=True, append_images=frames[1:],
+        )
+
+        self._upload(buffer.getvalue(), '.gif')
+
+        with Image.open(self.recipe.image.path) as original:
+            self.assertEqual(original.n_frames, 3)
+        self.assertTrue(self.recipe.image_thumbnail)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_failed_variant_keeps_others(self):
+        """Test a variant that cannot be encoded does not lose the others."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (400, 300)).save(buffer, format='JPEG')
+        variants = {
+            'image_thumbnail': ((200, 200), 'NOPE', '.nope'),
+            'image_medium': ((800, 800), 'JPEG', '.jpg'),
+        }
+
+        with patch('recipe.images.available_variants', return_value=variants):
+            with self.assertLogs('recipe.images', 'ERROR'):
+                self._upload(buffer.getvalue(), '.jpg')
+
+        self.assertFalse(self.recipe.image_thumbnail)
+        self.assertTrue(self.recipe.image_medium)
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_reupload_deletes_previous_files(self):
+        """Test a new upload removes the previous image and variants."""
+        url = image_upload_url(self.recipe.id)
+        paths = []
+        for _ in range(2):
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+                Image.new('RGB', (400, 300)).save(image_file, format='JPEG')
+                image_file.seek(0)
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.client.post(
+                        url, {'image': image_file}, format='multipart',
+                    )
+            self.recipe.refresh_from_db()
+            paths.append([
+                getattr(self.recipe, field).path
+                for field in ['image', *available_variants()]
+            ])
+
+        for path in paths[0]:
+            self.assertFalse(os.path.exists(path))
+        for path in paths[1]:
+            self.assertTrue(os.path.exists(path))
+
+    @override_settings(IMAGE_PROCESSING_WORKERS=0)
+    def test_upload_image_without_webp_support(self):
+        """Test the other variants are made when WebP cannot be encoded."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (400, 300)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with patch('recipe.images.features.check', return_value=False):
+                with self.captureOnCommitCallbacks(execute=True):
+                    res = self.client.post(
+                        url, {'image': image_file}, format='multipart',
+                    )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_medium)
+        self.assertFalse(self.recipe.image_webp)
+
+    @patch('recipe.images.close_old_connections')
+    def test_failed_processing_logged(self, patched_close):
+        """Test errors of background processing are logged."""
+        with patch(
+            'recipe.images.process_recipe_image',
+            side_effect=OSError('broken image'),
+        ):
+            with self.assertLogs('recipe.images', 'ERROR') as logs:
+                _process_in_worker(
+                    self.recipe.id, 'uploads/recipe/x.jpg', (),
+                )
+
+        self.assertIn('broken image', logs.output[0])
+
+    def test_upload_image_defers_processing(self):
+        """Test variants are not generated inside the upload request."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            with patch('recipe.views.schedule_recipe_image') as schedule:
+                with self.captureOnCommitCallbacks(execute=True):
+                    res = self.client.post(
+                        url, {'image': image_file}, format='multipart',
+                    )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIsNone(res.data['image_thumbnail'])
+        schedule.assert_called_once()
+
+
+class AsgiExportTests(TransactionTestCase):
+    """Test exports streamed by the ASGI handler."""
+
+    def setUp(self):
+        self.user = create_user(email='user@example.com', password='test123')
+        self.token = Token.objects.create(user=self.user)
+
+    def _export(self, params):
+        """Request an export through ASGI and read it on the event loop."""
+        async def get():
+            try:
+                res = await AsyncClient().get(
+                    EXPORT_URL, params, authorization=f'Token {self.token}',
+                )
+                # Read like core.asyncviews.ASGIHandler, awaiting parts.
+                parts = [
+                    res.make_bytes(part)
+                    async for part in res.threaded_stream
+                ]
+                return res, b''.join(parts).decode()
+            finally:
+                await sync_to_async(connections.close_all)()
+
+        return asyncio.run(get())
+
+    def test_export_ndjson(self):
+        """Test the export reads its rows off the event loop."""
+        tag = Tag.objects.create(user=self.user, name='Soup')
+        r1 = create_recipe(user=self.user, title='Pho')
+        r1.tags.add(tag)
+        r2 = create_recipe(user=self.user, title='Bun Cha')
+
+        with patch.object(RecipeViewSet, 'export_chunk_size', 1):
+            res, body = self._export({})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row['id'] for row in rows], [r2.id, r1.id])
+        self.assertEqual(rows[1]['tags'], [{'id': tag.id, 'name': 'Soup'}])
+
+    def test_export_csv(self):
+        """Test CSV exports under ASGI."""
+        recipe = create_recipe(user=self.user, title='Goi Cuon')
+
+        res, body = self._export({'format': 'csv'})
+
+        rows = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual([row['id'] for row in rows], [str(recipe.id)])
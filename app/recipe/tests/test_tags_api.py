@@ -3,6 +3,7 @@ Tests for the tags API.
 """
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
 from django.test import TestCase
 
@@ -11,6 +12,7 @@ from rest_framework.test import APIClient
 
 from core.models import Tag, Recipe
 
+from recipe.cache import attr_list_key
 from recipe.serializers import TagSerializer
 
 
@@ -47,6 +49,7 @@ class PrivateTagsApiTests(TestCase):
         self.user = create_user()
         self.client = APIClient()
         self.client.force_authenticate(self.user)
+        caches['api'].clear()
 
     def test_retrieve_tags(self):
         """Test retrieving a list of tags."""
@@ -137,3 +140,73 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {'assigned_only': 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_tag_list_cached(self):
+        """Test a repeated tag list is served without database queries."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual([t['name'] for t in res.data], ['Vegan'])
+
+    def test_tag_list_cache_invalidated_on_change(self):
+        """Test creating, renaming and deleting tags refreshes the list."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+
+        Tag.objects.create(user=self.user, name='Spicy')
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([t['name'] for t in res.data], ['Vegan', 'Spicy'])
+
+        self.client.patch(detail_url(tag.id), {'name': 'Asian'})
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([t['name'] for t in res.data], ['Spicy', 'Asian'])
+
+        self.client.delete(detail_url(tag.id))
+        res = self.client.get(TAGS_URL)
+        self.assertEqual([t['name'] for t in res.data], ['Spicy'])
+
+    def test_tag_list_cache_shared_between_workers(self):
+        """Test a change in one worker invalidates the other workers' list."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        # A separate backend instance, as another uWSGI worker would have.
+        other_worker = caches.create_connection('api')
+        key = attr_list_key('tag', self.user.id, False)
+        self.assertIsNotNone(other_worker.get(key))
+
+        Tag.objects.create(user=self.user, name='Spicy')
+
+        self.assertIsNone(other_worker.get(key))
+
+    def test_assigned_tags_cache_follows_recipe_links(self):
+        """Test assigned_only lists follow recipe links and deletions."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = Recipe.objects.create(
+            title='Banh Mi',
+            time_minutes=5,
+            price=Decimal('1.50'),
+            user=self.user,
+        )
+        params = {'assigned_only': 1}
+        self.assertEqual(self.client.get(TAGS_URL, params).data, [])
+
+        recipe.tags.add(tag)
+        res = self.client.get(TAGS_URL, params)
+        self.assertEqual([t['id'] for t in res.data], [tag.id])
+
+        recipe.delete()
+        self.assertEqual(self.client.get(TAGS_URL, params).data, [])
+
+    def test_tag_list_cache_per_user(self):
+        """Test cached lists are never shared between users."""
+        Tag.objects.create(user=self.user, name='Vegan')
+        self.client.get(TAGS_URL)
+        user2 = create_user(email='user2@example.com')
+        self.client.force_authenticate(user2)
+
+        res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data, [])
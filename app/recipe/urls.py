@@ -6,12 +6,11 @@ from django.urls import (
     include,
 )
 
-from rest_framework.routers import DefaultRouter
-
+from core.asyncviews import get_router
 from recipe import views
 
 
-router = DefaultRouter()
+router = get_router()
 router.register('recipes', views.RecipeViewSet)
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
@@ -7,15 +7,33 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes,
     )
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, Exists, F, OuterRef
+from django.db import transaction
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
 
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from core.mixins import (
+    ConditionalGetMixin,
+    ExportMixin,
+    SPARSE_FIELDS_PARAMETERS,
+    SparseFieldsMixin,
+    ThrottleFirstMixin,
+)
 from core.models import Recipe, Tag, Ingredient
+from core.pagination import KeysetPagination
+from core.parsers import NDJSONParser
 from recipe import serializers
+from recipe.cache import attr_list_cache, attr_list_key
+from recipe.images import schedule_recipe_image
+from recipe.importers import RecipeImporter
 
 
 @extend_schema_view(
@@ -31,35 +49,92 @@ from recipe import serializers
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'q',
+                OpenApiTypes.STR,
+                description='Full-text search over title and description, '
+                            'ranked by relevance (id order when paginated).',
+            ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=['any', 'all'],
+                description='Match recipes having any (default) or all of '
+                            'the listed tags and ingredients.',
+            ),
+            *SPARSE_FIELDS_PARAMETERS,
         ]
-    )
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
 )
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ThrottleFirstMixin,
+                    SparseFieldsMixin,
+                    ExportMixin,
+                    ConditionalGetMixin,
+                    viewsets.ModelViewSet):
     """Views for manage recipe APIs."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    export_prefetch_related = ('tags', 'ingredients')
+    excerpt_fields = ('description',)
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _filter_related(self, queryset, through, column, ids, match_all):
+        """Filter recipes linked to ids with a semi-join, no DISTINCT."""
+        links = through.objects.filter(**{f'{column}__in': ids})
+        if match_all:
+            matched = links.values('recipe_id').annotate(
+                matched=Count(column),
+            ).filter(matched=len(set(ids))).values('recipe_id')
+            return queryset.filter(id__in=matched)
+
+        return queryset.filter(
+            Exists(links.filter(recipe_id=OuterRef('pk')))
+        )
+
     def get_queryset(self):
         """Retrieve recipes for authenticated user."""
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        search = self.request.query_params.get('q')
+        match_all = self.request.query_params.get('match') == 'all'
         queryset = self.queryset
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_related(
+                queryset, Recipe.tags.through, 'tag_id', tag_ids, match_all,
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = self._filter_related(
+                queryset,
+                Recipe.ingredients.through,
+                'ingredient_id',
+                ingredient_ids,
+                match_all,
+            )
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-id').distinct()
+        queryset = queryset.filter(user=self.request.user)
+        if search:
+            # Config must match the search_vector trigger (migration 0017).
+            query = SearchQuery(
+                search, config='english', search_type='websearch',
+            )
+            queryset = queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query),
+            ).order_by('-rank', '-id')
+        else:
+            queryset = queryset.order_by('-id')
+
+        return queryset.prefetch_related('tags', 'ingredients')
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -73,14 +148,53 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """Create a new recipe."""
         serializer.save(user=self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @extend_schema(
+        request={NDJSONParser.media_type: OpenApiTypes.STR},
+        responses={201: serializers.RecipeImportResultSerializer},
+    )
+    @action(
+        methods=['POST'],
+        detail=False,
+        url_path='import',
+        parser_classes=[NDJSONParser],
+        throttle_scope='import',
+    )
+    def bulk_import(self, request):
+        """Import recipes from an NDJSON body, one recipe per line."""
+        importer = RecipeImporter(
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+        )
+        result = importer.run(request.data)
+        serializer = serializers.RecipeImportResultSerializer(result)
+
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['POST'],
+        detail=True,
+        url_path='upload-image',
+        throttle_scope='upload',
+    )
     def upload_image(self, request, pk=None):
-        """Upload an image to recipe"""
+        """Upload an image to recipe, resizing it in the background."""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            stale_files = [
+                getattr(recipe, field).name for field in (
+                    'image', 'image_thumbnail', 'image_medium', 'image_webp',
+                )
+            ]
+            recipe = serializer.save(
+                image_thumbnail=None,
+                image_medium=None,
+                image_webp=None,
+            )
+            transaction.on_commit(
+                lambda: schedule_recipe_image(recipe, stale_files),
+            )
             return Response(serializer.data, status=status.HTTP_200_OK)
 
         return Response(serializer.data, status=status.HTTP_400_BAD_REQUEST)
@@ -102,14 +216,19 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
     """Base viewset for recipe attributes."""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [IsAuthenticated]
+    async_reads = True
+
+    def _assigned_only(self):
+        return bool(int(self.request.query_params.get('assigned_only', 0)))
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
+        assigned_only = self._assigned_only()
         queryset = self.queryset
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
@@ -118,6 +237,24 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
             user=self.request.user
         ).order_by('-name').distinct()
 
+    def list(self, request, *args, **kwargs):
+        """List items, serving the user's cached response when present.
+
+        Entries are dropped by the recipe.signals handlers when tags,
+        ingredients or recipe links change.
+        """
+        cache = attr_list_cache()
+        key = attr_list_key(
+            self.basename, request.user.id, self._assigned_only(),
+        )
+        data = cache.get(key)
+        if data is None:
+            response = super().list(request, *args, **kwargs)
+            cache.set(key, response.data)
+            return response
+
+        return Response(data)
+
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database."""
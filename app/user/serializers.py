@@ -5,10 +5,13 @@ from django.contrib.auth import (
     get_user_model,
     authenticate,
     )
+from django.core import signing
 from django.utils.translation import gettext as _
 
 from rest_framework import serializers
 
+from core import tokens
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -57,3 +60,61 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class TokenPairSerializer(serializers.Serializer):
+    """Serializer for a signed access and refresh token pair."""
+    access = serializers.CharField(read_only=True)
+    refresh = serializers.CharField(read_only=True)
+    expires_in = serializers.IntegerField(read_only=True)
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    """Serializer exchanging a refresh token for a new pair."""
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        """Validate the refresh token and return the new pair."""
+        try:
+            return tokens.refresh_token_pair(attrs['refresh'])
+        except signing.BadSignature:
+            msg = _('Invalid, expired or revoked refresh token.')
+            raise serializers.ValidationError(msg, code='authorization')
+
+
+class RevokeTokenSerializer(serializers.Serializer):
+    """Serializer adding a token pair to the deny-list."""
+    refresh = serializers.CharField(write_only=True)
+    access = serializers.CharField(write_only=True, required=False)
+
+    def validate_refresh(self, value):
+        """Validate and decode the refresh token."""
+        try:
+            return tokens.read_token(value, tokens.REFRESH)
+        except signing.BadSignature:
+            msg = _('Invalid or expired refresh token.')
+            raise serializers.ValidationError(msg, code='authorization')
+
+    def validate_access(self, value):
+        """Decode the access token; an expired one needs no revoking."""
+        try:
+            return tokens.read_token(value, tokens.ACCESS)
+        except signing.SignatureExpired:
+            return None
+        except signing.BadSignature:
+            msg = _('Invalid access token.')
+            raise serializers.ValidationError(msg, code='authorization')
+
+    def validate(self, attrs):
+        """Check both tokens belong to the same user."""
+        access = attrs.get('access')
+        if access and access['u'] != attrs['refresh']['u']:
+            msg = _('Tokens belong to different users.')
+            raise serializers.ValidationError(msg, code='authorization')
+        return attrs
+
+    def save(self):
+        """Revoke the tokens."""
+        tokens.revoke(self.validated_data['refresh'], tokens.REFRESH)
+        if self.validated_data.get('access'):
+            tokens.revoke(self.validated_data['access'], tokens.ACCESS)
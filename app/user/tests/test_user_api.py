@@ -1,16 +1,26 @@
 """
 Tests for the user API.
 """
-from django.test import TestCase
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core import tokens
+from core.models import RefreshTokenFamily, RevokedToken
+
 
 CREATE_USER_URL = reverse('user:create')
 TOKEN_URL = reverse('user:token')
+TOKEN_PAIR_URL = reverse('user:token-pair')
+TOKEN_REFRESH_URL = reverse('user:token-refresh')
+TOKEN_REVOKE_URL = reverse('user:token-revoke')
 ME_URL = reverse('user:me')
 
 
@@ -157,3 +167,176 @@ class PrivateUserApiTests(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class SignedTokenApiTests(TestCase):
+    """Test the signed access and refresh token endpoints."""
+
+    def setUp(self):
+        caches['auth'].clear()
+        caches['throttle'].clear()
+        self.user = create_user(
+            email='test@example.com',
+            password='testpass123',
+            name='Test Name',
+        )
+        self.client = APIClient()
+        res = self.client.post(TOKEN_PAIR_URL, {
+            'email': 'test@example.com',
+            'password': 'testpass123',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.pair = res.data
+
+    def _get_me(self, access):
+        return self.client.get(
+            ME_URL, HTTP_AUTHORIZATION=f'Bearer {access}',
+        )
+
+    def test_access_token_authenticates(self):
+        """Test a warm access token is verified without queries."""
+        self.assertEqual(self._get_me(self.pair['access']).status_code, 200)
+
+        with self.assertNumQueries(0):
+            res = self._get_me(self.pair['access'])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['email'], self.user.email)
+
+    def test_tampered_access_token_rejected(self):
+        """Test a modified access token is rejected."""
+        res = self._get_me(self.pair['access'] + 'x')
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_not_accepted_as_access(self):
+        """Test a refresh token cannot authenticate requests."""
+        res = self._get_me(self.pair['refresh'])
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_access_token_rejected(self):
+        """Test access tokens stop working after their lifetime."""
+        with override_settings(ACCESS_TOKEN_LIFETIME=-1):
+            res = self._get_me(self.pair['access'])
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_rotates_pair(self):
+        """Test refreshing returns a new pair and uses up the old token."""
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res.data['refresh'], self.pair['refresh'])
+        self.assertEqual(self._get_me(res.data['access']).status_code, 200)
+
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_refresh_after_password_change_rejected(self):
+        """Test a password change invalidates refresh tokens."""
+        self.user.set_password('newpass123')
+        self.user.save()
+
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deactivated_user_rejected(self):
+        """Test deactivating a user rejects its access token."""
+        self._get_me(self.pair['access'])
+
+        self.user.is_active = False
+        self.user.save()
+
+        res = self._get_me(self.pair['access'])
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user_rejected(self):
+        """Test deleting a user rejects its access token."""
+        self._get_me(self.pair['access'])
+
+        self.user.delete()
+
+        res = self._get_me(self.pair['access'])
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revoke_pair(self):
+        """Test revoked tokens can neither authenticate nor refresh."""
+        self._get_me(self.pair['access'])
+
+        res = self.client.post(TOKEN_REVOKE_URL, {
+            'refresh': self.pair['refresh'],
+            'access': self.pair['access'],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self._get_me(self.pair['access'])
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revoke_reaches_other_workers(self):
+        """Test a revoked access token is refused by every worker at once."""
+        self._get_me(self.pair['access'])
+        # A separate backend instance, as another uWSGI worker would have.
+        other_worker = caches.create_connection('auth')
+        jti = tokens.read_token(self.pair['access'], tokens.ACCESS)['j']
+        cache_key = tokens.revoked_cache_key(jti)
+        self.assertIs(other_worker.get(cache_key), False)
+
+        self.client.post(TOKEN_REVOKE_URL, {
+            'refresh': self.pair['refresh'],
+            'access': self.pair['access'],
+        })
+
+        self.assertIs(other_worker.get(cache_key), True)
+
+    def test_refresh_leaves_deny_list_alone(self):
+        """Test rotation needs no deny-list entry."""
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertEqual(
+            list(RefreshTokenFamily.objects.values_list(
+                'generation', flat=True,
+            )),
+            [1],
+        )
+
+    def test_refresh_reuse_ends_family(self):
+        """Test reusing a used refresh token invalidates its successor."""
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+        successor = res.data['refresh']
+
+        res = self.client.post(
+            TOKEN_REFRESH_URL, {'refresh': self.pair['refresh']},
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(TOKEN_REFRESH_URL, {'refresh': successor})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_prune_deletes_expired_rows(self):
+        """Test pruning keeps only unexpired deny-list entries and families."""
+        past = timezone.now() - timedelta(seconds=1)
+        RevokedToken.objects.create(jti='old', expires_at=past)
+        RefreshTokenFamily.objects.create(user=self.user, expires_at=past)
+
+        self.assertEqual(tokens.prune(), 2)
+
+        self.assertFalse(RevokedToken.objects.exists())
+        self.assertEqual(RefreshTokenFamily.objects.count(), 1)
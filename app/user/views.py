@@ -1,11 +1,25 @@
 """
 Views for the user API.
 """
-from rest_framework import generics, authentication, permissions
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from core import tokens
+from core.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from core.mixins import ThrottleFirstMixin
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    RefreshTokenSerializer,
+    RevokeTokenSerializer,
+    TokenPairSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -13,16 +27,61 @@ class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
 
-class CreateTokenView(ObtainAuthToken):
+class CreateTokenView(ThrottleFirstMixin, ObtainAuthToken):
     """Create a new auth token for user."""
+    throttle_scope = 'login'
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
 
+class CreateTokenPairView(ThrottleFirstMixin, ObtainAuthToken):
+    """Create a signed access and refresh token pair for user."""
+    throttle_scope = 'login'
+    serializer_class = AuthTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+    @extend_schema(responses=TokenPairSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response(tokens.token_pair(user))
+
+
+class RefreshTokenView(generics.GenericAPIView):
+    """Exchange a refresh token for a new pair, without the password."""
+    serializer_class = RefreshTokenSerializer
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(responses=TokenPairSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response(serializer.validated_data)
+
+
+class RevokeTokenView(generics.GenericAPIView):
+    """Revoke a refresh token and, optionally, its access token."""
+    serializer_class = RevokeTokenSerializer
+    authentication_classes = []
+    permission_classes = []
+
+    @extend_schema(responses={status.HTTP_204_NO_CONTENT: None})
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
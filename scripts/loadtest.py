@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Hold many keep-alive connections against one URL and report throughput.
+
+Used to compare the uWSGI and ASGI serving modes, e.g.:
+
+    python scripts/loadtest.py http://localhost/api/recipe/tags/ \
+        --connections 500 --duration 30 \
+        --header "Authorization: Token <token>"
+
+Only the standard library is needed.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+
+async def _read_body(reader, headers):
+    """Read a response body framed by Content-Length or chunks."""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                return
+    await reader.readexactly(int(headers.get('content-length', 0)))
+
+
+class _Closed(Exception):
+    """The server closed an idle keep-alive connection."""
+
+
+async def _request(reader, writer, request):
+    """Send one request and return (status, keep_alive)."""
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise _Closed()
+    status = int(status_line.split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await _read_body(reader, headers)
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def _client(url, request, deadline, results):
+    """Issue requests over one connection, reconnecting on errors."""
+    writer = None
+    while time.monotonic() < deadline:
+        try:
+            reused = writer is not None
+            started = time.monotonic()
+            if writer is None:
+                reader, writer = await asyncio.open_connection(
+                    url.hostname, url.port or 80,
+                )
+            status, keep_alive = await _request(reader, writer, request)
+            results['latencies'].append(time.monotonic() - started)
+            results['statuses'][status] += 1
+        except _Closed:
+            if not reused:
+                results['errors']['ConnectionClosed'] += 1
+            keep_alive = False
+        except (OSError, ValueError, IndexError,
+                asyncio.IncompleteReadError) as exc:
+            results['errors'][type(exc).__name__] += 1
+            keep_alive = False
+            await asyncio.sleep(0.1)
+        if not keep_alive and writer is not None:
+            writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def _percentile(values, percent):
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+async def run(url, connections, duration, headers):
+    """Run the load test and return its summary."""
+    url = urlsplit(url)
+    path = url.path + (f'?{url.query}' if url.query else '')
+    lines = [
+        f'GET {path or "/"} HTTP/1.1',
+        f'Host: {url.netloc}',
+        'Connection: keep-alive',
+        *headers,
+    ]
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode()
+    results = {'latencies': [], 'statuses': Counter(), 'errors': Counter()}
+
+    started = time.monotonic()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _client(url, request, deadline, results) for _ in range(connections)
+    ))
+    elapsed = time.monotonic() - started
+
+    latencies = sorted(results['latencies'])
+    summary = {
+        'connections': connections,
+        'seconds': round(elapsed, 1),
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'statuses': dict(results['statuses']),
+        'errors': dict(results['errors']),
+    }
+    if latencies:
+        summary['latency_ms'] = {
+            'mean': round(statistics.mean(latencies) * 1000, 1),
+            **{
+                f'p{p}': round(_percentile(latencies, p) * 1000, 1)
+                for p in (50, 90, 99)
+            },
+            'max': round(latencies[-1] * 1000, 1),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('url')
+    parser.add_argument('--connections', type=int, default=500)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--header', action='append', default=[])
+    args = parser.parse_args()
+
+    summary = asyncio.run(
+        run(args.url, args.connections, args.duration, args.header)
+    )
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -5,5 +5,14 @@ set -e
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
+python manage.py partition_event_log
+python manage.py prune_tokens
+python manage.py generate_schema
+
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec gunicorn app.asgi:application \
+        --worker-class uvicorn.workers.UvicornWorker \
+        --workers 4 --bind :9000 --forwarded-allow-ips '*'
+fi
 
 uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file